@@ -2,8 +2,6 @@
 Calculations of concordance between annotations.
 """
 import abc
-import enum
-import math
 from typing import Generator, Sequence, Type, Union
 
 import decorateme
@@ -12,14 +10,56 @@ import pandas as pd
 from pocketutils.core.enums import CleverEnum
 from pocketutils.core.exceptions import MismatchedDataError
 
-from mandos.analysis.io_defns import (
-    ConcordanceDf,
-    SimilarityDfLongForm,
-    SimilarityDfShortForm,
-)
+from mandos.analysis.io_defns import ConcordanceDf, SimilarityDfLongForm
 from mandos.model.utils.setup import logger
 
 
+def _pairs_tied(x: np.ndarray) -> np.ndarray:
+    """
+    For each row of a row-sorted 2D array, counts the pairs of equal values.
+    """
+    m, n = x.shape
+    same = np.zeros((m, n), dtype=bool)
+    same[:, 1:] = x[:, 1:] == x[:, :-1]
+    # a value equal to its predecessor pairs with every earlier value in its run
+    starts = np.maximum.accumulate(np.where(same, 0, np.arange(n)), axis=1)
+    return (np.arange(n) - starts).sum(axis=1)
+
+
+def _inversions(x: np.ndarray) -> np.ndarray:
+    """
+    For each row of a 2D array of ranks (nonnegative ints), counts the pairs i < j with x[i] > x[j].
+
+    This is a bottom-up merge sort on all rows at once.
+    At each level, a block holds a sorted left run followed by a sorted right run.
+    Sorting by (block, value, is-right) merges the runs, and then each right value is preceded by
+    exactly the left values that are not greater than it.
+    """
+    m, n = x.shape
+    span = int(x.max()) + 1
+    counts = np.zeros(m, dtype=np.int64)
+    cols = np.arange(n)
+    row_starts = np.arange(m)[:, None]
+    width = 1
+    while width < n:
+        n_blocks = -(-n // (2 * width))
+        right = (cols // width) % 2
+        n_left = n - right.sum()
+        offsets = (row_starts * n_blocks + cols // (2 * width)) * span
+        keys = (offsets + x) << 1 | right
+        # each block is two sorted runs, which the stable sort (timsort) merges in linear time
+        keys = np.sort(keys.ravel(), kind="stable").reshape(m, n)
+        # blocks keep their positions, so the offsets still apply
+        x = (keys >> 1) - offsets
+        is_right = (keys & 1).astype(bool)
+        # the left values in earlier blocks (only the last block in a row can be short)
+        left_before = row_starts * n_left + cols // (2 * width) * width
+        left_seen = np.cumsum(~is_right).reshape(m, n) - left_before
+        counts += np.where(is_right, width - left_seen, 0).sum(axis=1)
+        width *= 2
+    return counts
+
+
 @decorateme.auto_repr_str()
 class ConcordanceCalculator(metaclass=abc.ABCMeta):
     def __init__(self, n_samples: int, seed: int):
@@ -28,52 +68,106 @@ class ConcordanceCalculator(metaclass=abc.ABCMeta):
         self.rand = np.random.RandomState(seed)
 
     def calc_all(self, phis: SimilarityDfLongForm, psis: SimilarityDfLongForm) -> ConcordanceDf:
-        for phi in phis["phi"].unique():
-            for psi in psis["psi"].unique():
-                phi_mx = phis[phis["phi"] == phi]
-                psi_mx = phis[phis["psi"] == psi]
-                self.calc(phi_mx, psi_mx, phi, psi)
+        cols = ["inchikey_1", "inchikey_2", "value"]
+        dfs = []
+        for phi_name in phis["key"].unique():
+            for psi_name in psis["key"].unique():
+                phi = phis[phis["key"] == phi_name][cols]
+                psi = psis[psis["key"] == psi_name][cols]
+                # compare only the pairs that both matrices have values for
+                df = pd.merge(phi, psi, on=cols[:2], suffixes=("_phi", "_psi")).dropna()
+                dfs.append(self.calc(df["value_phi"], df["value_psi"], phi_name, psi_name))
+        return ConcordanceDf.convert(pd.concat(dfs, ignore_index=True))
 
     def calc(
-        self, phi: SimilarityDfShortForm, psi: SimilarityDfShortForm, phi_name: str, psi_name: str
+        self, phi: Sequence[float], psi: Sequence[float], phi_name: str, psi_name: str
     ) -> ConcordanceDf:
         logger.info(f"Calculating {phi_name} / {psi_name}")
-        phi_cols, psi_cols = phi.columns.tolist(), psi.columns.tolist()
-        if phi_cols != psi_cols:
-            raise MismatchedDataError(f"Mismatched compounds: {phi_cols} != {psi_cols}")
-        df = pd.DataFrame(data=self.generate(phi, psi), columns=["score"])
+        if len(phi) != len(psi):
+            raise MismatchedDataError(f"Mismatched lengths: {len(phi)} != {len(psi)}")
+        taus = list(self.generate(phi, psi))
+        df = pd.DataFrame(dict(sample=np.arange(len(taus)), tau=taus))
         df["phi"] = phi_name
         df["psi"] = psi_name
-        df.columns = ["sample", "tau", "phi", "psi"]
         return ConcordanceDf.convert(df)
 
-    def generate(
-        self, phi: SimilarityDfShortForm, psi: SimilarityDfShortForm
-    ) -> Generator[float, None, None]:
-        yield self._calc(phi, psi)
-        for b in range(self.n_samples):
-            phi_b = self.rand.choice(phi, replace=True)
-            psi_b = self.rand.choice(psi, replace=True)
-            yield self._calc(phi_b, psi_b)
+    def generate(self, phi: Sequence[float], psi: Sequence[float]) -> Generator[float, None, None]:
+        """
+        Yields the value for the data, then for ``n_samples`` bootstrap samples.
 
-    def _calc(self, phi: SimilarityDfShortForm, psi: SimilarityDfShortForm) -> float:
+        Each sample draws pairs (phi_i, psi_i) with replacement.
+        Samples are calculated in batches of about 10 million values.
+        """
+        phi = self._prepare(np.asarray(phi, dtype=np.float64))
+        psi = self._prepare(np.asarray(psi, dtype=np.float64))
+        n = len(phi)
+        yield float(self._calc(phi[None, :], psi[None, :])[0])
+        batch = max(1, 10_000_000 // max(n, 1))
+        for i in range(0, self.n_samples, batch):
+            indices = self.rand.randint(0, n, size=(min(batch, self.n_samples - i), n))
+            yield from self._calc(phi[indices], psi[indices]).tolist()
+
+    def _prepare(self, x: np.ndarray) -> np.ndarray:
+        """
+        Transforms the data once, before it is sampled.
+        """
+        return x
+
+    def _calc(self, phi: np.ndarray, psi: np.ndarray) -> np.ndarray:
+        """
+        Calculates a value for each row of two 2D arrays.
+        """
         raise NotImplemented()
 
 
 class TauConcordanceCalculator(ConcordanceCalculator):
-    def _calc(self, phi: SimilarityDfShortForm, psi: SimilarityDfShortForm) -> float:
-        n = len(phi)
-        numerator = self._n_z(phi, psi, 1) - self._n_z(phi, psi, -1)
-        denominator = math.factorial(n) / (2 * math.factorial(n - 2))
-        return numerator / denominator
-
-    def _n_z(self, a: Sequence[float], b: Sequence[float], z: int) -> int:
-        values = [self._i_sum(a, b, i, z) for i in range(len(a))]
-        return int(np.sum(values))
-
-    def _i_sum(self, a: np.array, b: np.array, i: int, z: int):
-        values = [int(np.sign(a[i] - a[j]) == z * np.sign(b[i] - b[j]) != 0) for j in range(i)]
-        return int(np.sum(values))
+    """
+    Kendall's τ-a, where pairs tied in either variable are neither concordant nor discordant.
+
+    Pairs with a NaN in either variable also count as ties.
+    Uses Knight's O(n log n) algorithm.
+    """
+
+    def _prepare(self, x: np.ndarray) -> np.ndarray:
+        # only the order matters, and a resample of ranks is still in the same order
+        ranks = np.full(len(x), -1, dtype=np.int64)
+        ok = ~np.isnan(x)
+        ranks[ok] = np.unique(x[ok], return_inverse=True)[1]
+        return ranks
+
+    def _calc(self, phi: np.ndarray, psi: np.ndarray) -> np.ndarray:
+        n = phi.shape[1]
+        if n < 2:
+            return np.full(len(phi), np.nan)
+        return self._numerators(phi, psi) / (n * (n - 1) / 2)
+
+    def _numerators(self, phi: np.ndarray, psi: np.ndarray) -> np.ndarray:
+        """
+        Calculates the number of concordant minus discordant pairs in each row of ranks.
+        """
+        missing = (phi < 0) | (psi < 0)
+        if missing.any():
+            # pairs with a NaN count for neither; drop them row by row
+            return np.array(
+                [
+                    self._numerators(a[~k][None, :], b[~k][None, :])[0]
+                    for a, b, k in zip(phi, psi, missing)
+                ]
+            )
+        m, n = phi.shape
+        if n < 2:
+            return np.zeros(m, dtype=np.int64)
+        # sort by phi, then psi; then discordant pairs are the inversions of psi
+        span = int(psi.max()) + 1
+        pairs = np.sort(phi * span + psi, axis=1)
+        phi, psi = pairs // span, pairs % span
+        tied_phi = _pairs_tied(phi)
+        tied_both = _pairs_tied(pairs)
+        tied_psi = _pairs_tied(np.sort(psi, axis=1))
+        discordant = _inversions(psi)
+        # pairs tied in phi are sorted by psi, so they are never counted as inversions
+        concordant = n * (n - 1) // 2 - tied_phi - tied_psi + tied_both - discordant
+        return concordant - discordant
 
 
 class ConcordanceAlg(CleverEnum):
@@ -90,13 +184,11 @@ class ConcordanceCalculation:
     def create(
         cls,
         algorithm: Union[str, ConcordanceAlg],
-        phi_name: str,
-        psi_name: str,
         n_samples: int,
         seed: int,
     ) -> ConcordanceCalculator:
         algorithm = ConcordanceAlg.of(algorithm).clazz
-        return algorithm(n_samples=n_samples, seed=seed, phi_name=phi_name, psi_name=psi_name)
+        return algorithm(n_samples=n_samples, seed=seed)
 
 
 __all__ = [
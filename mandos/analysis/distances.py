@@ -5,15 +5,20 @@ import abc
 import math
 import time
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
-from typing import Collection, Mapping, Optional, Sequence, Type, Union
+from typing import Collection, Dict, Iterator, Mapping, NamedTuple, Optional, Sequence
+from typing import Tuple as Tup
+from typing import Type, Union
 
 import decorateme
 import numpy as np
+import pandas as pd
 from pocketutils.core.chars import Chars
 from pocketutils.core.enums import CleverEnum
 from pocketutils.core.exceptions import XValueError
 from pocketutils.tools.unit_tools import UnitTools
+from typeddfs import Checksums
 from typeddfs.df_errors import HashFileMissingError
 
 from mandos.analysis import AnalysisUtils as Au
@@ -32,27 +37,18 @@ from mandos.model.utils.setup import logger
 class _Inf:
     def __init__(self, n: int):
         self.n = n
-        self.used, self.t0, self.nonzeros = set(), time.monotonic(), 0
+        self.i, self.t0, self.nonzeros = 0, time.monotonic(), 0
 
-    def is_used(self, c1: str, c2: str) -> bool:
-        return (c1, c2) in self.used or (c2, c1) in self.used
-
-    def got(self, c1: str, c2: str, z: float) -> None:
-        self.used.add((c1, c2))
-        self.nonzeros += int(c1 != c2 and not np.isnan(z) and 0 < z < 1)
-        if self.i % 1000 == 0:
-            self.log("info")
-
-    @property
-    def i(self) -> int:
-        return len(self.used)
+    def got(self, n_pairs: int, nonzeros: int) -> None:
+        self.i += n_pairs
+        self.nonzeros += nonzeros
 
     def log(self, level: str) -> None:
         delta = UnitTools.delta_time_to_str(time.monotonic() - self.t0, space=Chars.narrownbsp)
         logger.log(
             level.upper(),
             f"Processed {self.i:,}/{self.n:,} pairs in {delta};"
-            + f" {self.nonzeros:,} ({self.nonzeros / self.i * 100:.1f}%) are nonzero",
+            + f" {self.nonzeros:,} ({self.nonzeros / max(self.i, 1) * 100:.1f}%) are nonzero",
         )
 
     def __repr__(self):
@@ -62,6 +58,176 @@ class _Inf:
         return repr(self)
 
 
+def _fsum_groups(codes: np.ndarray, values: np.ndarray) -> Tup[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Sums the values that share a code, rounding exactly like ``math.fsum``.
+
+    Returns:
+        The sorted unique codes, their sums, and the number of values for each
+    """
+    order = np.argsort(codes, kind="stable")
+    codes, values = codes[order], values[order]
+    if len(codes) == 0:
+        return codes, values, np.empty(0, dtype=np.int64)
+    starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+    counts = np.diff(np.r_[starts, len(codes)])
+    sums = np.add.reduceat(values, starts)
+    # adding two floats rounds correctly, like fsum does; for 3 or more, we need fsum itself
+    many = np.flatnonzero(counts > 2)
+    if len(many) > 0:
+        listed = values.tolist()
+        sums[many] = [math.fsum(listed[starts[k] : starts[k] + counts[k]]) for k in many]
+    return codes[starts], sums, counts
+
+
+class _Source(NamedTuple):
+    has: np.ndarray  # whether each compound has any hit from this source
+    n_features: np.ndarray  # number of (predicate, object)s per compound
+    rows: np.ndarray  # compound indices, sorted by feature then compound
+    ells: np.ndarray  # ℓ(summed weight), in the same order
+    keys: np.ndarray  # feature × n + compound, which is sorted
+
+
+class _JPrimeEngine:
+    """
+    Calculates J' between many pairs of compounds at once.
+
+    Each data source gets a sparse compound × (predicate, object) matrix of ℓ(summed weight),
+    as coordinate arrays. Only compounds that share a (predicate, object) are paired.
+    Because the sums are exact, the results are identical to those of ``_j_prime``.
+    """
+
+    def __init__(self, compounds: Sequence[str], hits: Sequence[AbstractHit]):
+        index = {c: i for i, c in enumerate(compounds)}
+        self.n = len(compounds)
+        # sum the weights in hit order, like AnalysisUtils.weights_of_pairs
+        weights: Dict[str, Dict[Tup[int, Tup[str, str, str]], float]] = defaultdict(dict)
+        for h in hits:
+            summed = weights[h.data_source]
+            k = (index[h.origin_inchikey], (h.search_key, h.predicate, h.object_name))
+            summed[k] = summed.get(k, 0) + h.weight
+        self._sources = [self._encode(summed) for summed in weights.values()]
+
+    def matrix(self) -> np.ndarray:
+        """
+        Returns an n × n matrix with J' above the diagonal; values below it are meaningless.
+        """
+        return self.block(range(self.n), range(self.n))
+
+    def block(self, rows: range, cols: range) -> np.ndarray:
+        """
+        Returns J' between the compounds in ``rows`` and those in ``cols``.
+
+        The ranges must be either equal or disjoint with ``rows`` first.
+        Values where the row's compound does not precede the column's are meaningless.
+        """
+        same = rows == cols
+        n_shared = np.zeros((len(rows), len(cols)), dtype=np.int32)
+        codes, values = [np.empty(0, dtype=np.int64)], [np.empty(0)]
+        for source in self._sources:
+            n_shared += np.outer(
+                source.has[rows.start : rows.stop], source.has[cols.start : cols.stop]
+            )
+            c, jx = self._per_source(source, rows, cols, same)
+            codes.append(c)
+            values.append(jx)
+        codes, totals, _ = _fsum_groups(np.concatenate(codes), np.concatenate(values))
+        out = np.zeros((len(rows), len(cols)))
+        out.flat[codes] = totals
+        with np.errstate(divide="ignore", invalid="ignore"):
+            out = np.where(n_shared > 0, out / n_shared, np.nan)
+        if same:
+            np.fill_diagonal(out, 1)
+        return out
+
+    def _encode(self, summed: Mapping[Tup[int, Tup[str, str, str]], float]) -> _Source:
+        n = len(summed)
+        features = {}
+        rows = np.fromiter((c for c, _ in summed), dtype=np.int64, count=n)
+        cols = np.fromiter(
+            (features.setdefault(f, len(features)) for _, f in summed), dtype=np.int64, count=n
+        )
+        ells = np.fromiter((Au.elle(w) for w in summed.values()), dtype=np.float64, count=n)
+        has = np.zeros(self.n, dtype=bool)
+        has[rows] = True
+        # a (predicate, object) with ℓ = 0 for both compounds is not even counted in the union
+        keep = ells > 0
+        rows, cols, ells = rows[keep], cols[keep], ells[keep]
+        order = np.lexsort((rows, cols))
+        rows, cols, ells = rows[order], cols[order], ells[order]
+        n_features = np.bincount(rows, minlength=self.n)
+        return _Source(has, n_features, rows, ells, cols * self.n + rows)
+
+    def _per_source(
+        self, source: _Source, rows: range, cols: range, same: bool
+    ) -> Tup[np.ndarray, np.ndarray]:
+        features = np.unique(source.keys // self.n)
+        # the compounds in rows (and cols) are contiguous within each feature
+        r0, r1 = [
+            np.searchsorted(source.keys, features * self.n + r) for r in (rows.start, rows.stop)
+        ]
+        c0, c1 = [
+            np.searchsorted(source.keys, features * self.n + c) for c in (cols.start, cols.stop)
+        ]
+        pairs = [np.empty(0, dtype=np.int64)], [np.empty(0, dtype=np.int64)]
+        for a, b, c, d in zip(r0, r1, c0, c1):
+            if same and b - a > 1:
+                x, y = np.triu_indices(b - a, 1)
+                pairs[0].append(x + a)
+                pairs[1].append(y + a)
+            elif not same and b > a and d > c:
+                pairs[0].append(np.repeat(np.arange(a, b), d - c))
+                pairs[1].append(np.tile(np.arange(c, d), b - a))
+        x, y = np.concatenate(pairs[0]), np.concatenate(pairs[1])
+        ex, ey = source.ells[x], source.ells[y]
+        # same operations as _wedge and _vee
+        wedges = np.sqrt(ex * ey)
+        codes = (source.rows[x] - rows.start) * len(cols) + source.rows[y] - cols.start
+        codes, sums, counts = _fsum_groups(codes, wedges / (ex + ey - wedges))
+        i, j = codes // len(cols) + rows.start, codes % len(cols) + cols.start
+        union = source.n_features[i] + source.n_features[j] - counts
+        return codes, sums / union
+
+
+# set in each worker process, so the hits are only sent once
+_worker_engine: Optional[_JPrimeEngine] = None
+
+
+def _init_worker(engine: _JPrimeEngine) -> None:
+    global _worker_engine
+    _worker_engine = engine
+
+
+def _write_block(
+    key: str, compounds: np.ndarray, rows: range, cols: range, path: Path
+) -> Tup[int, int]:
+    """
+    Calculates a block and writes it in long form.
+
+    Only includes pairs with the row compound at or before the column compound.
+    Returns the number of pairs of different compounds and how many of those are nonzero.
+    """
+    block = _worker_engine.block(rows, cols)
+    if rows == cols:
+        i, j = np.triu_indices(len(rows))
+    else:
+        i, j = np.indices(block.shape).reshape(2, -1)
+    values = block[i, j]
+    # like the unblocked results, the later compound is first
+    df = pd.DataFrame(
+        dict(
+            inchikey_1=compounds[cols.start + j],
+            inchikey_2=compounds[rows.start + i],
+            type="psi",
+            key=key,
+            value=values,
+        )
+    )
+    SimilarityDfLongForm.convert(df).write_file(path, file_hash=True, mkdirs=True)
+    different = rows.start + i != cols.start + j
+    return int(different.sum()), int(np.count_nonzero(different & (values > 0) & (values < 1)))
+
+
 @decorateme.auto_repr_str()
 class MatrixCalculator(metaclass=abc.ABCMeta):
     def __init__(
@@ -71,17 +237,30 @@ class MatrixCalculator(metaclass=abc.ABCMeta):
         min_nonzero: int,
         min_hits: int,
         exclude: Optional[Collection[str]] = None,
+        block_size: Optional[int] = None,
+        n_procs: int = 1,
     ):
         self.min_compounds = min_compounds
         self.min_nonzero = min_nonzero
         self.min_hits = min_hits
         self.exclude = set() if exclude is None else exclude
+        self.block_size = block_size
+        self.n_procs = n_procs
 
     def calc_all(self, hits: Path, to: Path, *, keep_temp: bool = False) -> SimilarityDfLongForm:
         raise NotImplemented()
 
 
 class JPrimeMatrixCalculator(MatrixCalculator):
+    """
+    Calculates J' for every key.
+
+    If ``block_size`` is set, keys with more compounds are split into blocks of compound pairs,
+    which are calculated in up to ``n_procs`` processes and saved as they finish.
+    An interrupted run then resumes from the last finished block.
+    Blocked results leave out the pairs that would be NaN (the empty upper triangle).
+    """
+
     def calc_all(self, path: Path, to: Path, *, keep_temp: bool = False) -> SimilarityDfLongForm:
         hits = self._read_hits(path)
         key_to_hit = Au.hit_multidict(hits, "search_key")
@@ -95,7 +274,10 @@ class JPrimeMatrixCalculator(MatrixCalculator):
             if part_path.exists():
                 df = self._read_part(key, part_path)
             if df is None and n_compounds_0 >= self.min_compounds:
-                df = self._calc_partial(key, key_hits)
+                if self.block_size is not None and n_compounds_0 > self.block_size:
+                    df = self._calc_blocked(key, key_hits, to, keep_temp=keep_temp)
+                else:
+                    df = self._calc_partial(key, key_hits)
                 df.write_file(part_path, attrs=True, file_hash=True, mkdirs=True)
                 logger.debug(f"Wrote results for {key} to {part_path}")
             if df is not None and self._should_include(df):
@@ -106,10 +288,11 @@ class JPrimeMatrixCalculator(MatrixCalculator):
         big_df.write_file(to, attrs=True, file_hash=True, mkdirs=True)
         logger.notice(f"Wrote {len(big_df):,} rows to {to}")
         attrs_path = to.parent / (to.name + ".attrs.json")
-        logger.sucess(f"Finished -- see {attrs_path} for statistics")
+        logger.success(f"Finished -- see {attrs_path} for statistics")
         if not keep_temp:
             for k in good_keys:
                 unlink(self._part_path(to, k))
+        return big_df
 
     def _read_hits(self, path: Path) -> Sequence[AbstractHit]:
         hits = HitDf.read_file(path)
@@ -123,10 +306,64 @@ class JPrimeMatrixCalculator(MatrixCalculator):
                 negatives = dfx[dfx["weight"] <= 0]
                 if len(negatives) > 0:
                     logger.error(f"{len(negatives)} / {len(dfx):,} hits for {key} are nonpositive")
-        return [h for h in hits.to_hits() if h.search_key not in self.exclude and h.weight > 0]
+        # filter before making the hits
+        return HitDf(hits[~hits["search_key"].isin(self.exclude) & (hits["weight"] > 0)]).to_hits()
 
     def _calc_partial(self, key: str, key_hits: HitDf) -> SimilarityDfLongForm:
         df = self.calc_one(key, key_hits).to_long_form(kind="psi", key=key)
+        return self._with_attrs(df, key, key_hits)
+
+    def _calc_blocked(
+        self, key: str, key_hits: Sequence[AbstractHit], to: Path, *, keep_temp: bool
+    ) -> SimilarityDfLongForm:
+        compounds = list(Au.hit_multidict(key_hits, "origin_inchikey").keys())
+        n, size = len(compounds), self.block_size
+        ranges = [range(i, min(i + size, n)) for i in range(0, n, size)]
+        blocks = [(r, c) for r in ranges for c in ranges if r.start <= c.start]
+        paths = [self._block_path(to, key, size, r, c) for r, c in blocks]
+        todo = [
+            (b, p) for b, p in zip(blocks, paths) if not Checksums().get_filesum_of_file(p).exists()
+        ]
+        logger.info(
+            f"Calculating J on {key} for {n:,} compounds in {len(blocks):,} blocks"
+            + f" ({len(blocks) - len(todo):,} already done) with {self.n_procs} processes"
+        )
+        engine = _JPrimeEngine(compounds, key_hits)
+        compounds = np.array(compounds, dtype=object)
+        inf = _Inf(n=n * (n - 1) // 2)
+        for n_pairs, nonzeros in self._map_blocks(engine, key, compounds, todo):
+            inf.got(n_pairs, nonzeros)
+            inf.log("info")
+        inf.log("success")
+        df = pd.concat([SimilarityDfLongForm.read_file(p) for p in paths], ignore_index=True)
+        df = self._with_attrs(SimilarityDfLongForm.convert(df), key, key_hits)
+        if not keep_temp:
+            for p in paths:
+                unlink(p)
+        return df
+
+    def _map_blocks(
+        self,
+        engine: _JPrimeEngine,
+        key: str,
+        compounds: np.ndarray,
+        todo: Sequence[Tup[Tup[range, range], Path]],
+    ) -> Iterator[Tup[int, int]]:
+        if self.n_procs == 1:
+            _init_worker(engine)
+            for (r, c), p in todo:
+                yield _write_block(key, compounds, r, c, p)
+            return
+        with ProcessPoolExecutor(
+            self.n_procs, initializer=_init_worker, initargs=(engine,)
+        ) as pool:
+            futures = [pool.submit(_write_block, key, compounds, r, c, p) for (r, c), p in todo]
+            for future in as_completed(futures):
+                yield future.result()
+
+    def _with_attrs(
+        self, df: SimilarityDfLongForm, key: str, key_hits: Sequence[AbstractHit]
+    ) -> SimilarityDfLongForm:
         return df.set_attrs(
             key=key,
             quartiles=[float(df["value"].quantile(x)) for x in [0, 0.25, 0.5, 0.75, 1]],
@@ -166,23 +403,26 @@ class JPrimeMatrixCalculator(MatrixCalculator):
         return SimilarityDfLongForm.of(dfs, keys=keys)
 
     def calc_one(self, key: str, hits: Sequence[AbstractHit]) -> SimilarityDfShortForm:
-        ik2hits = Au.hit_multidict(hits, "origin_inchikey")
-        logger.info(f"Calculating J on {key} for {len(ik2hits):,} compounds and {len(hits):,} hits")
-        data = defaultdict(dict)
-        inf = _Inf(n=int(len(ik2hits) * (len(ik2hits) - 1) / 2))
-        for (c1, hits1) in ik2hits.items():
-            for (c2, hits2) in ik2hits.items():
-                if inf.is_used(c1, c2):
-                    continue
-                z = 1 if c1 == c2 else self._j_prime(key, hits1, hits2)
-                data[c1][c2] = z
-                inf.got(c1, c2, z)
+        compounds = list(Au.hit_multidict(hits, "origin_inchikey").keys())
+        n = len(compounds)
+        logger.info(f"Calculating J on {key} for {n:,} compounds and {len(hits):,} hits")
+        inf = _Inf(n=n * (n - 1) // 2)
+        matrix = _JPrimeEngine(compounds, hits).matrix()
+        upper = matrix[np.triu_indices(n, 1)]
+        inf.got(len(upper), int(np.count_nonzero((upper > 0) & (upper < 1))))
         inf.log("success")
-        return SimilarityDfShortForm.from_dict(data)
+        # columns are the first compound, rows the second; the upper triangle is empty
+        matrix = matrix.T
+        matrix[np.triu_indices(n, 1)] = np.nan
+        return SimilarityDfShortForm(matrix, index=compounds, columns=compounds)
 
     def _part_path(self, path: Path, key: str):
         return path.parent / f".{path.name}-{key}.tmp.feather"
 
+    def _block_path(self, path: Path, key: str, size: int, rows: range, cols: range):
+        i, j = rows.start // size, cols.start // size
+        return path.parent / f".{path.name}-{key}-{size}-{i}-{j}.tmp.feather"
+
     def _j_prime(
         self, key: str, hits1: Collection[AbstractHit], hits2: Collection[AbstractHit]
     ) -> float:
@@ -245,12 +485,16 @@ class MatrixCalculation:
         min_nonzero: int,
         min_hits: int,
         exclude: Optional[Collection[str]] = None,
+        block_size: Optional[int] = None,
+        n_procs: int = 1,
     ) -> MatrixCalculator:
         return MatrixAlg.of(algorithm).clazz(
             min_compounds=min_compounds,
             min_nonzero=min_nonzero,
             min_hits=min_hits,
             exclude=exclude,
+            block_size=block_size,
+            n_procs=n_procs,
         )
 
 
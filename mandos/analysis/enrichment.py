@@ -1,6 +1,8 @@
 """
 Scoring (regression and enrichment) calculations.
 """
+from __future__ import annotations
+
 import abc
 import enum
 import math
@@ -8,7 +10,9 @@ from pathlib import Path
 from typing import (
     Any,
     Generic,
+    Iterator,
     Mapping,
+    NamedTuple,
     Optional,
     Sequence,
     Tuple,
@@ -22,13 +26,73 @@ import numpy as np
 import pandas as pd
 from numpy.random import RandomState
 from pocketutils.core.enums import CleverEnum
+from pocketutils.core.exceptions import XValueError
 
 from mandos.analysis import AnalysisUtils as Au
 from mandos.analysis.io_defns import EnrichmentDf, ScoreDf
 from mandos.model.hit_dfs import HitDf
 from mandos.model.hits import AbstractHit, KeyPredObj
+from mandos.model.utils.setup import logger
 
 S = TypeVar("S", bound=Union[int, float, bool])
+_PAIR_COLS = ["search_key", "predicate", "object_name"]
+
+
+class _HitMatrix(NamedTuple):
+    """
+    A sparse row × compound matrix of hits, as coordinate arrays sorted by row.
+
+    A row is a (key, predicate, object), or a (key, predicate, object, source).
+    Each entry sums the hits of one compound in one row.
+    """
+
+    rows: pd.DataFrame  # the unique rows, in order
+    pair_starts: np.ndarray  # the index of each (key, predicate, object)'s first row
+    starts: np.ndarray  # the index of each row's first entry
+    compounds: np.ndarray  # the compound of each entry
+    weights: np.ndarray  # the summed weight
+    counts: np.ndarray  # the number of hits
+    ells: np.ndarray  # the summed ℓ(weight)
+
+    @classmethod
+    def of(cls, hits: pd.DataFrame, compounds: pd.Index, by_source: bool) -> _HitMatrix:
+        cols = _PAIR_COLS + ["data_source"] if by_source else _PAIR_COLS
+        df = hits[cols].copy()
+        df["compound"] = compounds.get_indexer(hits["origin_inchikey"])
+        df["weight"] = hits["weight"].to_numpy(dtype=np.float64)
+        df["ell"] = np.log10(1 + df["weight"])  # Au.elle
+        # the sorted groups put each row's entries together
+        # HitDf columns are categorical, and observed groups are not always sorted in pandas 1.x
+        entries = df.groupby(cols + ["compound"], sort=True, observed=True).agg(
+            weight=("weight", "sum"), count=("weight", "size"), ell=("ell", "sum")
+        )
+        entries = entries.sort_index().reset_index()
+        row_codes = entries.groupby(cols, sort=False, observed=True).ngroup().to_numpy()
+        starts = np.flatnonzero(np.r_[True, row_codes[1:] != row_codes[:-1]])
+        rows = entries[cols].iloc[starts].reset_index(drop=True)
+        pair_codes = rows.groupby(_PAIR_COLS, sort=False, observed=True).ngroup().to_numpy()
+        return _HitMatrix(
+            rows=rows,
+            pair_starts=np.flatnonzero(np.r_[True, pair_codes[1:] != pair_codes[:-1]]),
+            starts=starts,
+            compounds=entries["compound"].to_numpy(),
+            weights=entries["weight"].to_numpy(),
+            counts=entries["count"].to_numpy(dtype=np.float64),
+            ells=entries["ell"].to_numpy(),
+        )
+
+    def sums(self, u: np.ndarray, terms: np.ndarray) -> np.ndarray:
+        """
+        Sums each term over the entries in each row, for each sample.
+
+        Arguments:
+            u: The weight of each entry, per sample (samples × entries)
+            terms: The values to sum (terms × entries)
+
+        Returns:
+            A terms × samples × rows array
+        """
+        return np.stack([np.add.reduceat(u * t, self.starts, axis=1) for t in terms])
 
 
 @decorateme.auto_repr_str()
@@ -39,12 +103,35 @@ class EnrichmentCalculator(Generic[S], metaclass=abc.ABCMeta):
         pair_to_hits = Au.hit_multidict(hits, "to_key_pred_obj")
         results = {}
         for pair, the_hits in pair_to_hits.items():
-            results[pair] = self.for_pair(hits, scores)
+            results[pair] = self.for_pair(the_hits, scores)
         return results
 
     def for_pair(self, hits: Sequence[AbstractHit], scores: Mapping[str, S]) -> float:
         raise NotImplementedError()
 
+    def terms(self, matrix: _HitMatrix, scores: np.ndarray) -> np.ndarray:
+        """
+        Returns the values per matrix entry that need to be summed (terms × entries).
+
+        Arguments:
+            matrix: The hits, by source if ``by_source``
+            scores: The score for each compound
+        """
+        raise NotImplementedError()
+
+    def from_sums(self, matrix: _HitMatrix, sums: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Calculates the values for the scores and their inverse from the sums of the terms.
+
+        Returns:
+            Two samples × (key, predicate, object) arrays, in the order of the matrix rows
+        """
+        raise NotImplementedError()
+
+    @classmethod
+    def by_source(cls) -> bool:
+        return False
+
     @classmethod
     def alg_name(cls) -> str:
         raise NotImplementedError()
@@ -54,6 +141,12 @@ class EnrichmentCalculator(Generic[S], metaclass=abc.ABCMeta):
 class _FoldCalculator(EnrichmentCalculator[bool]):
     """"""
 
+    def from_sums(self, matrix: _HitMatrix, sums: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        yes, no = sums
+        # the inverse is the ratio the other way around
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(no == 0, np.inf, yes / no), np.where(yes == 0, np.inf, no / yes)
+
 
 # noinspection PyAbstractClass
 class _RegressCalculator(EnrichmentCalculator[float]):
@@ -78,6 +171,28 @@ class AlphaCalculator(_RegressCalculator):
         ]
         return float(np.mean(vals))
 
+    def terms(self, matrix: _HitMatrix, scores: np.ndarray) -> np.ndarray:
+        y = scores[matrix.compounds]
+        return np.array(
+            [matrix.counts, matrix.ells * (2 * (y - 1)) ** 2, matrix.ells * (2 * (-y - 1)) ** 2]
+        )
+
+    def from_sums(self, matrix: _HitMatrix, sums: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        n, forward, reverse = sums
+        # average the terms of the sources that have hits (in this sample)
+        present = n > 0
+        n_present = np.add.reduceat(present, matrix.pair_starts, axis=1)
+        results = []
+        for totals in [forward, reverse]:
+            with np.errstate(divide="ignore", invalid="ignore"):
+                terms = np.where(present, totals / n, 0)
+                results.append(np.add.reduceat(terms, matrix.pair_starts, axis=1) / n_present)
+        return results[0], results[1]
+
+    @classmethod
+    def by_source(cls) -> bool:
+        return True
+
 
 class SumWeightedCalc(_RegressCalculator):
     @classmethod
@@ -87,6 +202,15 @@ class SumWeightedCalc(_RegressCalculator):
     def for_pair(self, hits: Sequence[AbstractHit], scores: Mapping[str, S]) -> float:
         return math.fsum([scores[hit.origin_inchikey] * hit.weight for hit in hits]) / len(hits)
 
+    def terms(self, matrix: _HitMatrix, scores: np.ndarray) -> np.ndarray:
+        return np.array([matrix.weights * scores[matrix.compounds], matrix.counts])
+
+    def from_sums(self, matrix: _HitMatrix, sums: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            values = sums[0] / sums[1]
+        # the sums for the negated scores are exactly the negated sums
+        return values, -values
+
 
 class SumUnweightedCalc(_RegressCalculator):
     @classmethod
@@ -96,6 +220,14 @@ class SumUnweightedCalc(_RegressCalculator):
     def for_pair(self, hits: Sequence[AbstractHit], scores: Mapping[str, S]) -> float:
         return math.fsum([scores[hit.origin_inchikey] for hit in hits]) / len(hits)
 
+    def terms(self, matrix: _HitMatrix, scores: np.ndarray) -> np.ndarray:
+        return np.array([matrix.counts * scores[matrix.compounds], matrix.counts])
+
+    def from_sums(self, matrix: _HitMatrix, sums: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            values = sums[0] / sums[1]
+        return values, -values
+
 
 class FoldWeightedCalc(_FoldCalculator):
     @classmethod
@@ -111,6 +243,10 @@ class FoldWeightedCalc(_FoldCalculator):
             return float("inf")
         return numerator / denominator
 
+    def terms(self, matrix: _HitMatrix, scores: np.ndarray) -> np.ndarray:
+        yes = scores[matrix.compounds].astype(bool)
+        return np.array([np.where(yes, matrix.weights, 0), np.where(yes, 0, matrix.weights)])
+
 
 class FoldUnweightedCalc(_FoldCalculator):
     @classmethod
@@ -124,6 +260,10 @@ class FoldUnweightedCalc(_FoldCalculator):
             return float("inf")
         return numerator / denominator
 
+    def terms(self, matrix: _HitMatrix, scores: np.ndarray) -> np.ndarray:
+        yes = scores[matrix.compounds].astype(bool)
+        return np.array([np.where(yes, matrix.counts, 0), np.where(yes, 0, matrix.counts)])
+
 
 class _Alg(CleverEnum):
     """"""
@@ -169,6 +309,16 @@ class BoolAlg(_Alg):
 
 @decorateme.auto_repr_str()
 class EnrichmentCalculation:
+    """
+    Calculates each score's enrichment for every (key, predicate, object).
+
+    Hits are encoded once as sparse (key, predicate, object) × compound matrices.
+    A bootstrap sample draws compounds with replacement,
+    which is just a vector of how many times each compound was drawn.
+    Samples are calculated in batches of about a million matrix entries,
+    which is faster than bigger batches.
+    """
+
     def __init__(
         self,
         bool_alg: str,
@@ -182,71 +332,104 @@ class EnrichmentCalculation:
         self.seed = seed
         self.state = RandomState(seed)
 
-    def calculate(self, hits: Path, scores: Optional[Path], to: Path) -> EnrichmentDf:
-        hit_df = HitDf.read_file(hits)
-        hits = hit_df.to_hits()
+    def calculate(self, hit_df: HitDf, scores: Optional[ScoreDf], to: Path) -> EnrichmentDf:
         if scores is None:
             scores = self._default_scores(hit_df)
-        else:
-            scores = ScoreDf.read_file(scores)
+        compounds = pd.Index(hit_df["origin_inchikey"].unique())
         score_dict = self._get_dict(scores)
-        results = self._calc(hits, score_dict, 0)
-        for b in range(self.n_samples):
-            b_hits = self.state.choice(hits, replace=True)
-            results += self._calc(b_hits, score_dict, b)
-        df = EnrichmentDf.convert(results)
+        algs = {name: alg_type.clazz() for name, (alg_type, _) in score_dict.items()}
+        matrices = {
+            b: _HitMatrix.of(hit_df, compounds, b) for b in {a.by_source() for a in algs.values()}
+        }
+        terms = {
+            name: alg.terms(
+                matrices[alg.by_source()], self._to_array(name, score_dict[name][1], compounds)
+            )
+            for name, alg in algs.items()
+        }
+        matrix = next(iter(matrices.values()))
+        pairs = matrix.rows[_PAIR_COLS].iloc[matrix.pair_starts]
+        batch = max(1, 1_000_000 // max(len(m.compounds) for m in matrices.values()))
+        logger.info(
+            f"Calculating {len(algs)} scores for {len(pairs):,} pairs"
+            + f" with {self.n_samples:,} bootstrap samples"
+        )
+        results = {name: ([], []) for name in algs}
+        for u in self._samples(len(compounds), batch):
+            # the weight of each matrix entry in each sample
+            weights = {b: u[:, m.compounds] for b, m in matrices.items()}
+            for name, alg in algs.items():
+                matrix = matrices[alg.by_source()]
+                sums = matrix.sums(weights[alg.by_source()], terms[name])
+                forward, reverse = alg.from_sums(matrix, sums)
+                results[name][0].append(forward)
+                results[name][1].append(reverse)
+        df = pd.concat(
+            [
+                self._make_df(pairs, np.vstack(f), np.vstack(r), name, algs[name].alg_name())
+                for name, (f, r) in results.items()
+            ],
+            ignore_index=True,
+        )
+        df = EnrichmentDf.convert(df)
         df.write_file(to, attrs=True, mkdirs=True, file_hash=True)
         logger.notice(f"Wrote {len(df):,} rows to {to}")
         return df
 
-    def _calc(self, hits: Sequence[AbstractHit], score_dict, sample: int) -> Sequence[pd.DataFrame]:
-        for score_name, (alg_type, score_vals) in score_dict.items():
-            alg_instance = alg_type.clazz()
-            forward = alg_instance.calc(hits, score_vals.to_dict())
-            if alg_type.dtype == bool:
-                reverse = alg_instance.calc(hits, (~score_vals).to_dict())
-            else:
-                reverse = alg_instance.calc(hits, (-score_vals).to_dict())
-            return [self._make_df(forward, reverse, score_name, alg_type.name, sample)]
+    def _samples(self, n_compounds: int, batch: int) -> Iterator[np.ndarray]:
+        """
+        Yields the weights of compounds for each batch of samples, starting with the real data.
+        """
+        yield np.ones((1, n_compounds))
+        for i in range(0, self.n_samples, batch):
+            n = min(batch, self.n_samples - i)
+            drawn = self.state.randint(0, n_compounds, size=(n, n_compounds))
+            # multinomial counts: how many times each compound was drawn in each sample
+            drawn += np.arange(n)[:, None] * n_compounds
+            counts = np.bincount(drawn.ravel(), minlength=n * n_compounds)
+            yield counts.reshape(n, n_compounds).astype(np.float64)
 
     def _default_scores(self, hit_df: HitDf) -> ScoreDf:
-        inchikeys = hit_df["origin_inchikey"].unique().values
+        inchikeys = hit_df["origin_inchikey"].unique()
         counts = ScoreDf.of_constant(inchikeys, score_name="count")
-        weights = ScoreDf.of_constant(inchikeys, score_name="count")
-        return ScoreDf.concat([counts, weights])
+        weights = ScoreDf.of_constant(inchikeys, score_name="weight")
+        return ScoreDf.convert(pd.concat([counts, weights], ignore_index=True))
 
     def _get_dict(self, scores: ScoreDf) -> Mapping[str, Tuple[_Alg, pd.Series]]:
-        fold_cols = [c for c in scores.columns if c.startswith("is_") or c == "count"]
-        score_cols = [c for c in scores.columns if c.startswith("score_") or c == "weight"]
-        fold_dct = {c: (self.bool_alg, scores.set_index("inchikey")[c]) for c in fold_cols}
-        score_dct = {c: (self.real_alg, scores.set_index("inchikey")[c]) for c in score_cols}
-        return {**fold_dct, **score_dct}
+        dct = {}
+        for name in scores["score_name"].unique():
+            vals = scores[scores["score_name"] == name].set_index("inchikey")["score_value"]
+            if name.startswith("is_") or name == "count":
+                dct[name] = (self.bool_alg, vals.astype(bool))
+            elif name.startswith("score_") or name == "weight":
+                dct[name] = (self.real_alg, vals)
+            else:
+                logger.warning(f"Ignoring score {name}: it starts with neither 'is_' nor 'score_'")
+        return dct
+
+    def _to_array(self, name: str, vals: pd.Series, compounds: pd.Index) -> np.ndarray:
+        vals = vals.reindex(compounds)
+        if vals.isna().any():
+            raise XValueError(f"Score {name} is missing for {vals.isna().sum():,} compounds")
+        return vals.to_numpy(dtype=np.float64)
 
     def _make_df(
         self,
-        forward: Mapping[KeyPredObj, float],
-        backward: Mapping[KeyPredObj, float],
+        pairs: pd.DataFrame,
+        forward: np.ndarray,
+        backward: np.ndarray,
         score: str,
         alg: str,
-        sample: int,
-    ):
-        return pd.DataFrame(
-            [
-                pd.Series(
-                    dict(
-                        key=kpo.key,
-                        predicate=kpo.pred,
-                        object=kpo.obj,
-                        score_name=score,
-                        algorithm=alg,
-                        sample=sample,
-                        value=forward[kpo],
-                        inverse=backward[kpo],
-                    )
-                )
-                for kpo in forward.keys()
-            ]
-        )
+    ) -> pd.DataFrame:
+        n_samples, n_pairs = forward.shape
+        df = pairs.iloc[np.tile(np.arange(n_pairs), n_samples)].reset_index(drop=True)
+        df = df.rename(columns=dict(search_key="key", object_name="object"))
+        df["score_name"] = score
+        df["algorithm"] = alg
+        df["sample"] = np.repeat(np.arange(n_samples), n_pairs)
+        df["value"] = forward.ravel()
+        df["inverse"] = backward.ravel()
+        return df
 
 
 __all__ = [
@@ -13,8 +13,15 @@ from typeddfs import AffinityMatrixDf, TypedDfs
 def _to_long_form(self: AffinityMatrixDf, kind: str, key: str):
     if kind not in ["phi", "psi"]:
         raise XValueError(f"'type' should be 'phi' or 'psi', not {kind}")
-    df = self.long_form()
-    df = df.rename(columns=dict(row="inchikey_1", column="inchikey_2"))
+    # like AffinityMatrixDf.long_form (row by row), but without a Series per cell
+    rows, cols = self.index.to_numpy(), self.columns.to_numpy()
+    df = pd.DataFrame(
+        dict(
+            inchikey_1=np.repeat(rows, len(cols)),
+            inchikey_2=np.tile(cols, len(rows)),
+            value=self.to_numpy(dtype=np.float64).ravel(),
+        )
+    )
     df["type"] = kind
     df["key"] = key
     return SimilarityDfLongForm.convert(df)
@@ -27,11 +34,11 @@ def _to_short_form(self: pd.DataFrame):
     return SimilarityDfShortForm.convert(df)
 
 
-def _of_constant(self, inchikeys: Sequence[str], score_name: str, score_val: np.float64 = 1.0):
-    df = pd.DataFrame([inchikeys], columns=["inchikey"])
+def _of_constant(cls, inchikeys: Sequence[str], score_name: str, score_value: np.float64 = 1.0):
+    df = pd.DataFrame(dict(inchikey=inchikeys))
     df["score_name"] = score_name
-    df["score_val"] = score_val
-    return self.__class__.convert(df)
+    df["score_value"] = score_value
+    return cls.convert(df)
 
 
 def _makes_sense(df: pd.DataFrame) -> Optional[str]:
@@ -87,7 +94,7 @@ ScoreDf = (
     TypedDfs.typed("ScoreDf")
     .require("inchikey", "score_name", dtype=str)
     .require("score_value", dtype=np.float64)
-    .add_methods(of_constant=_of_constant)
+    .add_classmethods(of_constant=_of_constant)
     .strict(cols=False)
     .secure()
 ).build()
@@ -98,6 +105,7 @@ EnrichmentDf = (
     .require("predicate", "object", "key", dtype=str)
     .require("score_name", dtype=str)
     .require("value", "inverse", dtype=np.float64)
+    .reserve("algorithm", dtype=str)
     .reserve("sample", dtype=int)
     .strict()
     .secure()
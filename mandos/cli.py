@@ -53,6 +53,8 @@ class CmdNamespace(DictNamespace):
             CommandInfo(":cache:data", callback=MiscCommands.cache_data),
             CommandInfo(":cache:taxa", callback=MiscCommands.cache_taxa),
             CommandInfo(":cache:g2p", callback=MiscCommands.cache_g2p),
+            CommandInfo(":cache:pubchem-migrate", callback=MiscCommands.cache_pubchem_migrate),
+            CommandInfo(":cache:chembl-targets", callback=MiscCommands.cache_chembl_targets),
             CommandInfo(":cache:clear", callback=MiscCommands.cache_clear),
             CommandInfo(":export:taxa", callback=MiscCommands.export_taxa),
             CommandInfo(":concat", callback=MiscCommands.concat),
@@ -55,6 +55,7 @@ class Entry(Generic[S], metaclass=abc.ABCMeta):
         check: bool,
         log: Optional[Path],
         stderr: Optional[str],
+        workers: int = 1,
     ) -> Searcher:
         LOG_SETUP(log, stderr)
         default_to = path.parent / (built.key + SETTINGS.table_suffix)
@@ -63,7 +64,7 @@ class Entry(Generic[S], metaclass=abc.ABCMeta):
             to, default=default_to, replace=replace or proceed, quiet=True
         )
         input_df = MemoizedInputCompounds.read_file(path)
-        searcher = Searcher(built, input_df, to, restart=replace, proceed=proceed)
+        searcher = Searcher(built, input_df, to, restart=replace, proceed=proceed, workers=workers)
         logger.notice(f"Searching {built.key} [{built.search_class}] on {path}")
         if not check:
             searcher.search()
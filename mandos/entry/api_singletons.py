@@ -1,9 +1,11 @@
+import functools
 import inspect
 
 import decorateme
 
 from mandos.model.apis.caching_pubchem_api import CachingPubchemApi
 from mandos.model.apis.chembl_api import ChemblApi
+from mandos.model.apis.chembl_db_api import ChemblDbApi
 from mandos.model.apis.chembl_scrape_api import (
     CachingChemblScrapeApi,
     ChemblScrapeApi,
@@ -18,12 +20,12 @@ from mandos.model.apis.pubchem_similarity_api import (
 )
 from mandos.model.apis.querying_pubchem_api import QueryingPubchemApi
 from mandos.model.apis.similarity_api import SimilarityApi
+from mandos.model.settings import QUERY_EXECUTORS, SETTINGS
 from mandos.model.utils.setup import logger
 
 
 @decorateme.auto_utils()
 class Apis:
-
     Pubchem: PubchemApi = None
     Chembl: ChemblApi = None
     ChemblScrape: ChemblScrapeApi = None
@@ -62,10 +64,16 @@ class Apis:
         scrape: bool = True,
         similarity: bool = True,
     ) -> None:
-        if chembl:
-            from chembl_webresource_client.new_client import new_client as _Chembl
+        if chembl and SETTINGS.chembl_db_path is not None:
+            cls.Chembl = ChemblDbApi(SETTINGS.chembl_db_path)
+        elif chembl:
+            from chembl_webresource_client.new_client import client_from_url
+            from chembl_webresource_client.settings import Settings as ChemblSettings
 
-            cls.Chembl = ChemblApi.wrap(_Chembl)
+            # the client is not known to be thread-safe, so each worker thread gets its own
+            url = ChemblSettings.Instance().NEW_CLIENT_URL + "/spore"
+            factory = functools.partial(client_from_url, url)
+            cls.Chembl = ChemblApi.wrap_per_thread(factory, QUERY_EXECUTORS.chembl)
         if pubchem:
             cls.Pubchem = CachingPubchemApi(QueryingPubchemApi())
         if hmdb:
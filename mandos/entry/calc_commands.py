@@ -158,7 +158,7 @@ class CalcCommands:
 
             Allowed values: {ArgUtils.list(BoolAlg)}
             """,
-            default="alpha",
+            default="weighted",
         ),
         real_alg: Optional[str] = Opt.val(
             rf"""
@@ -260,6 +260,24 @@ class CalcCommands:
             default=0,
         ),
         exclude: Optional[List[str]] = Opt.val(r"""Exclude a key (pass as many times as needed"""),
+        block_size: int = Opt.val(
+            r"""
+            Split keys with more compounds than this into blocks of compound pairs.
+
+            Blocks are saved as they finish, so an interrupted run resumes from the last block.
+            Blocked results leave out the empty (NaN) half of the matrix.
+            If 0, each key is calculated at once.
+            """,
+            default=0,
+            min=0,
+        ),
+        procs: int = Opt.val(
+            r"""
+            Number of processes to calculate blocks in (requires --block-size).
+            """,
+            default=1,
+            min=1,
+        ),
         keep_temp: bool = Opt.flag(r"""Keep temporary per-key files."""),
         to: Path = Aa.out_matrix_long_form,
         replace: bool = Ca.replace,
@@ -282,6 +300,8 @@ class CalcCommands:
             min_nonzero=min_nonzero,
             min_hits=min_hits,
             exclude=exclude,
+            block_size=block_size if block_size > 0 else None,
+            n_procs=procs,
         )
         calculator.calc_all(path, to, keep_temp=keep_temp)
 
@@ -373,7 +393,7 @@ class CalcCommands:
         to = EntryUtils.adjust_filename(to, default, replace)
         phi = SimilarityDfLongForm.read_file(phi)
         psi = SimilarityDfLongForm.read_file(psi)
-        calculator = ConcordanceCalculation.create(algorithm, phi, psi, samples, seed)
+        calculator = ConcordanceCalculation.create(algorithm, samples, seed)
         concordance = calculator.calc_all(phi, psi)
         concordance.write_file(to)
         logger.notice(f"Wrote {len(concordance):,} rows to {to}")
@@ -78,6 +78,7 @@ class EntryChemblBinding(Entry[BindingSearch]):
         check: bool = EntryArgs.check,
         log: Optional[Path] = CommonArgs.log,
         stderr: str = CommonArgs.stderr,
+        workers: int = CommonArgs.workers,
     ) -> Searcher:
         """
         Binding data from ChEMBL.
@@ -101,7 +102,7 @@ class EntryChemblBinding(Entry[BindingSearch]):
             min_pchembl=pchembl,
             binds_cutoff=binding,
         )
-        return cls._run(built, path, to, replace, proceed, check, log, stderr)
+        return cls._run(built, path, to, replace, proceed, check, log, stderr, workers)
 
 
 class EntryChemblMechanism(Entry[MechanismSearch]):
@@ -122,6 +123,7 @@ class EntryChemblMechanism(Entry[MechanismSearch]):
         check: bool = EntryArgs.check,
         log: Optional[Path] = CommonArgs.log,
         stderr: str = CommonArgs.stderr,
+        workers: int = CommonArgs.workers,
     ) -> Searcher:
         """
         Mechanism of action (MOA) data from ChEMBL.
@@ -139,7 +141,7 @@ class EntryChemblMechanism(Entry[MechanismSearch]):
             allowed_target_types=ArgUtils.get_target_types(target_types),
             min_confidence_score=min_confidence,
         )
-        return cls._run(built, path, to, replace, proceed, check, log, stderr)
+        return cls._run(built, path, to, replace, proceed, check, log, stderr, workers)
 
 
 class ChemblQsarPredictions(Entry[TargetPredictionSearch]):
@@ -200,6 +202,7 @@ class EntryChemblTrials(Entry[IndicationSearch]):
         check: bool = EntryArgs.check,
         log: Optional[Path] = CommonArgs.log,
         stderr: str = CommonArgs.stderr,
+        workers: int = CommonArgs.workers,
     ) -> Searcher:
         """
         Diseases from clinical trials listed in ChEMBL.
@@ -207,7 +210,7 @@ class EntryChemblTrials(Entry[IndicationSearch]):
         OBJECT: The name of the disease (in MeSH)
         """
         built = IndicationSearch(key=key, api=Apis.Chembl, min_phase=min_phase)
-        return cls._run(built, path, to, replace, proceed, check, log, stderr)
+        return cls._run(built, path, to, replace, proceed, check, log, stderr, workers)
 
 
 class EntryChemblAtc(Entry[AtcSearch]):
@@ -225,6 +228,7 @@ class EntryChemblAtc(Entry[AtcSearch]):
         check: bool = EntryArgs.check,
         log: Optional[Path] = CommonArgs.log,
         stderr: str = CommonArgs.stderr,
+        workers: int = CommonArgs.workers,
     ) -> Searcher:
         """
         ATC codes from ChEMBL.
@@ -234,7 +238,7 @@ class EntryChemblAtc(Entry[AtcSearch]):
         built = AtcSearch(
             key=key, api=Apis.Chembl, levels={int(x.strip()) for x in levels.split(",")}
         )
-        return cls._run(built, path, to, replace, proceed, check, log, stderr)
+        return cls._run(built, path, to, replace, proceed, check, log, stderr, workers)
 
 
 class _EntryChemblGo(Entry[GoSearch], metaclass=abc.ABCMeta):
@@ -266,6 +270,7 @@ class _EntryChemblGo(Entry[GoSearch], metaclass=abc.ABCMeta):
         check: bool = EntryArgs.check,
         log: Optional[Path] = CommonArgs.log,
         stderr: str = CommonArgs.stderr,
+        workers: int = CommonArgs.workers,
     ) -> Searcher:
         """
         See the docs for the specific entries.
@@ -293,7 +298,7 @@ class _EntryChemblGo(Entry[GoSearch], metaclass=abc.ABCMeta):
         except (TypeError, ValueError):
             raise InjectionError(f"Failed to build {binding_clazz.__qualname__}")
         built = GoSearch(key, api, cls.go_type(), binding_search)
-        return cls._run(built, path, to, replace, proceed, check, log, stderr)
+        return cls._run(built, path, to, replace, proceed, check, log, stderr, workers)
 
 
 class EntryGoFunction(_EntryChemblGo):
@@ -320,6 +325,7 @@ class EntryGoFunction(_EntryChemblGo):
         check: bool = EntryArgs.check,
         log: Optional[Path] = CommonArgs.log,
         stderr: str = CommonArgs.stderr,
+        workers: int = CommonArgs.workers,
     ) -> Searcher:
         """
         GO Function terms associated with ChEMBL binding targets.
@@ -356,6 +362,7 @@ class EntryGoProcess(_EntryChemblGo):
         check: bool = EntryArgs.check,
         log: Optional[Path] = CommonArgs.log,
         stderr: str = CommonArgs.stderr,
+        workers: int = CommonArgs.workers,
     ) -> Searcher:
         """
         GO Process terms associated with ChEMBL binding targets.
@@ -392,6 +399,7 @@ class EntryGoComponent(_EntryChemblGo):
         check: bool = EntryArgs.check,
         log: Optional[Path] = CommonArgs.log,
         stderr: str = CommonArgs.stderr,
+        workers: int = CommonArgs.workers,
     ) -> Searcher:
         """
         GO Component terms associated with ChEMBL binding targets.
@@ -421,6 +429,7 @@ class EntryPubchemTrials(Entry[TrialSearch]):
         check: bool = EntryArgs.check,
         log: Optional[Path] = CommonArgs.log,
         stderr: str = CommonArgs.stderr,
+        workers: int = CommonArgs.workers,
     ) -> Searcher:
         """
         Diseases from clinical trials listed in clinicaltrials.gov.
@@ -431,7 +440,7 @@ class EntryPubchemTrials(Entry[TrialSearch]):
         built = TrialSearch(
             key=key, api=Apis.Pubchem, min_phase=min_phase, statuses=statuses, explicit=req_explicit
         )
-        return cls._run(built, path, to, replace, proceed, check, log, stderr)
+        return cls._run(built, path, to, replace, proceed, check, log, stderr, workers)
 
 
 class EntryPubchemDisease(Entry[DiseaseSearch]):
@@ -448,6 +457,7 @@ class EntryPubchemDisease(Entry[DiseaseSearch]):
         check: bool = EntryArgs.check,
         log: Optional[Path] = CommonArgs.log,
         stderr: str = CommonArgs.stderr,
+        workers: int = CommonArgs.workers,
     ) -> Searcher:
         """
         Diseases in the CTD.
@@ -458,7 +468,7 @@ class EntryPubchemDisease(Entry[DiseaseSearch]):
 
         """
         built = DiseaseSearch(key, Apis.Pubchem)
-        return cls._run(built, path, to, replace, proceed, check, log, stderr)
+        return cls._run(built, path, to, replace, proceed, check, log, stderr, workers)
 
 
 class _EntryPubchemCoOccurrence(Entry[U], metaclass=abc.ABCMeta):
@@ -487,11 +497,12 @@ class _EntryPubchemCoOccurrence(Entry[U], metaclass=abc.ABCMeta):
         check: bool = EntryArgs.check,
         log: Optional[Path] = CommonArgs.log,
         stderr: str = CommonArgs.stderr,
+        workers: int = CommonArgs.workers,
     ) -> Searcher:
         """See the docstrings for the individual entries."""
         clazz = cls.get_search_type()
         built = clazz(key, Apis.Pubchem, min_score=min_score, min_articles=min_articles)
-        return cls._run(built, path, to, replace, proceed, check, log, stderr)
+        return cls._run(built, path, to, replace, proceed, check, log, stderr, workers)
 
 
 class EntryPubchemGeneCoOccurrence(_EntryPubchemCoOccurrence[GeneCoOccurrenceSearch]):
@@ -510,6 +521,7 @@ class EntryPubchemGeneCoOccurrence(_EntryPubchemCoOccurrence[GeneCoOccurrenceSea
         check: bool = EntryArgs.check,
         log: Optional[Path] = CommonArgs.log,
         stderr: str = CommonArgs.stderr,
+        workers: int = CommonArgs.workers,
     ) -> Searcher:
         """
         Co-occurrences of genes from PubMed articles.
@@ -540,6 +552,7 @@ class EntryPubchemDiseaseCoOccurrence(_EntryPubchemCoOccurrence[DiseaseCoOccurre
         check: bool = EntryArgs.check,
         log: Optional[Path] = CommonArgs.log,
         stderr: str = CommonArgs.stderr,
+        workers: int = CommonArgs.workers,
     ) -> Searcher:
         """
         Co-occurrences of diseases from PubMed articles.
@@ -570,6 +583,7 @@ class EntryPubchemChemicalCoOccurrence(_EntryPubchemCoOccurrence[ChemicalCoOccur
         check: bool = EntryArgs.check,
         log: Optional[Path] = CommonArgs.log,
         stderr: str = CommonArgs.stderr,
+        workers: int = CommonArgs.workers,
     ) -> Searcher:
         """
         Co-occurrences of chemicals from PubMed articles.
@@ -598,6 +612,7 @@ class EntryPubchemDgi(Entry[DgiSearch]):
         check: bool = EntryArgs.check,
         log: Optional[Path] = CommonArgs.log,
         stderr: str = CommonArgs.stderr,
+        workers: int = CommonArgs.workers,
     ) -> Searcher:
         """
         Drug/gene interactions in the DGIDB.
@@ -610,7 +625,7 @@ class EntryPubchemDgi(Entry[DgiSearch]):
         PREDICATE: "interaction:generic" or "interaction:<type>"
         """
         built = DgiSearch(key, Apis.Pubchem)
-        return cls._run(built, path, to, replace, proceed, check, log, stderr)
+        return cls._run(built, path, to, replace, proceed, check, log, stderr, workers)
 
 
 class EntryPubchemCgi(Entry[CtdGeneSearch]):
@@ -627,6 +642,7 @@ class EntryPubchemCgi(Entry[CtdGeneSearch]):
         check: bool = EntryArgs.check,
         log: Optional[Path] = CommonArgs.log,
         stderr: str = CommonArgs.stderr,
+        workers: int = CommonArgs.workers,
     ) -> Searcher:
         """
         Compound/gene interactions in the DGIDB.
@@ -639,7 +655,7 @@ class EntryPubchemCgi(Entry[CtdGeneSearch]):
         PREDICATE: derived from the interaction type (e.g. "downregulation")
         """
         built = CtdGeneSearch(key, Apis.Pubchem)
-        return cls._run(built, path, to, replace, proceed, check, log, stderr)
+        return cls._run(built, path, to, replace, proceed, check, log, stderr, workers)
 
 
 class EntryDrugbankTarget(Entry[DrugbankTargetSearch]):
@@ -656,6 +672,7 @@ class EntryDrugbankTarget(Entry[DrugbankTargetSearch]):
         check: bool = EntryArgs.check,
         log: Optional[Path] = CommonArgs.log,
         stderr: str = CommonArgs.stderr,
+        workers: int = CommonArgs.workers,
     ) -> Searcher:
         """
         Protein targets from DrugBank.
@@ -665,7 +682,7 @@ class EntryDrugbankTarget(Entry[DrugbankTargetSearch]):
         PREDICATE: "<target_type>:<action>"
         """
         built = DrugbankTargetSearch(key, Apis.Pubchem, {DrugbankTargetType.target})
-        return cls._run(built, path, to, replace, proceed, check, log, stderr)
+        return cls._run(built, path, to, replace, proceed, check, log, stderr, workers)
 
 
 class EntryGeneralFunction(Entry[DrugbankGeneralFunctionSearch]):
@@ -682,6 +699,7 @@ class EntryGeneralFunction(Entry[DrugbankGeneralFunctionSearch]):
         check: bool = EntryArgs.check,
         log: Optional[Path] = CommonArgs.log,
         stderr: str = CommonArgs.stderr,
+        workers: int = CommonArgs.workers,
     ) -> Searcher:
         """
         General functions from DrugBank targets.
@@ -691,7 +709,7 @@ class EntryGeneralFunction(Entry[DrugbankGeneralFunctionSearch]):
         PREDICATE: "<target_type>:<action>"
         """
         built = DrugbankGeneralFunctionSearch(key, Apis.Pubchem, {DrugbankTargetType.target})
-        return cls._run(built, path, to, replace, proceed, check, log, stderr)
+        return cls._run(built, path, to, replace, proceed, check, log, stderr, workers)
 
 
 class EntryDrugbankTransporter(Entry[DrugbankTargetSearch]):
@@ -708,6 +726,7 @@ class EntryDrugbankTransporter(Entry[DrugbankTargetSearch]):
         check: bool = EntryArgs.check,
         log: Optional[Path] = CommonArgs.log,
         stderr: str = CommonArgs.stderr,
+        workers: int = CommonArgs.workers,
     ) -> Searcher:
         """
         PK-related proteins from DrugBank.
@@ -722,7 +741,7 @@ class EntryDrugbankTransporter(Entry[DrugbankTargetSearch]):
             DrugbankTargetType.enzyme,
         }
         built = DrugbankTargetSearch(key, Apis.Pubchem, target_types)
-        return cls._run(built, path, to, replace, proceed, check, log, stderr)
+        return cls._run(built, path, to, replace, proceed, check, log, stderr, workers)
 
 
 class EntryTransporterGeneralFunction(Entry[DrugbankGeneralFunctionSearch]):
@@ -739,6 +758,7 @@ class EntryTransporterGeneralFunction(Entry[DrugbankGeneralFunctionSearch]):
         check: bool = EntryArgs.check,
         log: Optional[Path] = CommonArgs.log,
         stderr: str = CommonArgs.stderr,
+        workers: int = CommonArgs.workers,
     ) -> Searcher:
         """
         DrugBank PK-related protein functions.
@@ -753,7 +773,7 @@ class EntryTransporterGeneralFunction(Entry[DrugbankGeneralFunctionSearch]):
             DrugbankTargetType.enzyme,
         }
         built = DrugbankGeneralFunctionSearch(key, Apis.Pubchem, target_types)
-        return cls._run(built, path, to, replace, proceed, check, log, stderr)
+        return cls._run(built, path, to, replace, proceed, check, log, stderr, workers)
 
 
 class EntryDrugbankDdi(Entry[DrugbankDdiSearch]):
@@ -770,6 +790,7 @@ class EntryDrugbankDdi(Entry[DrugbankDdiSearch]):
         check: bool = EntryArgs.check,
         log: Optional[Path] = CommonArgs.log,
         stderr: str = CommonArgs.stderr,
+        workers: int = CommonArgs.workers,
     ) -> Searcher:
         """
         Drug/drug interactions listed by DrugBank.
@@ -782,7 +803,7 @@ class EntryDrugbankDdi(Entry[DrugbankDdiSearch]):
         PREDICATE: typically increase/decrease/change followed by risk/activity/etc.
         """
         built = DrugbankDdiSearch(key, Apis.Pubchem)
-        return cls._run(built, path, to, replace, proceed, check, log, stderr)
+        return cls._run(built, path, to, replace, proceed, check, log, stderr, workers)
 
 
 class EntryPubchemAssay(Entry[BioactivitySearch]):
@@ -801,6 +822,7 @@ class EntryPubchemAssay(Entry[BioactivitySearch]):
         check: bool = EntryArgs.check,
         log: Optional[Path] = CommonArgs.log,
         stderr: str = CommonArgs.stderr,
+        workers: int = CommonArgs.workers,
     ) -> Searcher:
         """
         PubChem bioactivity results.
@@ -816,7 +838,7 @@ class EntryPubchemAssay(Entry[BioactivitySearch]):
         WEIGHT: 2 for confirmatory; 1 otherwise
         """
         built = BioactivitySearch(key, Apis.Pubchem, compound_name_must_match=match_name)
-        return cls._run(built, path, to, replace, proceed, check, log, stderr)
+        return cls._run(built, path, to, replace, proceed, check, log, stderr, workers)
 
 
 class EntryDeaSchedule(Entry[BioactivitySearch]):
@@ -833,6 +855,7 @@ class EntryDeaSchedule(Entry[BioactivitySearch]):
         check: bool = EntryArgs.check,
         log: Optional[Path] = CommonArgs.log,
         stderr: str = CommonArgs.stderr,
+        workers: int = CommonArgs.workers,
     ) -> Searcher:
         """
         DEA schedules (PENDING).
@@ -856,6 +879,7 @@ class EntryDeaClass(Entry[BioactivitySearch]):
         check: bool = EntryArgs.check,
         log: Optional[Path] = CommonArgs.log,
         stderr: str = CommonArgs.stderr,
+        workers: int = CommonArgs.workers,
     ) -> Searcher:
         """
         DEA classes (PENDING).
@@ -880,6 +904,7 @@ class EntryChemidPlusAcute(Entry[AcuteEffectSearch]):
         check: bool = EntryArgs.check,
         log: Optional[Path] = CommonArgs.log,
         stderr: str = CommonArgs.stderr,
+        workers: int = CommonArgs.workers,
     ) -> Searcher:
         """
         Acute effect codes from ChemIDPlus.
@@ -891,7 +916,7 @@ class EntryChemidPlusAcute(Entry[AcuteEffectSearch]):
             Apis.Pubchem,
             top_level=level == 1,
         )
-        return cls._run(built, path, to, replace, proceed, check, log, stderr)
+        return cls._run(built, path, to, replace, proceed, check, log, stderr, workers)
 
 
 class EntryChemidPlusLd50(Entry[Ld50Search]):
@@ -908,6 +933,7 @@ class EntryChemidPlusLd50(Entry[Ld50Search]):
         check: bool = EntryArgs.check,
         log: Optional[Path] = CommonArgs.log,
         stderr: str = CommonArgs.stderr,
+        workers: int = CommonArgs.workers,
     ) -> Searcher:
         """
         LD50 acute effects from ChemIDPlus.
@@ -917,7 +943,7 @@ class EntryChemidPlusLd50(Entry[Ld50Search]):
         PREDICATE: "LD50:<route>" (e.g. "LD50:intravenous")
         """
         built = Ld50Search(key, Apis.Pubchem)
-        return cls._run(built, path, to, replace, proceed, check, log, stderr)
+        return cls._run(built, path, to, replace, proceed, check, log, stderr, workers)
 
 
 class EntryPubchemComputed(Entry[ComputedPropertySearch]):
@@ -935,6 +961,7 @@ class EntryPubchemComputed(Entry[ComputedPropertySearch]):
         check: bool = EntryArgs.check,
         log: Optional[Path] = CommonArgs.log,
         stderr: str = CommonArgs.stderr,
+        workers: int = CommonArgs.workers,
     ) -> Searcher:
         """
         Computed properties from PubChem.
@@ -947,7 +974,7 @@ class EntryPubchemComputed(Entry[ComputedPropertySearch]):
         # ComputedPropertySearch standardizes punctuation and casing
         keys = {EntryArgs.ALL_NON_EMPTY_KEYS.get(s.strip(), s) for s in keys.split(",")}
         built = ComputedPropertySearch(key, Apis.Pubchem, descriptors=keys)
-        return cls._run(built, path, to, replace, proceed, check, log, stderr)
+        return cls._run(built, path, to, replace, proceed, check, log, stderr, workers)
 
 
 class EntryG2pInteractions(Entry[G2pInteractionSearch]):
@@ -1047,6 +1074,7 @@ class EntryDrugbankAdmet(Entry[DrugbankTargetSearch]):
         check: bool = EntryArgs.check,
         log: Optional[Path] = CommonArgs.log,
         stderr: str = CommonArgs.stderr,
+        workers: int = CommonArgs.workers,
     ) -> Searcher:
         """
         Enzyme predictions from DrugBank (PENDING).
@@ -1071,6 +1099,7 @@ class EntryDrugbankMetabolites(Entry[DrugbankTargetSearch]):
         check: bool = EntryArgs.check,
         log: Optional[Path] = CommonArgs.log,
         stderr: str = CommonArgs.stderr,
+        workers: int = CommonArgs.workers,
     ) -> Searcher:
         """
         Metabolites from DrugBank (PENDING).
@@ -1095,6 +1124,7 @@ class EntryDrugbankDosage(Entry[DrugbankTargetSearch]):
         check: bool = EntryArgs.check,
         log: Optional[Path] = CommonArgs.log,
         stderr: str = CommonArgs.stderr,
+        workers: int = CommonArgs.workers,
     ) -> Searcher:
         """
         Dosage from DrugBank (PENDING).
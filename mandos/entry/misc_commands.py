@@ -31,6 +31,7 @@ from mandos.analysis.io_defns import (
 )
 from mandos.analysis.reification import Reifier
 from mandos.entry import entry
+from mandos.entry.api_singletons import Apis
 from mandos.entry.tools.docs import Documenter
 from mandos.entry.tools.fillers import CompoundIdFiller, IdMatchDf
 from mandos.entry.tools.multi_searches import MultiSearch, SearchConfigDf
@@ -38,7 +39,13 @@ from mandos.entry.tools.searchers import InputCompoundsDf
 from mandos.entry.utils._arg_utils import Arg, ArgUtils, EntryUtils, Opt
 from mandos.entry.utils._common_args import CommonArgs
 from mandos.entry.utils._common_args import CommonArgs as Ca
+from mandos.model.apis.chembl_support.chembl_target_store import ChemblTargetStores
 from mandos.model.apis.g2p_api import CachingG2pApi
+from mandos.model.apis.pubchem_support.pubchem_stores import (
+    DirPubchemStore,
+    PubchemStores,
+    SqlitePubchemStore,
+)
 from mandos.model.hit_dfs import HitDf
 from mandos.model.settings import SETTINGS
 from mandos.model.taxonomy import TaxonomyDf
@@ -73,6 +80,14 @@ class MiscCommands:
         replace: bool = Opt.flag(r"""Overwrite completed and partially completed searches."""),
         proceed: bool = Opt.flag(r"""Continue partially completed searches."""),
         check: bool = Opt.flag("Check and write docs file only; do not run"),
+        workers: int = Ca.workers,
+        fused: bool = Opt.flag(
+            r"""
+            Fetch PubChem data once per compound for all PubChem searches.
+
+            The PubChem searches run together, after the other searches.
+            """
+        ),
     ) -> None:
         r"""
         Run multiple searches.
@@ -86,7 +101,7 @@ class MiscCommands:
         if config_fmt is not FileFormat.toml:
             logger.caution(f"Config format is {config_fmt}, not toml; trying anyway")
         config = SearchConfigDf.read_file(config)
-        search = MultiSearch(config, path, out_dir, suffix, replace, proceed, log)
+        search = MultiSearch(config, path, out_dir, suffix, replace, proceed, log, workers, fused)
         if not check:
             search.run()
 
@@ -343,6 +358,8 @@ class MiscCommands:
         (To find manually, follow the ``All lower taxonomy nodes`` link and click ``Download``.)
         Then applies fixes and reduces the file size, creating a new file alongside.
         Puts both the raw data and fixed data in the cache under ``~/.mandos/taxonomy/``.
+        Also writes the tree as memory-mappable arrays, which searches load in milliseconds.
+        Without --replace, writes just those arrays for taxonomies that lack them.
         """
         LOG_SETUP(log, stderr)
         if taxa == "@all" and not replace:
@@ -353,7 +370,7 @@ class MiscCommands:
             taxa = TaxonomyFactories.list_cached_files().keys()
         else:
             taxa = ArgUtils.parse_taxa_ids(taxa)
-        factory.rebuild(taxa, replace=replace)
+        factory.rebuild(*taxa, replace=replace)
 
     @staticmethod
     @entry()
@@ -372,6 +389,47 @@ class MiscCommands:
         api = CachingG2pApi(SETTINGS.g2p_cache_path)
         api.download(force=replace)
 
+    @staticmethod
+    @entry()
+    def cache_pubchem_migrate(
+        log: Optional[Path] = CommonArgs.log,
+        stderr: str = CommonArgs.stderr,
+    ) -> None:
+        """
+        Copies cached PubChem data from .json.gz files into the SQLite cache.
+
+        Reads from ``~/.mandos/pubchem/data/`` and writes ``~/.mandos/pubchem/data.sqlite``.
+        Set "cache.pubchem.backend" to "sqlite" to use it.
+        The .json.gz files are left in place.
+        """
+        LOG_SETUP(log, stderr)
+        source = DirPubchemStore(SETTINGS.pubchem_cache_path)
+        dest = SqlitePubchemStore(PubchemStores.sqlite_path(SETTINGS.pubchem_cache_path))
+        try:
+            dest.migrate_from(source)
+        finally:
+            dest.close()
+
+    @staticmethod
+    @entry()
+    def cache_chembl_targets(
+        log: Optional[Path] = CommonArgs.log,
+        stderr: str = CommonArgs.stderr,
+    ) -> None:
+        """
+        Downloads all ChEMBL targets and the relations between them.
+
+        Writes ``~/.mandos/chembl/targets.sqlite``, under the release in "cache.chembl.release".
+        Searches then traverse the target hierarchy without querying ChEMBL.
+        Targets and relations are otherwise stored there as they are found.
+        """
+        LOG_SETUP(log, stderr)
+        if SETTINGS.chembl_release is None:
+            raise XValueError("Set cache.chembl.release (e.g. ChEMBL_29) to cache targets")
+        store = ChemblTargetStores.default()
+        store.prefetch_all(Apis.Chembl)
+        logger.notice(f"Stored {store.n_targets:,} targets in {store.path}")
+
     @staticmethod
     @entry()
     def cache_clear(
@@ -427,11 +485,13 @@ class MiscCommands:
             dfs.append(df)
         default = path / (",".join(names) + DEF_SUFFIX)
         to = EntryUtils.adjust_filename(to, default, replace)
-        df = HitDf.of(dfs, keys=names)
+        # older files have universal IDs that are only meaningful within the process that made them
+        df = HitDf.concat(dfs, keys=names).with_universal_ids()
         logger.notice(f"Concatenated {len(files):,} files")
         for f_, df_ in zip(files, dfs):
             logger.success(f"Included: {f_.name} with {len(df_):,} rows")
-        counts = {k: v for k, v in df.group_by("universal_id").count().to_dict() if v > 0}
+        counts = df["universal_id"].value_counts()
+        counts = counts[counts > 1].to_dict()
         if len(counts) > 0:
             logger.error(
                 f"There are {len(counts):,} universal IDs with duplicates!"
@@ -495,10 +555,10 @@ class MiscCommands:
         LOG_SETUP(log, stderr)
         default = f"{path}-statements.nt"
         to = EntryUtils.adjust_filename(to, default, replace)
-        hits = HitDf.read_file(path).to_hits()
-        with to.open() as f:
-            for hit in hits:
-                f.write(hit.to_triple.n_triples)
+        triples = HitDf.read_file(path).to_triples()
+        with to.open("w") as f:
+            for triple in triples:
+                f.write(triple.n_triples + "\n")
 
     @staticmethod
     @entry()
@@ -4,13 +4,14 @@ from dataclasses import dataclass
 from typing import Any, Mapping, MutableMapping, Optional, Tuple
 
 import pandas as pd
-from pocketutils.core.exceptions import XValueError
+from pocketutils.core.exceptions import DownloadError, XValueError
 from pocketutils.tools.common_tools import CommonTools
 from typeddfs import TypedDfs
 
 from mandos.entry.api_singletons import Apis
 from mandos.model import CompoundNotFoundError, CompoundStruct
 from mandos.model.apis.chembl_support.chembl_utils import ChemblUtils
+from mandos.model.apis.pubchem_resolver import PubchemResolver
 from mandos.model.apis.pubchem_support.pubchem_data import PubchemData
 from mandos.model.utils.setup import logger
 
@@ -71,6 +72,8 @@ class CompoundIdFiller:
     def fill(self, df: IdMatchDf) -> IdMatchDf:
         df = self._prep(df)
         logger.info(f"Processing {len(df)} input compounds")
+        if self.pubchem:
+            self._resolve_pubchem(df)
         fill = []
         for i, row in enumerate(df.itertuples()):
             if i % 200 == 0 and i > 0:
@@ -206,6 +209,27 @@ class CompoundIdFiller:
         df = df.drop_cols(drop_cols)
         return df
 
+    def _resolve_pubchem(self, df: IdMatchDf) -> None:
+        # look up all of the uncached CIDs and InChI Keys in a few big requests first
+        # so that fetching data doesn't need to find each compound one by one
+        api = Apis.Pubchem
+        inchikeys = df["origin_inchikey"] if "origin_inchikey" in df.columns else []
+        cids = df["origin_pubchem_id"] if "origin_pubchem_id" in df.columns else []
+        inchikeys = [k for k in inchikeys if not CommonTools.is_probable_null(k)]
+        cids = [int(c) for c in cids if not CommonTools.is_probable_null(c)]
+        inchikeys = [k for k in inchikeys if not api.is_cached(k)]
+        cids = [c for c in cids if not api.is_cached(c)]
+        if len(inchikeys) == len(cids) == 0:
+            return
+        try:
+            resolution = PubchemResolver().resolve(inchikeys=inchikeys, cids=cids)
+        except (OSError, ValueError, DownloadError):
+            logger.opt(exception=True).warning(
+                "Failed to resolve compounds in PubChem; will look them up one at a time"
+            )
+            return
+        api.use_resolution(resolution)
+
     def _get_pubchem(self, inchikey: Optional[str], cid: Optional[int]) -> Optional[CompoundStruct]:
         logger.info(f"Fetching PubChem {inchikey} / {cid}")
         api = Apis.Pubchem
@@ -11,17 +11,19 @@ from typing import Any, Mapping, MutableMapping, Optional, Sequence, Type, Union
 
 import pandas as pd
 import typer
-from pocketutils.core.exceptions import InjectionError, PathExistsError
+from pocketutils.core.exceptions import InjectionError, PathExistsError, XValueError
 from typeddfs import Checksums, TypedDfs
 from typeddfs.abs_dfs import AbsDf
 
 from mandos.entry.abstract_entries import Entry
 from mandos.entry.api_singletons import Apis
 from mandos.entry.entry_commands import Entries
+from mandos.entry.tools.searchers import FusedPubchemSearcher, Searcher
 from mandos.entry.utils._arg_utils import EntryUtils
 from mandos.model.hit_dfs import HitDf
 from mandos.model.settings import SETTINGS
 from mandos.model.utils.setup import LOG_SETUP, logger
+from mandos.search.pubchem import PubchemSearch
 
 cli = typer.Typer()
 
@@ -75,6 +77,8 @@ class MultiSearch:
     restart: bool
     proceed: bool
     log_path: Optional[Path]
+    workers: int = 1
+    fused: bool = False
 
     @property
     def final_path(self) -> Path:
@@ -97,24 +101,50 @@ class MultiSearch:
             raise PathExistsError(f"{self.final_path} exists")
         commands = self._build_and_test()
         # start!
-        for cmd in commands:
-            cmd.run()
+        if self.fused:
+            self._run_fused(commands)
+        else:
+            for cmd in commands:
+                cmd.run()
         logger.notice("Done with all searches!")
         self._write_final(commands)
 
+    def _run_fused(self, commands: Sequence[CmdRunner]) -> None:
+        # PubChem searches all read the same per-compound data, so fetch it once for all of them
+        fusable = [cmd for cmd in commands if cmd.is_pubchem]
+        for cmd in commands:
+            if not cmd.is_pubchem:
+                cmd.run()
+        if len(fusable) > 0:
+            searchers = [cmd.searcher() for cmd in fusable]
+            # the searches run together, so they share one log file
+            LOG_SETUP(self._get_log_path("fused"), None)
+            logger.notice(f"Running {len(fusable)} PubChem searches together")
+            FusedPubchemSearcher(searchers, workers=self.workers).search()
+
+    def _check_fused(self, commands: Sequence[CmdRunner]) -> None:
+        for cmd in commands:
+            if cmd.is_pubchem and cmd.params["workers"] != self.workers:
+                raise XValueError(
+                    f"Search {cmd.key} sets workers={cmd.params['workers']}, but fused searches"
+                    + f" all use the same workers (here, {self.workers})"
+                )
+
     def _write_final(self, commands: Sequence[CmdRunner]):
         # write the final file
-        df = HitDf.of([HitDf.read_file(cmd.output_path) for cmd in commands])
+        df = HitDf.concat([HitDf.read_file(cmd.output_path) for cmd in commands])
         now = datetime.now().isoformat(timespec="milliseconds")
         docs = self.get_docs(commands)
         SearchExplainDf([pd.Series(x) for x in docs]).pretty_print(to=self.doc_path)
         df = df.set_attrs(commands=docs, written=now)
+        # run() already refused to replace the file
+        # typeddfs treats the new, empty file hash as a conflict unless overwrite=True
         df.write_file(
             self.final_path,
             dir_hash=True,
             file_hash=True,
             attrs=True,
-            overwrite=self.restart,
+            overwrite=True,
         )
         logger.notice(f"Concatenated results to {self.final_path}")
 
@@ -134,6 +164,8 @@ class MultiSearch:
             except Exception:
                 logger.error(f"Bad search {cmd}")
                 raise
+        if self.fused:
+            self._check_fused(commands)
         logger.success("Searches look ok")
         return commands
 
@@ -160,7 +192,13 @@ class MultiSearch:
             )
             data["log"] = self._get_log_path(key)
             data["stderr"] = None  # MANDOS_SETUP.main.level
-            cmd = CmdRunner.build(data, self.input_path, restart=self.restart, proceed=self.proceed)
+            cmd = CmdRunner.build(
+                data,
+                self.input_path,
+                restart=self.restart,
+                proceed=self.proceed,
+                workers=self.workers,
+            )
         return cmd
 
     def get_docs(self, commands: Sequence[CmdRunner]) -> Sequence[Mapping[str, Any]]:
@@ -207,9 +245,27 @@ class CmdRunner:
         with logger.contextualize(key=self.key):
             self.cmd.run(self.input_path, **self.params)
 
+    @property
+    def is_pubchem(self) -> bool:
+        return issubclass(self.cmd.get_search_type(), PubchemSearch)
+
+    def searcher(self) -> Searcher:
+        """
+        Builds the :class:`Searcher` without running it.
+        Does not log to this search's log file; the caller should set up logging afterward.
+        """
+        with logger.contextualize(key=self.key):
+            return self.cmd.run(self.input_path, **{**self.params, **dict(check=True, log=None)})
+
     @classmethod
     def build(
-        cls, data: Mapping[str, Any], input_path: Path, *, restart: bool, proceed: bool
+        cls,
+        data: Mapping[str, Any],
+        input_path: Path,
+        *,
+        restart: bool,
+        proceed: bool,
+        workers: int = 1,
     ) -> CmdRunner:
         key, cmd = data["key"], data["source"]
         try:
@@ -218,9 +274,14 @@ class CmdRunner:
             raise InjectionError(f"Search command {cmd} (key {key}) does not exist") from None
         # we need to explicitly add the defaults from the OptionInfo instances
         # add our new stuff after that
+        defaults = cmd.default_param_values()
+        ours = dict(replace=restart, proceed=proceed)
+        # only searches that can use more workers take the option
+        if "workers" in defaults:
+            ours["workers"] = workers
         params = {
-            **cmd.default_param_values(),
-            **dict(replace=restart, proceed=proceed),
+            **defaults,
+            **ours,
             **{k: v for k, v in data.items() if k != "source"},
         }
         return CmdRunner(cmd, params, input_path)
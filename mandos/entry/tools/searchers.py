@@ -4,14 +4,28 @@ Run searches and write files.
 
 from __future__ import annotations
 
+import contextvars
 import functools
+import itertools
 import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from dataclasses import dataclass
 from datetime import timedelta
 from pathlib import Path
-from typing import Sequence
+from typing import (
+    AbstractSet,
+    Callable,
+    Deque,
+    Iterator,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+    TypeVar,
+)
 
-from pocketutils.core.exceptions import IllegalStateError
+from pocketutils.core.exceptions import IllegalStateError, XTypeError, XValueError
 from typeddfs import Checksums, TypedDfs
 
 from mandos.model import CompoundNotFoundError
@@ -20,7 +34,12 @@ from mandos.model.hits import AbstractHit
 from mandos.model.search_caches import SearchCache
 from mandos.model.searches import Search, SearchError
 from mandos.model.settings import SETTINGS
+from mandos.model.utils import unlink
 from mandos.model.utils.setup import logger
+from mandos.search.chembl import ChemblSearch
+from mandos.search.pubchem import PubchemSearch
+
+T = TypeVar("T")
 
 
 def _fix_cols(df):
@@ -60,6 +79,18 @@ class Searcher:
     """
     Executes one or more searches and saves the results.
     Create and use once.
+
+    If ``workers`` is more than 1, calls ``find`` on up to that many compounds at once in threads.
+    Results are still collected, saved, and marked done in input order.
+    Only PubChem and ChEMBL searches can use more than 1 worker;
+    the other APIs are not known to be safe to share between threads.
+    For ChEMBL, the API must be safe to share, as from :meth:`ChemblApi.wrap_per_thread`.
+    If the search has a ``batch_size`` above 1,
+    compounds are passed to ``prefetch`` in batches first.
+
+    Every ``SETTINGS.save_every`` compounds, only the hits found since the last checkpoint
+    are written, to a hidden ``.tmp.feather`` part file next to ``to``.
+    The parts are concatenated into ``to`` once at the end.
     """
 
     what: Search
@@ -67,22 +98,63 @@ class Searcher:
     to: Path
     proceed: bool
     restart: bool
+    workers: int = 1
+
+    def __post_init__(self):
+        if self.workers > 1 and not isinstance(self.what, (PubchemSearch, ChemblSearch)):
+            raise XValueError(
+                f"{self.what.key} [{self.what.search_class}] cannot use {self.workers} workers;"
+                + " only PubChem and ChEMBL searches can use more than 1"
+            )
 
     def search(self) -> SearchReturnInfo:
         """
         Performs the search, and writes data.
         """
+        run = self._start()
+        if run is None:
+            return self._complete_info
+        if self.workers > 1:
+            logger.info(f"Using {self.workers} worker threads")
+        try:
+            compounds = self._prefetching(run.compounds())
+            for compound, x in _map_in_order(self._find, compounds, self.workers, self.what.key):
+                run.add(compound, x)
+            return run.finish()
+        finally:
+            run.close()
+
+    def _prefetching(self, compounds: Iterator[str]) -> Iterator[str]:
+        """
+        Yields ``compounds``, calling ``prefetch`` on each batch before yielding it.
+        """
+        n = self.what.batch_size
+        if n < 2:
+            yield from compounds
+            return
+        while True:
+            batch = list(itertools.islice(compounds, n))
+            if len(batch) == 0:
+                return
+            try:
+                self.what.prefetch(batch)
+            except Exception:
+                # find() will query them one at a time instead
+                logger.opt(exception=True).warning(f"Failed to prefetch {len(batch)} compounds")
+            yield from batch
+
+    def _start(self) -> Optional[_SearchRun]:
+        """
+        Prepares the cache and part files, or returns None if the output is already complete.
+        """
         inchikeys = self.input_df["inchikey"].unique()
         if self.is_complete:
             logger.info(f"{self.to} already complete")
-            return SearchReturnInfo(
-                n_kept=len(inchikeys), n_processed=0, n_errored=0, time_taken=timedelta(seconds=0)
-            )
+            return None
         logger.info(f"Will save every {SETTINGS.save_every} compounds")
         logger.info(f"Writing {self.what.key} to {self.to}")
-        annotes = []
-        compounds_run = set()
         cache = SearchCache(self.to, inchikeys, restart=self.restart, proceed=self.proceed)
+        self._prep_parts(fresh=cache.at == 0)
         # refresh so we know it's (no longer) complete
         # this would only happen if we're forcing this -- which is not currently allowed
         (
@@ -91,54 +163,45 @@ class Searcher:
             .remove(self.to, missing_ok=True)
             .write(rm_if_empty=True)
         )
-        t0, n0, n_proc, n_err, n_annot = time.monotonic(), cache.at, 0, 0, 0
-        while True:
-            try:
-                compound = cache.next()
-            except StopIteration:
-                break
-            try:
-                with logger.contextualize(compound=compound):
-                    x = self.what.find(compound)
-                annotes.extend(x)
-            except CompoundNotFoundError:
-                logger.info(f"Compound {compound} not found for {self.what.key}")
-                x = []
-                n_err += 1
-            except Exception:
-                raise SearchError(
-                    f"Failed {self.what.key} [{self.what.search_class}] on compound {compound}",
-                    compound=compound,
-                    search_key=self.what.key,
-                    search_class=self.what.search_class,
-                )
-            compounds_run.add(compound)
-            logger.debug(f"Found {len(x)} {self.what.search_name()} annotations for {compound}")
-            n_annot += len(x)
-            n_proc += 1
-            # logging, caching, and such:
-            on_nth = cache.at % SETTINGS.save_every == SETTINGS.save_every - 1
-            is_last = cache.at == len(inchikeys) - 1
-            if on_nth or is_last:
-                logger.log(
-                    "NOTICE" if is_last else "INFO",
-                    f"Found {len(annotes)} {self.what.search_name()} annotations"
-                    + f" for {cache.at} of {len(inchikeys)} compounds",
-                )
-                self._save(annotes, done=is_last)
-            cache.save(*compounds_run)  # CRITICAL -- do this AFTER saving
-        # done!
-        i1, t1 = cache.at, time.monotonic()
-        assert i1 == len(inchikeys)
-        cache.kill()
-        logger.success(f"Wrote {self.what.key} to {self.to}")
+        return _SearchRun(self, cache, len(inchikeys))
+
+    @property
+    def _complete_info(self) -> SearchReturnInfo:
         return SearchReturnInfo(
-            n_kept=n0, n_processed=n_proc, n_errored=n_err, time_taken=timedelta(seconds=t1 - t0)
+            n_kept=self.input_df["inchikey"].nunique(),
+            n_processed=0,
+            n_errored=0,
+            time_taken=timedelta(seconds=0),
         )
 
+    def _find(self, compound: str) -> Optional[Sequence[AbstractHit]]:
+        self.what.stamp()
+        return self._guard(compound, lambda: self.what.find(compound))
+
+    def _guard(self, compound: str, fn: Callable[[], T]) -> Optional[T]:
+        """
+        Calls ``fn``, returning None if the compound was not found.
+
+        Raises:
+            SearchError: If ``fn`` raises anything else
+        """
+        try:
+            with logger.contextualize(compound=compound):
+                return fn()
+        except CompoundNotFoundError:
+            logger.info(f"Compound {compound} not found for {self.what.key}")
+            return None
+        except Exception:
+            raise SearchError(
+                f"Failed {self.what.key} [{self.what.search_class}] on compound {compound}",
+                compound=compound,
+                search_key=self.what.key,
+                search_class=self.what.search_class,
+            )
+
     @property
     def is_partial(self) -> bool:
-        return self.to.exists() and not self.is_complete
+        return (self.to.exists() or len(self._part_paths()) > 0) and not self.is_complete
 
     @property
     def is_complete(self) -> bool:
@@ -147,8 +210,36 @@ class Searcher:
             raise IllegalStateError(f"{self.to} marked complete but does not exist")
         return done
 
-    def _save(self, hits: Sequence[AbstractHit], *, done: bool) -> None:
+    def _prep_parts(self, *, fresh: bool) -> None:
+        for part in self._part_paths():
+            # the hash file is written last, so a part without one is incomplete
+            # its compounds were not marked done, so they'll be searched again
+            if fresh or not Checksums().get_filesum_of_file(part).exists():
+                self._unlink_part(part)
+        if not fresh:
+            logger.info(f"Keeping {len(self._part_paths())} saved parts for {self.to}")
+
+    def _save_part(self, hits: Sequence[AbstractHit]) -> None:
+        if len(hits) == 0:
+            return
+        parts = self._part_paths()
+        i = int(parts[-1].name[len(self._part_prefix) :].split(".")[0]) + 1 if parts else 0
+        path = self.to.parent / f"{self._part_prefix}{i:06}.tmp.feather"
         df = HitDf.from_hits(hits)
+        df.write_file(path, mkdirs=True, file_hash=True, dir_hash=False, attrs=False)
+        logger.debug(f"Saved {len(df)} rows to {path}")
+
+    def _save(self) -> None:
+        parts = self._part_paths()
+        # a compound might be in two parts if we were killed between saving and marking it done
+        # its hits are always in a single part, so keep the hits from its last part
+        dfs, seen = [], set()
+        for part in reversed(parts):
+            df = HitDf.read_file(part)
+            df = df[~df["origin_inchikey"].isin(seen)]
+            seen.update(df["origin_inchikey"].unique())
+            dfs.append(df)
+        df = HitDf.concat(list(reversed(dfs))) if len(dfs) > 0 else HitDf.new_df()
         # keep all of the original extra columns from the input
         # e.g. if the user had 'inchi' or 'smiles' or 'pretty_name'
         # if "origin_inchikey" not in df.columns:
@@ -159,8 +250,217 @@ class Searcher:
         df: HitDf = HitDf.of(df)
         params = self.what.get_params()
         df = df.set_attrs(**params, key=self.what.key)
-        df.write_file(self.to, mkdirs=True, attrs=True, dir_hash=done)
-        logger.debug(f"Saved {len(df)} rows to {self.to}")
+        df.write_file(self.to, mkdirs=True, attrs=True, dir_hash=True)
+        logger.debug(f"Saved {len(df)} rows from {len(parts)} parts to {self.to}")
+        for part in parts:
+            self._unlink_part(part)
+
+    def _unlink_part(self, part: Path) -> None:
+        # also removes its hash file
+        unlink(part, missing_ok=True, rm_if_empty=True)
+
+    def _part_paths(self) -> Sequence[Path]:
+        if not self.to.parent.exists():
+            return []
+        return sorted(
+            p
+            for p in self.to.parent.iterdir()
+            if p.name.startswith(self._part_prefix) and p.name.endswith(".tmp.feather")
+        )
+
+    @property
+    def _part_prefix(self) -> str:
+        return f".{self.to.name}.part-"
+
+
+class _SearchRun:
+    """
+    The progress of a single :meth:`Searcher.search`, fed one compound at a time in input order.
+    """
+
+    def __init__(self, searcher: Searcher, cache: SearchCache, n_total: int):
+        self.searcher = searcher
+        self.cache = cache
+        self.n_total = n_total
+        self.t0, self.n0, self.n_proc, self.n_err, self.n_annot = (
+            time.monotonic(),
+            cache.at,
+            0,
+            0,
+            0,
+        )
+        # only since the last checkpoint:
+        self.annotes, self.compounds_run = [], []
+
+    def compounds(self) -> Iterator[str]:
+        while True:
+            try:
+                yield self.cache.next()
+            except StopIteration:
+                return
+
+    def add(self, compound: str, x: Optional[Sequence[AbstractHit]]) -> None:
+        what = self.searcher.what
+        if x is None:
+            x = []
+            self.n_err += 1
+        else:
+            self.annotes.extend(x)
+        self.compounds_run.append(compound)
+        logger.debug(f"Found {len(x)} {what.search_name()} annotations for {compound}")
+        self.n_annot += len(x)
+        self.n_proc += 1
+        # logging, caching, and such:
+        n_done = self.n0 + self.n_proc
+        on_nth = n_done % SETTINGS.save_every == 0
+        is_last = n_done == self.n_total
+        if on_nth or is_last:
+            logger.log(
+                "NOTICE" if is_last else "INFO",
+                f"Found {self.n_annot} {what.search_name()} annotations"
+                + f" for {n_done} of {self.n_total} compounds",
+            )
+            self.searcher._save_part(self.annotes)
+            if is_last:
+                self.searcher._save()
+            self.cache.save(*self.compounds_run)  # CRITICAL -- do this AFTER saving
+            self.annotes, self.compounds_run = [], []
+
+    def close(self) -> None:
+        """
+        Closes the progress journal, even if the search failed; it is kept for resuming.
+        """
+        self.cache.close()
+
+    def finish(self) -> SearchReturnInfo:
+        i1, t1 = self.cache.at, time.monotonic()
+        assert i1 == self.n_total
+        self.cache.kill()
+        logger.success(f"Wrote {self.searcher.what.key} to {self.searcher.to}")
+        return SearchReturnInfo(
+            n_kept=self.n0,
+            n_processed=self.n_proc,
+            n_errored=self.n_err,
+            time_taken=timedelta(seconds=t1 - self.t0),
+        )
+
+
+@dataclass(frozen=True, repr=True)
+class FusedPubchemSearcher:
+    """
+    Runs several PubChem searches over the same compounds in a single pass.
+    Fetches each compound's :class:`PubchemData` once and passes it to every search that needs it.
+    Each search still has its own output file, checkpoints, and progress.
+    """
+
+    searchers: Sequence[Searcher]
+    workers: int = 1
+
+    def __post_init__(self):
+        for searcher in self.searchers:
+            if not isinstance(searcher.what, PubchemSearch):
+                raise XTypeError(f"{searcher.what.key} is not a PubChem search")
+        if len({id(searcher.what.api) for searcher in self.searchers}) > 1:
+            raise XValueError("Fused searches must share a PubchemApi")
+        if len({id(searcher.input_df) for searcher in self.searchers}) > 1:
+            raise XValueError("Fused searches must share an input")
+
+    def search(self) -> Mapping[str, SearchReturnInfo]:
+        """
+        Performs the searches, and writes data.
+
+        Returns:
+            A mapping from each search key to its info
+        """
+        infos = {s.what.key: s._complete_info for s in self.searchers}
+        runs = []
+        try:
+            for searcher in self.searchers:
+                run = searcher._start()
+                if run is not None:
+                    runs.append(run)
+            return self._search(runs, infos)
+        finally:
+            for run in runs:
+                run.close()
+
+    def _search(
+        self, runs: Sequence[_SearchRun], infos: Mapping[str, SearchReturnInfo]
+    ) -> Mapping[str, SearchReturnInfo]:
+        infos = dict(infos)
+        todo = {run.searcher.what.key: set(run.compounds()) for run in runs}
+        compounds = [
+            c for c in self.searchers[0].input_df["inchikey"].unique() if self._needed(c, todo)
+        ]
+        keys = ", ".join(todo.keys())
+        logger.notice(f"Fetching PubChem data for {len(compounds)} compounds for: {keys}")
+        fn = functools.partial(self._find, runs=runs, todo=todo)
+        for compound, results in _map_in_order(fn, iter(compounds), self.workers, "pubchem"):
+            for run in runs:
+                if compound in todo[run.searcher.what.key]:
+                    run.add(compound, results[run.searcher.what.key])
+        for run in runs:
+            infos[run.searcher.what.key] = run.finish()
+        return infos
+
+    def _needed(self, compound: str, todo: Mapping[str, AbstractSet[str]]) -> bool:
+        return any(compound in v for v in todo.values())
+
+    def _find(
+        self,
+        compound: str,
+        *,
+        runs: Sequence[_SearchRun],
+        todo: Mapping[str, AbstractSet[str]],
+    ) -> Mapping[str, Optional[Sequence[AbstractHit]]]:
+        needed = [run.searcher for run in runs if compound in todo[run.searcher.what.key]]
+        for searcher in needed:
+            searcher.what.stamp()
+        # if fetching fails, every search would fail in the same way
+        data = needed[0]._guard(
+            compound, functools.partial(needed[0].what.api.fetch_data, compound)
+        )
+        if data is None:
+            return {s.what.key: None for s in needed}
+        return {
+            s.what.key: s._guard(compound, functools.partial(s.what.process, compound, data))
+            for s in needed
+        }
+
+
+def _map_in_order(
+    fn: Callable[[str], T], compounds: Iterator[str], workers: int, name: str
+) -> Iterator[Tuple[str, T]]:
+    """
+    Yields each compound with ``fn(compound)``, in input order.
+    If ``workers`` is more than 1, calls ``fn`` on up to that many compounds at once in threads.
+    """
+    if workers == 1:
+        for compound in compounds:
+            yield compound, fn(compound)
+        return
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=name)
+    # keep the pool busy, but don't run too far ahead of what we've saved
+    pending: Deque[Tuple[str, Future]] = deque()
+    try:
+        for compound in compounds:
+            # copy the context so that logger.contextualize works in the workers
+            ctx = contextvars.copy_context()
+            pending.append((compound, pool.submit(ctx.run, fn, compound)))
+            if len(pending) >= 2 * workers:
+                compound, future = pending.popleft()
+                yield compound, future.result()
+        while len(pending) > 0:
+            compound, future = pending.popleft()
+            yield compound, future.result()
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
 
 
-__all__ = ["InputCompoundsDf", "MemoizedInputCompounds", "Searcher", "SearchReturnInfo"]
+__all__ = [
+    "FusedPubchemSearcher",
+    "InputCompoundsDf",
+    "MemoizedInputCompounds",
+    "Searcher",
+    "SearchReturnInfo",
+]
@@ -21,7 +21,6 @@ nl = "\n\n"
 
 @decorateme.auto_utils()
 class CommonArgs:
-
     replace: bool = Opt.flag(
         r"""
         Replace output file(s) if they exist.
@@ -34,6 +33,19 @@ class CommonArgs:
         """
     )
 
+    workers: int = Opt.val(
+        r"""
+        Number of compounds to search at once.
+
+        Only offered for PubChem and ChEMBL searches.
+        Each compound is still searched by a single thread.
+        Queries share the per-source rate limits (e.g. query.pubchem.delay_sec).
+        Results are written in the input order.
+        """,
+        default=1,
+        min=1,
+    )
+
     skip: bool = Opt.flag(
         """
         Skip output file(s) that exist.
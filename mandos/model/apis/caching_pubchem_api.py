@@ -3,49 +3,86 @@ PubChem caching API.
 """
 from __future__ import annotations
 
-import gzip
-import os
 from pathlib import Path
-from typing import FrozenSet, Optional, Union
+from typing import Optional, Union
 
 import decorateme
-import orjson
-import pandas as pd
-from pocketutils.core.dot_dict import NestedDotDict
-from pocketutils.core.exceptions import XValueError
 
 from mandos.model.apis.pubchem_api import PubchemApi, PubchemCompoundLookupError
+from mandos.model.apis.pubchem_resolver import PubchemResolution
 from mandos.model.apis.pubchem_support.pubchem_data import PubchemData
+from mandos.model.apis.pubchem_support.pubchem_stores import (
+    PubchemStore,
+    PubchemStores,
+    PubchemStoreType,
+)
 from mandos.model.apis.querying_pubchem_api import QueryingPubchemApi
 from mandos.model.settings import SETTINGS
-from mandos.model.utils import unlink
+from mandos.model.utils.memory_caches import MemoryCacheStats, MemoryLruCache
 from mandos.model.utils.setup import logger
 
 
 @decorateme.auto_obj()
 class CachingPubchemApi(PubchemApi):
+    """
+    Reads PubChem data from a :class:`PubchemStore` under ``cache_dir``, downloading it if needed.
+
+    Parsed data is also kept in memory, up to about ``memory_bytes`` (least-recently-used first),
+    so that repeated lookups in one process don't re-read and re-parse the files.
+    """
+
     def __init__(
         self,
         query: Optional[QueryingPubchemApi],
         cache_dir: Path = SETTINGS.pubchem_cache_path,
+        memory_bytes: int = SETTINGS.pubchem_memory_cache_mb * 1024 * 1024,
+        store: Union[None, str, PubchemStoreType, PubchemStore] = None,
     ):
+        if store is None:
+            store = SETTINGS.pubchem_cache_backend
+        if not isinstance(store, PubchemStore):
+            store = PubchemStores.new(cache_dir, store)
         self._cache_dir = cache_dir
         self._query = query
+        self._store = store
+        self._memory = MemoryLruCache("PubChem", memory_bytes)
+
+    @property
+    def store(self) -> PubchemStore:
+        return self._store
+
+    @property
+    def memory_stats(self) -> MemoryCacheStats:
+        return self._memory.stats
 
     def fetch_data(self, inchikey_or_cid: Union[str, int]) -> Optional[PubchemData]:
-        path = self.data_path(inchikey_or_cid)
-        if path.exists():
-            data = self._read_json(path)
+        data = self._memory.get(str(inchikey_or_cid))
+        if data is not None:
+            logger.debug(f"PubChem data for {inchikey_or_cid} in memory ({self._memory.stats})")
+            return data
+        if self._store.contains(inchikey_or_cid):
+            data = self._store.read(inchikey_or_cid)
             if data is None:
                 raise PubchemCompoundLookupError(
                     f"{inchikey_or_cid} previously not found in PubChem"
                 )
             logger.debug(f"Found cached PubChem data for {inchikey_or_cid}: {data.cid}")
-            # self._write_siblings(data)  # TODO: remove
-            return data
         else:
             logger.debug(f"No cached PubChem data for {inchikey_or_cid}")
-        return self._download(inchikey_or_cid)
+            data = self._download(inchikey_or_cid)
+        self._remember(inchikey_or_cid, data)
+        return data
+
+    def is_cached(self, inchikey_or_cid: Union[str, int]) -> bool:
+        return self._store.contains(inchikey_or_cid)
+
+    def use_resolution(self, resolution: PubchemResolution) -> None:
+        if self._query is not None:
+            self._query.use_resolution(resolution)
+
+    def _remember(self, inchikey_or_cid: Union[str, int], data: PubchemData) -> None:
+        if self._memory.max_bytes > 0:
+            self._memory.put(str(inchikey_or_cid), data, data._data.n_bytes_total())
 
     def _download(self, inchikey_or_cid: Union[int, str]) -> PubchemData:
         if self._query is None:
@@ -54,41 +91,12 @@ class CachingPubchemApi(PubchemApi):
         try:
             data: PubchemData = self._query.fetch_data(inchikey_or_cid)
         except PubchemCompoundLookupError:
-            path = self.data_path(inchikey_or_cid)
-            NestedDotDict({}).write_json(path, mkdirs=True)
+            self._store.write_missing(inchikey_or_cid)
             logger.info(f"No PubChem compound found for {inchikey_or_cid}")
-            logger.trace(f"Wrote empty PubChem data to {path}")
             raise
-        cid = data.parent_or_self  # if there's ever a parent of a parent, this will NOT work
-        path = self.data_path(cid)
-        if path.exists():
-            logger.error(f"PubChem data for {inchikey_or_cid} parent CID {cid} exists")
-            logger.error(f"Writing over {path} for {inchikey_or_cid}")
-        else:
-            logger.debug(f"PubChem data for {inchikey_or_cid} parent CID {cid} does not exist")
-        data._data.write_json(path, mkdirs=True)
-        self._write_siblings(data, inchikey_or_cid)
-        logger.debug(f"Wrote PubChem data to {path.resolve()}")
-        logger.success(f"Downloaded PubChem data {cid} for {inchikey_or_cid}")
+        self._store.write(data, inchikey_or_cid)
+        logger.success(f"Downloaded PubChem data {data.parent_or_self} for {inchikey_or_cid}")
         return data
 
-    def _write_siblings(self, data: PubchemData, *others: str):
-        cid = data.parent_or_self
-        path = self.data_path(cid)
-        aliases = {self.data_path(data.inchikey), *data.siblings, *others}
-        for alias in aliases:
-            link = self.data_path(alias)
-            if link != path and link.resolve() != path.resolve():
-                unlink(link, missing_ok=True)
-                path.link_to(link)
-        logger.debug(f"Added aliases {','.join([str(s) for s in aliases])} ⇌ {cid} ({path})")
-
-    def data_path(self, inchikey_or_cid: Union[int, str]) -> Path:
-        return self._cache_dir / "data" / f"{inchikey_or_cid}.json.gz"
-
-    def _read_json(self, path: Path) -> Optional[PubchemData]:
-        dot = NestedDotDict.read_json(path)
-        return PubchemData(dot) if len(dot) > 0 else None
-
 
 __all__ = ["CachingPubchemApi"]
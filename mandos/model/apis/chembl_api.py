@@ -5,11 +5,18 @@ Designed to facilitate testing, but also improves static type checking.
 from __future__ import annotations
 
 import abc
+import threading
 from typing import Any, Callable, Iterator, Mapping, Optional, Sequence
 
 import decorateme
 from pocketutils.core.dot_dict import NestedDotDict
 
+from mandos.model.utils.query_executors import ConcurrentQueryExecutor
+
+
+def _call(executor: Optional[ConcurrentQueryExecutor], fn: Callable[[], Any]) -> Any:
+    return fn() if executor is None else executor.limit(fn)
+
 
 @decorateme.auto_repr_str()
 class ChemblFilterQuery(metaclass=abc.ABCMeta):
@@ -56,24 +63,24 @@ class ChemblFilterQuery(metaclass=abc.ABCMeta):
         return F()
 
     @classmethod
-    def wrap(cls, query):
+    def wrap(cls, query, executor: Optional[ConcurrentQueryExecutor] = None):
         """
         Wraps.
+        If ``executor`` is set, reading results waits for a slot in it.
         """
 
         class F(ChemblFilterQuery):
             def only(self, items: Sequence[str]) -> ChemblFilterQuery:
-                # TODO technically not returning this
-                return getattr(query, "only")(items)
+                return ChemblFilterQuery.wrap(getattr(query, "only")(items), executor)
 
             def __getitem__(self, item: int) -> NestedDotDict:
-                return NestedDotDict(query[item])
+                return NestedDotDict(_call(executor, lambda: query[item]))
 
             def __len__(self) -> int:
-                return len(query)
+                return _call(executor, lambda: len(query))
 
             def __iter__(self) -> Iterator[NestedDotDict]:
-                return iter([NestedDotDict(x) for x in query])
+                return iter([NestedDotDict(x) for x in _call(executor, lambda: list(query))])
 
         return F()
 
@@ -118,18 +125,19 @@ class ChemblEntrypoint:
         return X()
 
     @classmethod
-    def wrap(cls, obj) -> ChemblEntrypoint:
+    def wrap(cls, obj, executor: Optional[ConcurrentQueryExecutor] = None) -> ChemblEntrypoint:
         """
         Wraps.
+        If ``executor`` is set, each request waits for a slot in it.
         """
 
         class X(ChemblEntrypoint):
             def filter(self, **kwargs) -> ChemblFilterQuery:
                 query = getattr(obj, "filter")(**kwargs)
-                return ChemblFilterQuery.wrap(query)
+                return ChemblFilterQuery.wrap(query, executor)
 
             def get(self, arg: str) -> Optional[NestedDotDict]:
-                return NestedDotDict(getattr(obj, "get")(arg))
+                return NestedDotDict(_call(executor, lambda: getattr(obj, "get")(arg)))
 
         return X()
 
@@ -207,6 +215,8 @@ class ChemblApi(metaclass=abc.ABCMeta):
         @decorateme.auto_repr_str()
         class X(ChemblApi):
             def __getattribute__(self, item: str) -> ChemblEntrypoint:
+                if item.startswith("__"):  # e.g. __dict__ for repr
+                    return object.__getattribute__(self, item)
                 return entrypoints[item]
 
         X.__name__ = f"MockedChemblApi({entrypoints})"
@@ -226,6 +236,35 @@ class ChemblApi(metaclass=abc.ABCMeta):
 
         return X()
 
+    @classmethod
+    def wrap_per_thread(
+        cls, factory: Callable[[], Any], executor: ConcurrentQueryExecutor
+    ) -> ChemblApi:
+        """
+        Wraps a separate client for each thread, built by calling ``factory`` in that thread.
+        Can be shared between threads.
+        Every request waits for a slot in ``executor``,
+        which rate-limits all of the threads together.
+        """
+        local = threading.local()
+
+        def client():
+            if not hasattr(local, "client"):
+                local.client = factory()
+            return local.client
+
+        class X(ChemblApi):
+            def __getattribute__(self, item: str) -> ChemblEntrypoint:
+                return ChemblEntrypoint.wrap(getattr(client(), item), executor)
+
+            def __repr__(self):
+                return f"ChemblApi(Per thread: {factory})"
+
+            def __str__(self):
+                return repr(self)
+
+        return X()
+
 
 __all__ = [
     "ChemblApi",
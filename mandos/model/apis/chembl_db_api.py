@@ -0,0 +1,437 @@
+"""
+A ``ChemblApi`` backed by a local copy of a ChEMBL release (the official SQLite dump).
+Mirrors the fields of the REST API for the resources and filters that Mandos uses.
+"""
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Mapping, Optional, Sequence
+from typing import Tuple as Tup
+
+import decorateme
+from pocketutils.core.dot_dict import NestedDotDict
+from pocketutils.core.exceptions import UnsupportedOpError, XValueError
+
+from mandos.model.apis.chembl_api import ChemblApi, ChemblEntrypoint, ChemblFilterQuery
+from mandos.model.utils.setup import logger
+
+_Row = Dict[str, Any]
+_ops = {"exact", "in", "isnull", "flexmatch"}
+# the most values to put in one IN (...); SQLite limits the variables per statement
+_chunk_size = 500
+
+
+def _parent_of(alias: str) -> str:
+    # "{}" is replaced with a condition on the parent's CHEMBL ID (e.g. "IN (?, ?)")
+    # molecules without a row in molecule_hierarchy are their own parents
+    return (
+        f"({alias}.molregno IN (SELECT h.molregno FROM molecule_hierarchy h"
+        + " JOIN molecule_dictionary p ON p.molregno = h.parent_molregno WHERE p.chembl_id {})"
+        + f" OR {alias}.molregno IN (SELECT m.molregno FROM molecule_dictionary m"
+        + " WHERE m.chembl_id {} AND NOT EXISTS"
+        + " (SELECT 1 FROM molecule_hierarchy h2 WHERE h2.molregno = m.molregno)))"
+    )
+
+
+def _parent_join(alias: str) -> str:
+    return (
+        f" JOIN molecule_dictionary md ON md.molregno = {alias}.molregno"
+        + f" LEFT JOIN molecule_hierarchy mh ON mh.molregno = {alias}.molregno"
+        + " LEFT JOIN molecule_dictionary pmd"
+        + f" ON pmd.molregno = COALESCE(mh.parent_molregno, {alias}.molregno)"
+    )
+
+
+@dataclass(frozen=True, repr=True)
+class _Resource:
+    """
+    How a REST resource maps onto the ChEMBL schema.
+
+    Attributes:
+        select: The ``SELECT ... FROM ...`` part, with columns named as in the REST API;
+                a ``__`` in a name nests it (e.g. ``molecule_structures__standard_inchi``),
+                and names starting with ``_`` are only for ``nest``
+        fields: SQL expressions for the fields that can be filtered on
+        key: The field ``get`` looks up
+        order: The ``ORDER BY`` expression
+        nest: Adds nested lists (e.g. a target's components) to the rows, in place
+    """
+
+    select: str
+    fields: Mapping[str, str]
+    key: str
+    order: str
+    nest: Optional[Callable[[_Db, List[_Row]], None]] = field(default=None)
+
+
+class _Db:
+    """
+    A read-only connection, shared between threads.
+    """
+
+    def __init__(self, path: Path):
+        if not path.exists():
+            raise XValueError(f"ChEMBL database {path} does not exist")
+        self.path = path
+        uri = path.resolve().as_uri() + "?mode=ro"
+        self._conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        self._lock = threading.Lock()
+
+    def query(self, sql: str, params: Sequence[Any] = ()) -> List[_Row]:
+        with self._lock:
+            cursor = self._conn.execute(sql, params)
+            names = [d[0] for d in cursor.description]
+            return [dict(zip(names, row)) for row in cursor.fetchall()]
+
+    def query_in(self, sql: str, values: Sequence[Any]) -> List[_Row]:
+        """
+        Runs ``sql`` on chunks of ``values``, replacing ``{}`` with the placeholders.
+        """
+        values = list(dict.fromkeys(values))
+        rows = []
+        for i in range(0, len(values), _chunk_size):
+            chunk = values[i : i + _chunk_size]
+            rows.extend(self.query(sql.format(", ".join(["?"] * len(chunk))), chunk))
+        return rows
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def _nest_atc(db: _Db, rows: List[_Row]) -> None:
+    sql = (
+        "SELECT molregno, level5 FROM molecule_atc_classification"
+        + " WHERE molregno IN ({}) ORDER BY mol_atc_id"
+    )
+    found = {}
+    for r in db.query_in(sql, [row["_molregno"] for row in rows]):
+        found.setdefault(r["molregno"], []).append(r["level5"])
+    for row in rows:
+        row["atc_classifications"] = found.get(row["_molregno"], [])
+
+
+_go_dbs = {"F": "GoFunction", "P": "GoProcess", "C": "GoComponent"}
+
+
+def _nest_components(db: _Db, rows: List[_Row]) -> None:
+    sql = (
+        "SELECT tc.tid, cs.component_id, cs.accession, cs.component_type,"
+        + " cs.description AS component_description, tc.relationship"
+        + " FROM target_components tc"
+        + " JOIN component_sequences cs ON cs.component_id = tc.component_id"
+        + " WHERE tc.tid IN ({}) ORDER BY tc.targcomp_id"
+    )
+    components = db.query_in(sql, [row["_tid"] for row in rows])
+    sql = (
+        "SELECT cg.component_id, gc.go_id, gc.pref_name, gc.aspect FROM component_go cg"
+        + " JOIN go_classification gc ON gc.go_id = cg.go_id"
+        + " WHERE cg.component_id IN ({}) ORDER BY cg.comp_go_id"
+    )
+    xrefs = {}
+    for r in db.query_in(sql, [c["component_id"] for c in components]):
+        xref = dict(
+            xref_src_db=_go_dbs.get(r["aspect"]), xref_id=r["go_id"], xref_name=r["pref_name"]
+        )
+        xrefs.setdefault(r["component_id"], []).append(xref)
+    by_target = {}
+    for c in components:
+        tid = c.pop("tid")
+        by_target.setdefault(tid, []).append(
+            {**c, "target_component_xrefs": xrefs.get(c["component_id"], [])}
+        )
+    for row in rows:
+        row["target_components"] = by_target.get(row["_tid"], [])
+
+
+_resources: Mapping[str, _Resource] = {
+    "activity": _Resource(
+        select=(
+            "SELECT act.activity_id, act.activity_comment, a.chembl_id AS assay_chembl_id,"
+            + " a.description AS assay_description, a.assay_type, act.data_validity_comment,"
+            + " d.chembl_id AS document_chembl_id, md.chembl_id AS molecule_chembl_id,"
+            + " md.pref_name AS molecule_pref_name, pmd.chembl_id AS parent_molecule_chembl_id,"
+            + " act.pchembl_value, act.potential_duplicate, act.record_id, act.relation,"
+            + " act.src_id, act.standard_flag, act.standard_relation, act.standard_type,"
+            + " act.standard_units, act.standard_value, td.chembl_id AS target_chembl_id,"
+            + " td.organism AS target_organism, td.pref_name AS target_pref_name,"
+            + " td.tax_id AS target_tax_id, act.type, act.units, act.value"
+            + " FROM activities act"
+            + _parent_join("act")
+            + " JOIN assays a ON a.assay_id = act.assay_id"
+            + " LEFT JOIN target_dictionary td ON td.tid = a.tid"
+            + " LEFT JOIN docs d ON d.doc_id = act.doc_id"
+        ),
+        fields=dict(
+            activity_id="act.activity_id",
+            assay_chembl_id="a.chembl_id",
+            assay_type="a.assay_type",
+            molecule_chembl_id="md.chembl_id",
+            parent_molecule_chembl_id=_parent_of("act"),
+            pchembl_value="act.pchembl_value",
+            standard_type="act.standard_type",
+            target_chembl_id="td.chembl_id",
+            target_organism="td.organism",
+        ),
+        key="activity_id",
+        order="act.activity_id",
+    ),
+    "assay": _Resource(
+        select=(
+            "SELECT a.chembl_id AS assay_chembl_id, a.assay_category, a.assay_cell_type,"
+            + " a.assay_organism, a.assay_tax_id, a.assay_tissue, a.assay_type,"
+            + " a.confidence_score, a.description, d.chembl_id AS document_chembl_id,"
+            + " a.relationship_type, a.src_id, td.chembl_id AS target_chembl_id"
+            + " FROM assays a"
+            + " LEFT JOIN target_dictionary td ON td.tid = a.tid"
+            + " LEFT JOIN docs d ON d.doc_id = a.doc_id"
+        ),
+        fields=dict(assay_chembl_id="a.chembl_id", assay_type="a.assay_type"),
+        key="assay_chembl_id",
+        order="a.assay_id",
+    ),
+    "atc_class": _Resource(
+        select=(
+            "SELECT who_name, level1, level1_description, level2, level2_description,"
+            + " level3, level3_description, level4, level4_description, level5"
+            + " FROM atc_classification"
+        ),
+        fields=dict(level5="level5"),
+        key="level5",
+        order="level5",
+    ),
+    "drug_indication": _Resource(
+        select=(
+            "SELECT di.drug_ind_id, di.efo_id, di.efo_term, di.max_phase_for_ind,"
+            + " di.mesh_heading, di.mesh_id, md.chembl_id AS molecule_chembl_id,"
+            + " pmd.chembl_id AS parent_molecule_chembl_id, di.record_id"
+            + " FROM drug_indication di"
+            + _parent_join("di")
+        ),
+        fields=dict(
+            drug_ind_id="di.drug_ind_id",
+            molecule_chembl_id="md.chembl_id",
+            parent_molecule_chembl_id=_parent_of("di"),
+        ),
+        key="drug_ind_id",
+        order="di.drug_ind_id",
+    ),
+    "mechanism": _Resource(
+        select=(
+            "SELECT dm.action_type, dm.binding_site_comment, dm.direct_interaction,"
+            + " dm.disease_efficacy, md.max_phase, dm.mec_id, dm.mechanism_comment,"
+            + " dm.mechanism_of_action, dm.molecular_mechanism,"
+            + " md.chembl_id AS molecule_chembl_id, pmd.chembl_id AS parent_molecule_chembl_id,"
+            + " dm.record_id, dm.selectivity_comment, dm.site_id,"
+            + " td.chembl_id AS target_chembl_id"
+            + " FROM drug_mechanism dm"
+            + _parent_join("dm")
+            + " LEFT JOIN target_dictionary td ON td.tid = dm.tid"
+        ),
+        fields=dict(
+            mec_id="dm.mec_id",
+            molecule_chembl_id="md.chembl_id",
+            parent_molecule_chembl_id=_parent_of("dm"),
+            target_chembl_id="td.chembl_id",
+        ),
+        key="mec_id",
+        order="dm.mec_id",
+    ),
+    "molecule": _Resource(
+        select=(
+            "SELECT md.molregno AS _molregno, md.chembl_id AS molecule_chembl_id,"
+            + " md.max_phase, md.molecule_type, md.pref_name, md.structure_type,"
+            + " cs.canonical_smiles AS molecule_structures__canonical_smiles,"
+            + " cs.standard_inchi AS molecule_structures__standard_inchi,"
+            + " cs.standard_inchi_key AS molecule_structures__standard_inchi_key,"
+            + " CASE WHEN mh.molregno IS NULL THEN NULL ELSE md.chembl_id END"
+            + " AS molecule_hierarchy__molecule_chembl_id,"
+            + " pmd.chembl_id AS molecule_hierarchy__parent_chembl_id"
+            + " FROM molecule_dictionary md"
+            + " LEFT JOIN compound_structures cs ON cs.molregno = md.molregno"
+            + " LEFT JOIN molecule_hierarchy mh ON mh.molregno = md.molregno"
+            + " LEFT JOIN molecule_dictionary pmd ON pmd.molregno = mh.parent_molregno"
+        ),
+        fields=dict(
+            molecule_chembl_id="md.chembl_id",
+            molecule_structures__canonical_smiles="cs.canonical_smiles",
+            molecule_structures__standard_inchi_key="cs.standard_inchi_key",
+            pref_name="md.pref_name",
+        ),
+        key="molecule_chembl_id",
+        order="md.molregno",
+        nest=_nest_atc,
+    ),
+    "target": _Resource(
+        select=(
+            "SELECT td.tid AS _tid, td.organism, td.pref_name, td.species_group_flag,"
+            + " td.chembl_id AS target_chembl_id, td.target_type, td.tax_id"
+            + " FROM target_dictionary td"
+        ),
+        fields=dict(
+            organism="td.organism",
+            pref_name="td.pref_name",
+            target_chembl_id="td.chembl_id",
+            target_type="td.target_type",
+        ),
+        key="target_chembl_id",
+        order="td.tid",
+        nest=_nest_components,
+    ),
+    "target_relation": _Resource(
+        select=(
+            "SELECT rtd.chembl_id AS related_target_chembl_id, tr.relationship,"
+            + " td.chembl_id AS target_chembl_id"
+            + " FROM target_relations tr"
+            + " JOIN target_dictionary td ON td.tid = tr.tid"
+            + " JOIN target_dictionary rtd ON rtd.tid = tr.related_tid"
+        ),
+        fields=dict(
+            related_target_chembl_id="rtd.chembl_id",
+            relationship="tr.relationship",
+            target_chembl_id="td.chembl_id",
+        ),
+        key="target_chembl_id",
+        order="tr.targrel_id",
+    ),
+}
+
+
+def _condition(op: str, value: Any) -> Tup[str, List[Any]]:
+    if op == "in":
+        values = list(value)
+        if len(values) > _chunk_size:
+            # pass the values as one JSON array, so there's no limit on how many
+            return "IN (SELECT value FROM json_each(?))", [json.dumps(values)]
+        return "IN (" + ", ".join(["?"] * len(values)) + ")", values
+    if op == "isnull":
+        return ("IS NULL" if value else "IS NOT NULL"), []
+    # we can't do chemistry in SQL, so flexmatch is just an exact match
+    return "= ?", [value]
+
+
+def _fold(row: _Row) -> NestedDotDict:
+    data = {}
+    for k, v in row.items():
+        if k.startswith("_"):
+            continue
+        if "__" in k:
+            outer, inner = k.split("__", 1)
+            data.setdefault(outer, {})[inner] = v
+        else:
+            data[k] = v
+    for k, v in data.items():
+        if isinstance(v, dict) and all(x is None for x in v.values()):
+            data[k] = None
+    return NestedDotDict(data)
+
+
+@decorateme.auto_repr_str()
+class _DbFilterQuery(ChemblFilterQuery):
+    def __init__(
+        self,
+        db: _Db,
+        resource: _Resource,
+        where: Sequence[str],
+        params: Sequence[Any],
+        only: Optional[Sequence[str]] = None,
+    ):
+        self._db, self._resource, self._where, self._params = db, resource, where, params
+        self._only = only
+        self._results: Optional[List[NestedDotDict]] = None
+
+    def only(self, items: Sequence[str]) -> ChemblFilterQuery:
+        return _DbFilterQuery(self._db, self._resource, self._where, self._params, items)
+
+    def __getitem__(self, item: int) -> NestedDotDict:
+        return self._fetch()[item]
+
+    def __len__(self) -> int:
+        return len(self._fetch())
+
+    def __iter__(self) -> Iterator[NestedDotDict]:
+        return iter(self._fetch())
+
+    def _fetch(self) -> List[NestedDotDict]:
+        if self._results is None:
+            sql = self._resource.select
+            if len(self._where) > 0:
+                sql += " WHERE " + " AND ".join(self._where)
+            rows = self._db.query(sql + " ORDER BY " + self._resource.order, self._params)
+            if self._resource.nest is not None and len(rows) > 0:
+                self._resource.nest(self._db, rows)
+            results = [_fold(row) for row in rows]
+            if self._only is not None:
+                results = [NestedDotDict({k: r.get(k) for k in self._only}) for r in results]
+            self._results = results
+        return self._results
+
+
+@decorateme.auto_repr_str()
+class _DbEntrypoint(ChemblEntrypoint):
+    def __init__(self, db: _Db, name: str, resource: _Resource):
+        self._db, self._name, self._resource = db, name, resource
+
+    def filter(self, **kwargs) -> ChemblFilterQuery:
+        where, params = [], []
+        for arg, value in kwargs.items():
+            name, op = arg, "exact"
+            if "__" in arg and arg.rsplit("__", 1)[1] in _ops:
+                name, op = arg.rsplit("__", 1)
+            expr = self._resource.fields.get(name)
+            if expr is None:
+                raise UnsupportedOpError(f"Cannot filter ChEMBL {self._name} on {name}")
+            condition, values = _condition(op, value)
+            n = max(expr.count("{}"), 1)
+            where.append(expr.format(*[condition] * n) if "{}" in expr else f"{expr} {condition}")
+            params.extend(values * n)
+        return _DbFilterQuery(self._db, self._resource, where, params)
+
+    def get(self, arg: str) -> Optional[NestedDotDict]:
+        key = self._resource.key
+        # like the REST API, molecules can be looked up by InChI Key, too
+        if self._name == "molecule" and not str(arg).upper().startswith("CHEMBL"):
+            key = "molecule_structures__standard_inchi_key"
+        found = self.filter(**{key: arg})
+        return found[0] if len(found) > 0 else None
+
+
+class ChemblDbApi(ChemblApi):
+    """
+    Reads from a local ChEMBL release database (the official SQLite dump)
+    instead of the web service.
+
+    Supports the resources and filters that Mandos uses, with the same field names as the REST API:
+    ``activity``, ``assay``, ``atc_class``, ``drug_indication``, ``mechanism``, ``molecule``,
+    ``target``, and ``target_relation``.
+    Filters can be exact or use ``__in``, ``__isnull``, or ``__flexmatch`` (which matches exactly).
+    Numbers are returned as numbers, where the REST API sometimes returns strings.
+    """
+
+    def __init__(self, path: Path):
+        db = _Db(path)
+        entrypoints = {k: _DbEntrypoint(db, k, v) for k, v in _resources.items()}
+        object.__setattr__(self, "_db", db)
+        object.__setattr__(self, "_entrypoints", entrypoints)
+        logger.info(f"Using local ChEMBL database {path}")
+
+    def __getattribute__(self, item: str) -> ChemblEntrypoint:
+        if item.startswith("_"):
+            return object.__getattribute__(self, item)
+        entrypoints = object.__getattribute__(self, "_entrypoints")
+        if item not in entrypoints:
+            raise UnsupportedOpError(f"ChEMBL {item} is not available from a local database")
+        return entrypoints[item]
+
+    def __repr__(self) -> str:
+        return f"ChemblDbApi({object.__getattribute__(self, '_db').path})"
+
+    def __str__(self) -> str:
+        return repr(self)
+
+
+__all__ = ["ChemblDbApi"]
@@ -248,13 +248,11 @@ class ChemblTargetGraph(metaclass=abc.ABCMeta):
             rel_types: Relationship types (e.g. "superset of") to include
                        If ``TargetRelType.self_link`` is included, will add a single self-link
         """
-        api = self.__class__.api()
-        relations = api.target_relation.filter(target_chembl_id=self.target.chembl)
+        relations = self.factory().relations(self.target.chembl)
         links = []
         # "subset" means "up" (it's reversed from what's on the website)
-        for superset in relations:
-            linked_id = superset["related_target_chembl_id"]
-            rel_type = TargetRelType.of(superset["relationship"])
+        for linked_id, relationship in relations:
+            rel_type = TargetRelType.of(relationship)
             if rel_type in rel_types or TargetRelType.any_link in rel_types:
                 linked_target = self.__class__.at_target(self.factory().find(linked_id))
                 links.append((linked_target, rel_type))
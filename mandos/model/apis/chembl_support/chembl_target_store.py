@@ -0,0 +1,242 @@
+"""
+Local storage of ChEMBL targets and the relations between them.
+"""
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, Mapping, MutableMapping, Optional, Sequence
+from typing import Tuple as Tup
+
+import decorateme
+from pocketutils.core.dot_dict import NestedDotDict
+from pocketutils.core.exceptions import XValueError
+
+from mandos.model.apis.chembl_api import ChemblApi
+from mandos.model.apis.chembl_support.chembl_targets import ChemblTarget, TargetType
+from mandos.model.settings import SETTINGS
+from mandos.model.utils.setup import logger
+
+Relation = Tup[str, str]
+
+
+@decorateme.auto_repr_str()
+class ChemblTargetStore:
+    """
+    Stores targets and the relations between them, for a single ChEMBL release.
+
+    Everything is held in memory, so once a target and its relations are known,
+    looking them up costs no queries.
+    If ``path`` is set, everything is also written to (and read back from) a SQLite file,
+    keyed by ``release``.
+
+    Relations are stored as ``(related_target_chembl_id, relationship)`` pairs,
+    exactly as ChEMBL lists them in ``target_relation``.
+    The file also holds the results of traversal strategies (see ``TraversalMemo``),
+    which are read only as needed.
+    """
+
+    def __init__(self, release: Optional[str], path: Optional[Path] = None):
+        self._release = release
+        self._path = path
+        self._targets: MutableMapping[str, ChemblTarget] = {}
+        self._relations: MutableMapping[str, Sequence[Relation]] = {}
+        self._lock = threading.Lock()
+        self._conn = None
+        if path is not None:
+            if release is None:
+                raise XValueError(f"Cannot store targets in {path} without a ChEMBL release")
+            self._open(path)
+
+    @property
+    def release(self) -> Optional[str]:
+        return self._release
+
+    @property
+    def path(self) -> Optional[Path]:
+        return self._path
+
+    @property
+    def n_targets(self) -> int:
+        return len(self._targets)
+
+    @property
+    def n_relations(self) -> int:
+        return sum(len(r) for r in self._relations.values())
+
+    def target(self, chembl: str) -> Optional[ChemblTarget]:
+        """
+        Returns the target, or None if it is not stored.
+        """
+        return self._targets.get(chembl)
+
+    def relations(self, chembl: str) -> Optional[Sequence[Relation]]:
+        """
+        Returns the relations from a target, or None if they were never stored.
+        An empty sequence means that the target has no relations.
+        """
+        return self._relations.get(chembl)
+
+    def add_targets(self, targets: Iterable[ChemblTarget]) -> None:
+        targets = [t for t in targets if self._targets.get(t.chembl) != t]
+        with self._lock:
+            for t in targets:
+                self._targets[t.chembl] = t
+            if self._conn is not None and len(targets) > 0:
+                with self._conn:
+                    self._conn.execute("BEGIN")
+                    self._conn.executemany(
+                        "INSERT OR REPLACE INTO targets VALUES (?, ?, ?, ?)",
+                        [(self._release, t.chembl, t.name, t.type.name) for t in targets],
+                    )
+
+    def add_relations(self, relations: Mapping[str, Sequence[Relation]]) -> None:
+        """
+        Stores all of the relations from each target (replacing any that were stored).
+        """
+        with self._lock:
+            for chembl, rels in relations.items():
+                self._relations[chembl] = tuple(rels)
+            if self._conn is not None and len(relations) > 0:
+                with self._conn:
+                    self._conn.execute("BEGIN")
+                    self._conn.executemany(
+                        "INSERT OR REPLACE INTO relation_sources VALUES (?, ?)",
+                        [(self._release, c) for c in relations.keys()],
+                    )
+                    self._conn.executemany(
+                        "DELETE FROM relations WHERE release=? AND source=?",
+                        [(self._release, c) for c in relations.keys()],
+                    )
+                    self._conn.executemany(
+                        "INSERT INTO relations VALUES (?, ?, ?, ?)",
+                        [
+                            (self._release, c, dest, rel)
+                            for c, rels in relations.items()
+                            for dest, rel in rels
+                        ],
+                    )
+
+    def traversal(self, strategy: str, chembl: str) -> Optional[Sequence[ChemblTarget]]:
+        """
+        Returns the targets that ``strategy`` accepted from a target, or None if not stored on disk.
+        """
+        if self._conn is None:
+            return None
+        q = "SELECT dests FROM traversals WHERE release=? AND strategy=? AND source=?"
+        with self._lock:
+            row = self._conn.execute(q, (self._release, strategy, chembl)).fetchone()
+        if row is None:
+            return None
+        found = [self._targets.get(c) for c in json.loads(row[0])]
+        # the targets were stored first, so this only happens if the file was edited
+        return None if None in found else found
+
+    def add_traversal(self, strategy: str, chembl: str, dests: Sequence[ChemblTarget]) -> None:
+        """
+        Stores the targets that ``strategy`` accepted from a target (if this store is on disk).
+        """
+        self.add_targets(dests)
+        with self._lock:
+            if self._conn is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO traversals VALUES (?, ?, ?, ?)",
+                    (self._release, strategy, chembl, json.dumps([t.chembl for t in dests])),
+                )
+
+    def prefetch_all(self, api: ChemblApi) -> None:
+        """
+        Fetches all targets and all relations from ChEMBL.
+        """
+        fields = ["target_chembl_id", "pref_name", "target_type"]
+        self.add_targets(
+            [self._to_target(t) for t in api.target.filter().only(fields)],
+        )
+        logger.info(f"Fetched {self.n_targets:,} ChEMBL targets")
+        relations: Dict[str, list] = {t: [] for t in self._targets.keys()}
+        fields = ["target_chembl_id", "related_target_chembl_id", "relationship"]
+        for r in api.target_relation.filter().only(fields):
+            relations.setdefault(r["target_chembl_id"], []).append(self._to_relation(r))
+        self.add_relations(relations)
+        logger.info(f"Fetched {self.n_relations:,} ChEMBL target relations")
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _to_target(self, data: NestedDotDict) -> ChemblTarget:
+        data = NestedDotDict(data)
+        return ChemblTarget(
+            chembl=data["target_chembl_id"],
+            name=data.get("pref_name"),
+            type=TargetType.of(data["target_type"]),
+        )
+
+    def _to_relation(self, data: NestedDotDict) -> Relation:
+        return data["related_target_chembl_id"], data["relationship"]
+
+    def _open(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS targets (release TEXT NOT NULL, chembl TEXT NOT NULL,"
+            + " name TEXT, type TEXT NOT NULL, PRIMARY KEY (release, chembl))"
+        )
+        # a target is listed here once its relations are stored, even if it has none
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS relation_sources (release TEXT NOT NULL,"
+            + " source TEXT NOT NULL, PRIMARY KEY (release, source))"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS relations (release TEXT NOT NULL, source TEXT NOT NULL,"
+            + " dest TEXT NOT NULL, relationship TEXT NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS relations_by_source ON relations (release, source)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS traversals (release TEXT NOT NULL, strategy TEXT NOT NULL,"
+            + " source TEXT NOT NULL, dests TEXT NOT NULL, PRIMARY KEY (release, strategy, source))"
+        )
+        q = "SELECT chembl, name, type FROM targets WHERE release=?"
+        for chembl, name, kind in self._conn.execute(q, (self._release,)):
+            self._targets[chembl] = ChemblTarget(chembl, name, TargetType[kind])
+        q = "SELECT source FROM relation_sources WHERE release=?"
+        relations = {s: [] for (s,) in self._conn.execute(q, (self._release,))}
+        q = "SELECT source, dest, relationship FROM relations WHERE release=? ORDER BY rowid"
+        for source, dest, rel in self._conn.execute(q, (self._release,)):
+            relations[source].append((dest, rel))
+        self._relations = {k: tuple(v) for k, v in relations.items()}
+        logger.debug(f"Read {len(self._targets):,} ChEMBL {self._release} targets from {path}")
+
+
+class ChemblTargetStores:
+    # shared by every search in the process
+    _defaults: Dict[Optional[str], ChemblTargetStore] = {}
+
+    @classmethod
+    def default(cls) -> ChemblTargetStore:
+        """
+        Returns a store under the ChEMBL cache, for the release set in ``cache.chembl.release``.
+        If that setting is null, returns a store that is only in memory.
+        """
+        release = SETTINGS.chembl_release
+        if release not in cls._defaults:
+            if release is None:
+                cls._defaults[release] = ChemblTargetStore(None)
+            else:
+                path = cls.sqlite_path(SETTINGS.chembl_cache_path)
+                cls._defaults[release] = ChemblTargetStore(release, path)
+        return cls._defaults[release]
+
+    @classmethod
+    def sqlite_path(cls, cache_dir: Path) -> Path:
+        return cache_dir / "targets.sqlite"
+
+
+__all__ = ["ChemblTargetStore", "ChemblTargetStores"]
@@ -5,7 +5,8 @@ from __future__ import annotations
 
 import enum
 from dataclasses import dataclass
-from typing import Mapping, Optional, Set
+from typing import TYPE_CHECKING, Mapping, Optional, Sequence, Set
+from typing import Tuple as Tup
 
 import decorateme
 from pocketutils.core.dot_dict import NestedDotDict
@@ -15,6 +16,9 @@ from urllib3.util.retry import MaxRetryError
 
 from mandos.model.apis.chembl_api import ChemblApi
 
+if TYPE_CHECKING:
+    from mandos.model.apis.chembl_support.chembl_target_store import ChemblTargetStore
+
 
 class TargetNotFoundError(LookupFailedError):
     """ """
@@ -201,10 +205,19 @@ class ChemblTarget:
 class TargetFactory:
     """
     Factory for ``Target`` that injects a ``ChemblApi``.
+    Remembers targets and relations in a :class:`ChemblTargetStore`,
+    so each is only queried once (or never, if the store was prefetched).
     """
 
-    def __init__(self, api: ChemblApi):
+    def __init__(self, api: ChemblApi, store: Optional[ChemblTargetStore] = None):
+        if store is None:
+            from mandos.model.apis.chembl_support.chembl_target_store import (
+                ChemblTargetStore,
+            )
+
+            store = ChemblTargetStore(None)  # just in memory
         self.api = api
+        self.store = store
 
     def find(self, chembl: str) -> ChemblTarget:
         """
@@ -216,6 +229,9 @@ class TargetFactory:
         Returns:
             A ``Target`` instance from a newly created subclass of that class
         """
+        target = self.store.target(chembl)
+        if target is not None:
+            return target
         try:
             targets = self.api.target.filter(target_chembl_id=chembl)
         except MaxRetryError:
@@ -223,11 +239,30 @@ class TargetFactory:
         if len(targets) != 1:
             raise AssertionError(f"Found {len(targets)} targets for {chembl}")
         target = NestedDotDict(targets[0])
-        return ChemblTarget(
+        target = ChemblTarget(
             chembl=target["target_chembl_id"],
             name=target.get("pref_name"),
             type=TargetType.of(target["target_type"]),
         )
+        self.store.add_targets([target])
+        return target
+
+    def relations(self, chembl: str) -> Sequence[Tup[str, str]]:
+        """
+        Finds the relations from a target.
+
+        Args:
+            chembl: The CHEMBL ID of the target
+
+        Returns:
+            ``(related_target_chembl_id, relationship)`` pairs
+        """
+        relations = self.store.relations(chembl)
+        if relations is None:
+            found = self.api.target_relation.filter(target_chembl_id=chembl)
+            relations = [(r["related_target_chembl_id"], r["relationship"]) for r in found]
+            self.store.add_relations({chembl: relations})
+        return relations
 
 
 __all__ = [
@@ -110,6 +110,8 @@ class ChemblUtils:
             return NestedDotDict(result)
         except (HTTPError, RequestException):
             raise CompoundNotFoundError(f"Failed to find compound {inchikey}")
+        except CompoundNotFoundError:
+            raise
         except Exception:
             logger.error(f"Error on ChEMBL query for compound {inchikey}")
 
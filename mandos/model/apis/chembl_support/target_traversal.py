@@ -2,7 +2,10 @@ from __future__ import annotations
 
 import abc
 import enum
+import hashlib
 import sre_compile
+import threading
+from dataclasses import dataclass
 from pathlib import Path
 from typing import Dict, Mapping, MutableMapping, Optional, Sequence, Set
 from typing import Tuple as Tup
@@ -21,6 +24,10 @@ from mandos.model.apis.chembl_support.chembl_target_graphs import (
     TargetNode,
     TargetRelType,
 )
+from mandos.model.apis.chembl_support.chembl_target_store import (
+    ChemblTargetStore,
+    ChemblTargetStores,
+)
 from mandos.model.apis.chembl_support.chembl_targets import ChemblTarget, TargetType
 from mandos.model.utils.setup import MandosResources, logger
 
@@ -32,6 +39,81 @@ class Acceptance(CleverEnum):
     at_end = ()
 
 
+@dataclass(frozen=True, repr=True, order=True)
+class TraversalMemoStats:
+    hits: int
+    disk_hits: int
+    misses: int
+
+    @property
+    def hit_rate(self) -> float:
+        n = self.hits + self.disk_hits + self.misses
+        return 0.0 if n == 0 else (self.hits + self.disk_hits) / n
+
+    def __str__(self) -> str:
+        return (
+            f"{self.hits} hits, {self.disk_hits} disk hits, {self.misses} misses"
+            + f" ({self.hit_rate * 100:.1f}% hit rate)"
+        )
+
+
+class TraversalMemo:
+    """
+    Remembers the targets that a strategy accepted, by the CHEMBL ID of the starting target.
+
+    Results are always held in memory.
+    If ``key`` identifies the strategy (e.g. a hash of its file) and ``store`` is on disk,
+    they are also written to the store, so later runs against the same ChEMBL release reuse them.
+    """
+
+    def __init__(self, key: Optional[str], store: Optional[ChemblTargetStore]):
+        self._key = key
+        on_disk = key is not None and store is not None and store.path is not None
+        self._store = store if on_disk else None
+        self._results: Dict[str, Sequence[ChemblTarget]] = {}
+        self._lock = threading.Lock()
+        self._hits, self._disk_hits, self._misses = 0, 0, 0
+
+    @property
+    def key(self) -> Optional[str]:
+        return self._key
+
+    @property
+    def stats(self) -> TraversalMemoStats:
+        with self._lock:
+            return TraversalMemoStats(
+                hits=self._hits, disk_hits=self._disk_hits, misses=self._misses
+            )
+
+    def get(self, chembl: str) -> Optional[Sequence[ChemblTarget]]:
+        """
+        Returns the accepted targets, or None if they're not known.
+        """
+        with self._lock:
+            found = self._results.get(chembl)
+            if found is not None:
+                self._hits += 1
+                return found
+        found = None if self._store is None else self._store.traversal(self._key, chembl)
+        with self._lock:
+            if found is None:
+                self._misses += 1
+            else:
+                self._results[chembl] = found
+                self._disk_hits += 1
+        return found
+
+    def put(self, chembl: str, found: Sequence[ChemblTarget]) -> None:
+        found = list(found)
+        with self._lock:
+            self._results[chembl] = found
+        if self._store is not None:
+            self._store.add_traversal(self._key, chembl, found)
+
+    def __len__(self) -> int:
+        return len(self._results)
+
+
 class TargetTraversalStrategy(metaclass=abc.ABCMeta):
     """ """
 
@@ -39,12 +121,22 @@ class TargetTraversalStrategy(metaclass=abc.ABCMeta):
     def api(cls) -> ChemblApi:
         raise NotImplementedError()
 
-    def traverse(self, target: ChemblTargetGraph) -> Sequence[ChemblTargetGraph]:
+    @property
+    def memo_stats(self) -> Optional[TraversalMemoStats]:
+        """
+        Returns the hits and misses for remembered results, or None if results aren't remembered.
+        """
+        return None
+
+    def traverse(self, target: ChemblTargetGraph) -> Sequence[ChemblTarget]:
         return self.__call__(target)
 
-    def __call__(self, target: ChemblTargetGraph) -> Sequence[ChemblTargetGraph]:
+    def __call__(self, target: ChemblTargetGraph) -> Sequence[ChemblTarget]:
         """
         Run the strategy.
+
+        Returns:
+            The accepted targets
         """
         raise NotImplementedError()
 
@@ -62,15 +154,36 @@ class NullTargetTraversalStrategy(TargetTraversalStrategy, metaclass=abc.ABCMeta
     def api(cls) -> ChemblApi:
         raise NotImplementedError()
 
-    def traverse(self, target: ChemblTargetGraph) -> Sequence[ChemblTargetGraph]:
+    def traverse(self, target: ChemblTargetGraph) -> Sequence[ChemblTarget]:
         return self.__call__(target)
 
-    def __call__(self, target: ChemblTargetGraph) -> Sequence[ChemblTargetGraph]:
-        return [target]
+    def __call__(self, target: ChemblTargetGraph) -> Sequence[ChemblTarget]:
+        return [target.target]
 
 
 class StandardTargetTraversalStrategy(TargetTraversalStrategy, metaclass=abc.ABCMeta):
-    """ """
+    """
+    A strategy defined by edges to follow and which nodes to accept.
+    Because the result depends only on the starting target,
+    results are remembered in a ``TraversalMemo``.
+    """
+
+    def __init__(self, memo: Optional[TraversalMemo] = None):
+        if memo is None:
+            memo = TraversalMemo(self.key(), ChemblTargetStores.default())
+        self._memo = memo
+
+    @classmethod
+    def key(cls) -> Optional[str]:
+        """
+        Returns a string that identifies the edges and acceptance rules,
+        used to store results on disk; or None if there is none.
+        """
+        return None
+
+    @property
+    def memo_stats(self) -> Optional[TraversalMemoStats]:
+        return self._memo.stats
 
     @classmethod
     def edges(cls) -> Set[TargetEdgeReqs]:
@@ -81,9 +194,14 @@ class StandardTargetTraversalStrategy(TargetTraversalStrategy, metaclass=abc.ABC
         raise NotImplementedError()
 
     def __call__(self, target: ChemblTargetGraph) -> Sequence[ChemblTarget]:
-        logger.debug(f"Starting {self} on {target.target}")
-        found = target.traverse(self.edges())
-        return [f.target for f in found if self.accept(f)]
+        accepted = self._memo.get(target.chembl)
+        if accepted is None:
+            logger.debug(f"Starting {self} on {target.target}")
+            found = target.traverse(self.edges())
+            # the traversed nodes hold graphs; keep only the targets so they can be stored
+            accepted = [f.target.target for f in found if self.accept(f)]
+            self._memo.put(target.chembl, accepted)
+        return accepted
 
     def accept(self, target: TargetNode) -> bool:
         if target.link_reqs is None:
@@ -220,11 +338,16 @@ class TargetTraversalStrategies:
         cls, lines: Sequence[str], api: ChemblApi, *, name: str
     ) -> TargetTraversalStrategy:
         edges, accept = StandardStrategyParser.parse(lines)
+        key = hashlib.sha256("\n".join(lines).encode(encoding="utf8")).hexdigest()
         logger.info(f"Loaded strategy {name} with {len(edges)} edge types")
         for edge in edges:
             logger.trace(f"Edge: {edge} ({accept[edge]})")
 
         class Strategy(StandardTargetTraversalStrategy):
+            @classmethod
+            def key(cls) -> Optional[str]:
+                return key
+
             @classmethod
             def edges(cls) -> Set[TargetEdgeReqs]:
                 return edges
@@ -263,4 +386,9 @@ class TargetTraversalStrategies:
         return X()
 
 
-__all__ = ["TargetTraversalStrategies", "TargetTraversalStrategy"]
+__all__ = [
+    "TargetTraversalStrategies",
+    "TargetTraversalStrategy",
+    "TraversalMemo",
+    "TraversalMemoStats",
+]
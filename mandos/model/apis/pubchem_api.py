@@ -4,13 +4,16 @@ PubChem querying API.
 from __future__ import annotations
 
 import abc
-from typing import Union
+from typing import TYPE_CHECKING, Union
 
 import decorateme
 
 from mandos.model import Api, CompoundNotFoundError
 from mandos.model.apis.pubchem_support.pubchem_data import PubchemData
 
+if TYPE_CHECKING:
+    from mandos.model.apis.pubchem_resolver import PubchemResolution
+
 
 class PubchemCompoundLookupError(CompoundNotFoundError):
     """ """
@@ -27,5 +30,18 @@ class PubchemApi(Api, metaclass=abc.ABCMeta):
         """
         raise NotImplementedError()
 
+    def is_cached(self, inchikey_or_cid: Union[str, int]) -> bool:
+        """
+        Returns whether :meth:`fetch_data` can answer without querying PubChem.
+        False by default.
+        """
+        return False
+
+    def use_resolution(self, resolution: PubchemResolution) -> None:
+        """
+        Uses already-resolved CIDs and InChI Keys to skip lookups in :meth:`fetch_data`.
+        Does nothing by default.
+        """
+
 
 __all__ = ["PubchemApi", "PubchemCompoundLookupError"]
@@ -0,0 +1,147 @@
+"""
+Batched PubChem CID and property lookups with PUG REST.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import AbstractSet, Any, Iterable, List, Mapping, Optional, Sequence, Union
+from urllib.error import HTTPError
+from urllib.parse import urlencode
+
+import decorateme
+import orjson
+from pocketutils.core.exceptions import DownloadError, XValueError
+
+from mandos.model.settings import QUERY_EXECUTORS, SETTINGS
+from mandos.model.utils.query_executors import ConcurrentQueryExecutor
+from mandos.model.utils.setup import logger
+
+
+@dataclass(frozen=True, repr=True)
+class PubchemIds:
+    cid: int
+    inchikey: Optional[str]
+    inchi: Optional[str]
+    properties: Mapping[str, Any]
+
+
+@dataclass(frozen=True, repr=True)
+class PubchemResolution:
+    """
+    The results of :meth:`PubchemResolver.resolve`.
+
+    An InChI Key can match several CIDs; :meth:`cid_of` only answers if it matched exactly one.
+    """
+
+    by_inchikey: Mapping[str, Sequence[PubchemIds]]
+    by_cid: Mapping[int, PubchemIds]
+    missing_inchikeys: AbstractSet[str]
+    missing_cids: AbstractSet[int]
+
+    @classmethod
+    def empty(cls) -> PubchemResolution:
+        return PubchemResolution({}, {}, frozenset(), frozenset())
+
+    def cid_of(self, inchikey: str) -> Optional[int]:
+        matches = self.by_inchikey.get(inchikey, [])
+        return matches[0].cid if len(matches) == 1 else None
+
+    def inchikey_of(self, cid: int) -> Optional[str]:
+        ids = self.by_cid.get(cid)
+        return None if ids is None else ids.inchikey
+
+    def __len__(self) -> int:
+        return len(self.by_inchikey) + len(self.by_cid)
+
+
+@decorateme.auto_repr_str()
+class PubchemResolver:
+    """
+    Finds CIDs and basic properties for many compounds at once.
+
+    Sends InChI Keys and CIDs to PUG REST as comma-separated POST bodies,
+    ``chunk_size`` per request, instead of one request (or scraped page) per compound.
+    """
+
+    def __init__(
+        self,
+        executor: ConcurrentQueryExecutor = QUERY_EXECUTORS.pubchem,
+        *,
+        chunk_size: int = SETTINGS.pubchem_batch_size,
+        properties: Sequence[str] = ("InChIKey", "InChI", "IsomericSMILES"),
+        pug: str = "https://pubchem.ncbi.nlm.nih.gov/rest/pug",
+    ):
+        if chunk_size < 1:
+            raise XValueError(f"chunk_size {chunk_size} < 1")
+        self._executor = executor
+        self._chunk_size = chunk_size
+        # we need the InChI Key to match rows back to the query
+        self._properties = ["InChIKey", *[p for p in properties if p != "InChIKey"]]
+        self._pug = pug
+
+    def resolve(
+        self, *, inchikeys: Iterable[str] = (), cids: Iterable[Union[int, str]] = ()
+    ) -> PubchemResolution:
+        inchikeys = list(dict.fromkeys(str(k) for k in inchikeys))
+        cids = list(dict.fromkeys(int(c) for c in cids))
+        logger.info(f"Resolving {len(inchikeys)} InChI Keys and {len(cids)} CIDs in PubChem")
+        by_inchikey = {}
+        for row in self._fetch_all("inchikey", inchikeys):
+            by_inchikey.setdefault(row.inchikey, []).append(row)
+        by_cid = {row.cid: row for row in self._fetch_all("cid", cids)}
+        resolution = PubchemResolution(
+            by_inchikey={k: sorted(v, key=lambda r: r.cid) for k, v in by_inchikey.items()},
+            by_cid=by_cid,
+            missing_inchikeys=frozenset(inchikeys) - by_inchikey.keys(),
+            missing_cids=frozenset(cids) - by_cid.keys(),
+        )
+        n_ambiguous = sum(len(v) > 1 for v in by_inchikey.values())
+        logger.info(
+            f"Found {len(by_inchikey)}/{len(inchikeys)} InChI Keys ({n_ambiguous} ambiguous)"
+            + f" and {len(by_cid)}/{len(cids)} CIDs"
+        )
+        return resolution
+
+    def _fetch_all(self, namespace: str, ids: Sequence[Union[int, str]]) -> Sequence[PubchemIds]:
+        rows = []
+        for i in range(0, len(ids), self._chunk_size):
+            rows += self._fetch_chunk(namespace, ids[i : i + self._chunk_size])
+        return rows
+
+    def _fetch_chunk(self, namespace: str, ids: Sequence[Union[int, str]]) -> List[PubchemIds]:
+        try:
+            return self._post(namespace, ids)
+        except HTTPError as e:
+            # PubChem answers 404 if *none* are found, and skips the missing ones otherwise
+            if e.code == 404:
+                return []
+            if e.code != 400:
+                raise
+        # one malformed ID fails the whole request, so split to find the good ones
+        if len(ids) == 1:
+            logger.debug(f"PubChem rejected {namespace} {ids[0]}")
+            return []
+        half = len(ids) // 2
+        return self._fetch_chunk(namespace, ids[:half]) + self._fetch_chunk(namespace, ids[half:])
+
+    def _post(self, namespace: str, ids: Sequence[Union[int, str]]) -> List[PubchemIds]:
+        url = f"{self._pug}/compound/{namespace}/property/{','.join(self._properties)}/JSON"
+        body = urlencode({namespace: ",".join(str(i) for i in ids)}).encode(encoding="utf8")
+        headers = {"Content-Type": "application/x-www-form-urlencoded"}
+        text = self._executor(url, method="post", headers=headers, data=body)
+        data = orjson.loads(text)
+        if "Fault" in data:
+            raise DownloadError(f"PubChem batch query failed on {url}: {data['Fault']}")
+        logger.debug(f"Queried {len(ids)} {namespace}s from {url}")
+        return [self._parse(row) for row in data["PropertyTable"]["Properties"]]
+
+    def _parse(self, row: Mapping[str, Any]) -> PubchemIds:
+        return PubchemIds(
+            cid=int(row["CID"]),
+            inchikey=row.get("InChIKey"),
+            inchi=row.get("InChI"),
+            properties={k: v for k, v in row.items() if k != "CID"},
+        )
+
+
+__all__ = ["PubchemIds", "PubchemResolution", "PubchemResolver"]
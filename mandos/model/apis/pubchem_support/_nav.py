@@ -7,6 +7,7 @@ from typing import (
     FrozenSet,
     Iterable,
     List,
+    Mapping,
     Optional,
     Sequence,
     Set,
@@ -60,6 +61,23 @@ def _request_only(things: Iterable[str]) -> Optional[str]:
         return things[0]
 
 
+def _raw(x: Union[Mapping[str, Any], NestedDotDict]) -> Mapping[str, Any]:
+    return x._x if isinstance(x, NestedDotDict) else x
+
+
+def _wrap(x: Union[Mapping[str, Any], NestedDotDict]) -> NestedDotDict:
+    # NestedDotDict's constructor walks (and wraps) every sub-dict to check the keys,
+    # so wrapping each level while navigating down is quadratic in the depth
+    # the JSON was checked when it was loaded, and navigators never modify it, so just share it
+    if isinstance(x, NestedDotDict):
+        return x
+    if not hasattr(x, "items"):
+        raise XValueError(f"{x} is a {type(x)}, not a dict")
+    dot = NestedDotDict.__new__(NestedDotDict)
+    dot._x = x
+    return dot
+
+
 def _get_conversion_fn(fn: Union[None, str, Callable[[Any], Any]]) -> Callable[[Any], Any]:
     if fn is None:
         return _identity
@@ -84,7 +102,7 @@ class JsonNavigator(AbstractJsonNavigator):
     ) -> JsonNavigator:
         if hasattr(dct, "items"):
             dct = [dct]
-        return JsonNavigator([NestedDotDict(dict(**d, _landmark="")) for d in dct])
+        return JsonNavigator([_wrap({**_raw(d), "_landmark": ""}) for d in dct])
 
     @property
     def get(self) -> List[NestedDotDict]:
@@ -107,10 +125,11 @@ class JsonNavigator(AbstractJsonNavigator):
     def __mod__(self, key: Union[int, str]) -> JsonNavigator:
         new = {}
         for z in self.contents:
-            if z[key] in new:
+            value = _raw(z)[key]
+            if value in new:
                 raise MultipleMatchesError(f"{key} found twice")
-            new[z[key]] = z
-        return JsonNavigator([NestedDotDict(new)])
+            new[value] = z
+        return JsonNavigator([_wrap(new)])
 
     def __floordiv__(self, keys: Sequence[str]) -> JsonNavigatorListOfLists:
         try:
@@ -136,17 +155,15 @@ class JsonNavigator(AbstractJsonNavigator):
     def _go_inside(self, key: Union[int, str]) -> JsonNavigator:
         new = []
         for z in self.contents:
+            z = _raw(z)
             if key in z:
-                # nav = z.get_as("_nav", list, [])
-                # nav.append(z[key])
-                if isinstance(z.get(key), list):
-                    new.extend([NestedDotDict(dict(**m)) for m in z[key]])
-                elif isinstance(z.get(key), NestedDotDict):
-                    new.append(NestedDotDict(dict(**z[key])))
-                elif isinstance(z.get(key), dict):
-                    new.append(NestedDotDict(dict(**z[key])))
+                value = z[key]
+                if isinstance(value, list):
+                    new.extend([_wrap(m) for m in value])
+                elif isinstance(value, (dict, NestedDotDict)):
+                    new.append(_wrap(value))
                 else:
-                    raise XValueError(f"{key} value is {type(z[key])}: {z[key]}")
+                    raise XValueError(f"{key} value is {type(value)}: {value}")
         return JsonNavigator(new)
 
 
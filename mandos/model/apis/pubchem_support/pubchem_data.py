@@ -52,11 +52,76 @@ class Misc:
     empty_frozenset = frozenset([])
 
 
+def _section(data: NestedDotDict, key: str) -> JsonNavigator:
+    # the same as JsonNavigator.create(data) / key, but only touches data[key]
+    # that matters when sections are decoded lazily (see pubchem_stores)
+    # it also avoids NestedDotDict.__getitem__, which wraps (and so walks) the whole section
+    value = data
+    for part in key.split("."):
+        if isinstance(value, NestedDotDict):
+            value = value._x
+        value = value.get(part)
+        if value is None:
+            return JsonNavigator([])
+    leaf = key.rsplit(".", 1)[-1]
+    return JsonNavigator.create({leaf: value}) / leaf
+
+
+class _SubsectionNavigator:
+    """
+    Navigates into one child of a section (e.g. ``external_tables.drugbank``) with ``/``.
+    Remembers each child's navigator.
+    """
+
+    def __init__(self, data: NestedDotDict, section: str):
+        self._data = data
+        self._section = section
+        self._children: MutableMapping[str, JsonNavigator] = {}
+
+    def __truediv__(self, key: str) -> JsonNavigator:
+        nav = self._children.get(key)
+        if nav is None:
+            nav = _section(self._data, self._section + "." + key)
+            self._children[key] = nav
+        return nav
+
+
+class _PubchemIndex:
+    """
+    The navigators and lookups for one compound's data.
+    These are built once and shared by every view of that data.
+    """
+
+    def __init__(self, data: NestedDotDict):
+        self._data = data
+
+    @cached_property
+    def nav(self) -> JsonNavigator:
+        return _section(self._data, "record")
+
+    @cached_property
+    def toc(self) -> JsonNavigator:
+        return self.nav / "Section" % "TOCHeading"
+
+    @cached_property
+    def refs(self) -> Mapping[int, str]:
+        return {z["ReferenceNumber"]: z["SourceName"] for z in (self.nav / "Reference").contents}
+
+    @cached_property
+    def tables(self) -> _SubsectionNavigator:
+        return _SubsectionNavigator(self._data, "external_tables")
+
+    @cached_property
+    def links(self) -> _SubsectionNavigator:
+        return _SubsectionNavigator(self._data, "link_sets")
+
+
 class PubchemDataView(metaclass=abc.ABCMeta):
     """ """
 
-    def __init__(self, data: NestedDotDict):
+    def __init__(self, data: NestedDotDict, index: Optional[_PubchemIndex] = None):
         self._data = data
+        self._index = _PubchemIndex(data) if index is None else index
 
     def to_json(self) -> str:
         return self._data.to_json(indent=True)
@@ -73,15 +138,15 @@ class PubchemDataView(metaclass=abc.ABCMeta):
 
     @property
     def _toc(self) -> JsonNavigator:
-        return self._nav / "Section" % "TOCHeading"
+        return self._index.toc
 
     @property
-    def _tables(self) -> JsonNavigator:
-        return JsonNavigator.create(self._data) / "external_tables"
+    def _tables(self) -> _SubsectionNavigator:
+        return self._index.tables
 
     @property
-    def _links(self) -> JsonNavigator:
-        return JsonNavigator.create(self._data) / "link_sets"
+    def _links(self) -> _SubsectionNavigator:
+        return self._index.links
 
     @property
     def _classifications(self) -> JsonNavigator:
@@ -89,11 +154,11 @@ class PubchemDataView(metaclass=abc.ABCMeta):
 
     @property
     def _nav(self) -> JsonNavigator:
-        return JsonNavigator.create(self._data) / "record"
+        return self._index.nav
 
     @property
     def _refs(self) -> Mapping[int, str]:
-        return {z["ReferenceNumber"]: z["SourceName"] for z in (self._nav / "Reference").contents}
+        return self._index.refs
 
     def _has_ref(self, name: str) -> FilterFn:
         return FilterFn(lambda dot: self._refs.get(dot.get_as("ReferenceNumber", int)) == name)
@@ -106,7 +171,7 @@ class PubchemMiniDataView(PubchemDataView, metaclass=abc.ABCMeta):
     def _whoami(self) -> str:
         raise NotImplementedError()
 
-    @property
+    @cached_property
     def _mini(self) -> JsonNavigator:
         return self._toc / self._whoami / "Section" % "TOCHeading"
 
@@ -206,31 +271,18 @@ class NamesAndIdentifiers(PubchemMiniDataView):
 
     @cached_property
     def create_date(self) -> date:
-        return (
-            self._toc
-            / "Create Date"
-            / "Information"
-            / self._has_ref("PubChem")
-            / "Value"
-            // ["DateISO8601"]
-            // Flatmap.require_only()
-            / date.fromisoformat
-            // Flatmap.require_only()
-        ).get
+        return self._date("Create Date")
 
     @cached_property
     def modify_date(self) -> date:
-        return (
-            self._toc
-            / "Modify Date"
-            / "Information"
-            / self._has_ref("PubChem")
-            / "Value"
-            // ["DateISO8601"]
-            // Flatmap.require_only()
-            / date.fromisoformat
-            // Flatmap.require_only()
-        ).get
+        return self._date("Modify Date")
+
+    def _date(self, heading: str) -> date:
+        # these are under Names and Identifiers, and each value is a list of one ISO 8601 date
+        values = (
+            self._mini / heading / "Information" / self._has_ref("PubChem") / "Value"
+        ).contents
+        return date.fromisoformat(CommonTools.only([d for v in values for d in v["DateISO8601"]]))
 
 
 class ChemicalAndPhysicalProperties(PubchemMiniDataView):
@@ -1006,57 +1058,57 @@ class PubchemData(PubchemDataView):
             logger.error(f"NO CIDs for {self.cid}")
             return set()
 
-    @property
+    @cached_property
     def title_and_summary(self) -> TitleAndSummary:
-        return TitleAndSummary(self._data)
+        return TitleAndSummary(self._data, self._index)
 
-    @property
+    @cached_property
     def names_and_identifiers(self) -> NamesAndIdentifiers:
-        return NamesAndIdentifiers(self._data)
+        return NamesAndIdentifiers(self._data, self._index)
 
-    @property
+    @cached_property
     def chemical_and_physical_properties(self) -> ChemicalAndPhysicalProperties:
-        return ChemicalAndPhysicalProperties(self._data)
+        return ChemicalAndPhysicalProperties(self._data, self._index)
 
-    @property
+    @cached_property
     def related_records(self) -> RelatedRecords:
-        return RelatedRecords(self._data)
+        return RelatedRecords(self._data, self._index)
 
-    @property
+    @cached_property
     def drug_and_medication_information(self) -> DrugAndMedicationInformation:
-        return DrugAndMedicationInformation(self._data)
+        return DrugAndMedicationInformation(self._data, self._index)
 
-    @property
+    @cached_property
     def pharmacology_and_biochemistry(self) -> PharmacologyAndBiochemistry:
-        return PharmacologyAndBiochemistry(self._data)
+        return PharmacologyAndBiochemistry(self._data, self._index)
 
-    @property
+    @cached_property
     def safety_and_hazards(self) -> SafetyAndHazards:
-        return SafetyAndHazards(self._data)
+        return SafetyAndHazards(self._data, self._index)
 
-    @property
+    @cached_property
     def toxicity(self) -> Toxicity:
-        return Toxicity(self._data)
+        return Toxicity(self._data, self._index)
 
-    @property
+    @cached_property
     def literature(self) -> Literature:
-        return Literature(self._data)
+        return Literature(self._data, self._index)
 
-    @property
+    @cached_property
     def associated_disorders_and_diseases(self) -> AssociatedDisordersAndDiseases:
-        return AssociatedDisordersAndDiseases(self._data)
+        return AssociatedDisordersAndDiseases(self._data, self._index)
 
-    @property
+    @cached_property
     def biomolecular_interactions_and_pathways(self) -> BiomolecularInteractionsAndPathways:
-        return BiomolecularInteractionsAndPathways(self._data)
+        return BiomolecularInteractionsAndPathways(self._data, self._index)
 
-    @property
+    @cached_property
     def biological_test_results(self) -> BiologicalTestResults:
-        return BiologicalTestResults(self._data)
+        return BiologicalTestResults(self._data, self._index)
 
-    @property
+    @cached_property
     def classification(self) -> Classification:
-        return Classification(self._data)
+        return Classification(self._data, self._index)
 
     @property
     def struct_view(self) -> CompoundStruct:
@@ -0,0 +1,355 @@
+"""
+On-disk storage for cached PubChem data.
+"""
+from __future__ import annotations
+
+import abc
+import sqlite3
+import threading
+import zlib
+from pathlib import Path
+from typing import Any, Callable, Iterator, Mapping, Optional, Sequence, Tuple, Union
+
+import decorateme
+import orjson
+from pocketutils.core.dot_dict import NestedDotDict
+from pocketutils.core.enums import CleverEnum
+
+from mandos.model.apis.pubchem_support.pubchem_data import PubchemData
+from mandos.model.utils import unlink
+from mandos.model.utils.setup import logger
+
+Key = Union[int, str]
+
+
+class PubchemStoreType(CleverEnum):
+    json = ()
+    sqlite = ()
+
+
+@decorateme.auto_repr_str()
+class PubchemStore(metaclass=abc.ABCMeta):
+    """
+    Stores PubChem data by CID, InChI Key, and other aliases.
+    Also remembers keys that were not found in PubChem.
+    """
+
+    def contains(self, key: Key) -> bool:
+        raise NotImplementedError()
+
+    def read(self, key: Key) -> Optional[PubchemData]:
+        """
+        Reads the data for a key.
+
+        Returns:
+            The data, or None if the key was previously not found in PubChem
+
+        Raises:
+            KeyError: If the key is not stored
+        """
+        raise NotImplementedError()
+
+    def write(self, data: PubchemData, *aliases: Key) -> None:
+        """
+        Stores data under its parent CID, its InChI Key, its siblings, and ``aliases``.
+        """
+        raise NotImplementedError()
+
+    def write_missing(self, key: Key) -> None:
+        """
+        Records that ``key`` was not found in PubChem.
+        """
+        raise NotImplementedError()
+
+
+class DirPubchemStore(PubchemStore):
+    """
+    Stores one ``<cid>.json.gz`` per compound, with hard links for its aliases.
+    Keys not found in PubChem get an empty JSON object.
+    """
+
+    def __init__(self, cache_dir: Path):
+        self._cache_dir = cache_dir
+
+    def contains(self, key: Key) -> bool:
+        return self.data_path(key).exists()
+
+    def read(self, key: Key) -> Optional[PubchemData]:
+        path = self.data_path(key)
+        if not path.exists():
+            raise KeyError(f"{key} not stored in {self._cache_dir}")
+        return self._read_json(path)
+
+    def write(self, data: PubchemData, *aliases: Key) -> None:
+        cid = data.parent_or_self  # if there's ever a parent of a parent, this will NOT work
+        path = self.data_path(cid)
+        if path.exists():
+            logger.error(f"PubChem data for {aliases} parent CID {cid} exists")
+            logger.error(f"Writing over {path} for {aliases}")
+        else:
+            logger.debug(f"PubChem data for {aliases} parent CID {cid} does not exist")
+        data._data.write_json(path, mkdirs=True)
+        self._write_siblings(data, *aliases)
+        logger.debug(f"Wrote PubChem data to {path.resolve()}")
+
+    def write_missing(self, key: Key) -> None:
+        path = self.data_path(key)
+        NestedDotDict({}).write_json(path, mkdirs=True)
+        logger.trace(f"Wrote empty PubChem data to {path}")
+
+    def records(self) -> Iterator[Tuple[Sequence[str], Optional[PubchemData]]]:
+        """
+        Yields each stored compound once, with all of the keys it is stored under.
+        The data is None for keys that were not found in PubChem.
+        """
+        by_inode = {}
+        data_dir = self._cache_dir / "data"
+        if not data_dir.exists():
+            return
+        for path in data_dir.iterdir():
+            if path.name.endswith(".json.gz"):
+                by_inode.setdefault(path.stat().st_ino, []).append(path)
+        for paths in by_inode.values():
+            keys = [p.name[: -len(".json.gz")] for p in paths]
+            yield keys, self._read_json(paths[0])
+
+    def _write_siblings(self, data: PubchemData, *others: Key):
+        cid = data.parent_or_self
+        path = self.data_path(cid)
+        aliases = {self.data_path(data.inchikey), *data.siblings, *others}
+        for alias in aliases:
+            link = self.data_path(alias)
+            if link != path and link.resolve() != path.resolve():
+                unlink(link, missing_ok=True)
+                path.link_to(link)
+        logger.debug(f"Added aliases {','.join([str(s) for s in aliases])} ⇌ {cid} ({path})")
+
+    def data_path(self, inchikey_or_cid: Key) -> Path:
+        return self._cache_dir / "data" / f"{inchikey_or_cid}.json.gz"
+
+    def _read_json(self, path: Path) -> Optional[PubchemData]:
+        dot = NestedDotDict.read_json(path)
+        return PubchemData(dot) if len(dot) > 0 else None
+
+
+class SqlitePubchemStore(PubchemStore):
+    """
+    Stores each compound as separately compressed sections in a single SQLite file.
+
+    The top-level sections (``record``, ``structure``, etc.) are stored separately,
+    as is each of the ``external_tables`` and ``link_sets``.
+    Reading returns data that decodes each section only when it is first accessed,
+    so a search that only needs ``external_tables.drugbank`` never decodes ``record``.
+    """
+
+    # these are split into a section per child
+    _groups = frozenset({"external_tables", "link_sets"})
+
+    def __init__(self, path: Path, *, level: int = 6):
+        self._path = path
+        self._level = level
+        self._lock = threading.Lock()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS aliases (key TEXT PRIMARY KEY, cid INTEGER)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS sections (cid INTEGER NOT NULL, name TEXT NOT NULL,"
+                + " n_bytes INTEGER NOT NULL, data BLOB NOT NULL, PRIMARY KEY (cid, name))"
+            )
+
+    @property
+    def path(self) -> Path:
+        return self._path
+
+    def contains(self, key: Key) -> bool:
+        with self._lock:
+            row = self._conn.execute("SELECT 1 FROM aliases WHERE key=?", (str(key),)).fetchone()
+        return row is not None
+
+    def read(self, key: Key) -> Optional[PubchemData]:
+        with self._lock:
+            row = self._conn.execute("SELECT cid FROM aliases WHERE key=?", (str(key),)).fetchone()
+            if row is None:
+                raise KeyError(f"{key} not stored in {self._path}")
+            cid = row[0]
+            if cid is None:
+                return None
+            names = self._conn.execute(
+                "SELECT name, n_bytes FROM sections WHERE cid=? ORDER BY rowid", (cid,)
+            ).fetchall()
+        return PubchemData(self._lazy(cid, dict(names)))
+
+    def write(self, data: PubchemData, *aliases: Key) -> None:
+        cid = data.parent_or_self
+        # normalize any NestedDotDicts inside to plain JSON values
+        raw = orjson.loads(data._data.to_json())
+        rows = []
+        for name, value in self._split(raw):
+            encoded = orjson.dumps(value)
+            rows.append((cid, name, len(encoded), zlib.compress(encoded, self._level)))
+        keys = {str(cid), *[str(s) for s in data.siblings], *[str(a) for a in aliases]}
+        if data.inchikey is not None:
+            keys.add(data.inchikey)
+        with self._lock:
+            with self._conn:
+                self._conn.execute("BEGIN")
+                self._conn.execute("DELETE FROM sections WHERE cid=?", (cid,))
+                self._conn.executemany("INSERT INTO sections VALUES (?, ?, ?, ?)", rows)
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO aliases VALUES (?, ?)", [(k, cid) for k in keys]
+                )
+        logger.debug(f"Wrote {len(rows)} PubChem sections for {cid} ({', '.join(keys)})")
+
+    def write_missing(self, key: Key) -> None:
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO aliases VALUES (?, NULL)", (str(key),))
+
+    def migrate_from(self, source: DirPubchemStore) -> int:
+        """
+        Copies everything from a :class:`DirPubchemStore` into this one.
+
+        Returns:
+            The number of compounds (or missing keys) copied
+        """
+        n = 0
+        for keys, data in source.records():
+            if data is None:
+                for key in keys:
+                    self.write_missing(key)
+            else:
+                self.write(data, *keys)
+            n += 1
+            if n % 1000 == 0:
+                logger.info(f"Migrated {n:,} PubChem records to {self._path}")
+        logger.info(f"Migrated {n:,} PubChem records to {self._path}")
+        return n
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _split(self, raw: Mapping[str, Any]) -> Iterator[Tuple[str, Any]]:
+        for name, value in raw.items():
+            if name in self._groups and isinstance(value, Mapping):
+                for child, child_value in value.items():
+                    yield name + "." + child, child_value
+            else:
+                yield name, value
+
+    def _lazy(self, cid: int, sizes: Mapping[str, int]) -> _LazyDotDict:
+        def load(name: str) -> Any:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT data FROM sections WHERE cid=? AND name=?", (cid, name)
+                ).fetchone()
+            return orjson.loads(zlib.decompress(row[0]))
+
+        # keep the original order of the sections
+        top, groups = {}, {}
+        for name in sizes.keys():
+            if "." in name:
+                group, child = name.split(".", 1)
+                top[group] = None
+                groups.setdefault(group, []).append(child)
+            else:
+                top[name] = None
+
+        def load_top(name: str) -> Any:
+            if name in groups:
+                children = groups[name]
+                return _LazySections(children, lambda c: load(name + "." + c))
+            return load(name)
+
+        return _LazyDotDict(_LazySections(list(top), load_top), sum(sizes.values()))
+
+
+class _LazySections(dict):
+    """
+    A dict that decodes each value only when it's first accessed.
+    """
+
+    def __init__(self, names: Sequence[str], load: Callable[[str], Any]):
+        super().__init__()
+        self._names = list(names)
+        self._load = load
+
+    def __missing__(self, key: str) -> Any:
+        if key not in self._names:
+            raise KeyError(key)
+        value = self._load(key)
+        dict.__setitem__(self, key, value)
+        return value
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._names
+
+    def __iter__(self):
+        return iter(self._names)
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self[key] if key in self._names else default
+
+    def keys(self):
+        return list(self._names)
+
+    def values(self):
+        return [self[k] for k in self._names]
+
+    def items(self):
+        return [(k, self[k]) for k in self._names]
+
+    def realize(self) -> dict:
+        return {k: v.realize() if isinstance(v, _LazySections) else v for k, v in self.items()}
+
+    def __repr__(self) -> str:
+        return repr(self.realize())
+
+
+class _LazyDotDict(NestedDotDict):
+    """
+    A :class:`NestedDotDict` over :class:`_LazySections`.
+    """
+
+    def __init__(self, x: _LazySections, n_bytes: int):
+        # NestedDotDict.__init__ walks (and so would decode) everything
+        self._x = x
+        self._n_bytes = n_bytes
+
+    def n_bytes_total(self) -> int:
+        # the size of the JSON, which is cheaper to know than the size of the objects
+        return self._n_bytes
+
+    def to_json(self, *, indent: bool = False) -> str:
+        return NestedDotDict(self._x.realize()).to_json(indent=indent)
+
+    def __str__(self) -> str:
+        return repr(self._x)
+
+
+class PubchemStores:
+    @classmethod
+    def new(cls, cache_dir: Path, kind: Union[str, PubchemStoreType]) -> PubchemStore:
+        kind = PubchemStoreType.of(kind)
+        if kind is PubchemStoreType.sqlite:
+            return SqlitePubchemStore(cls.sqlite_path(cache_dir))
+        return DirPubchemStore(cache_dir)
+
+    @classmethod
+    def sqlite_path(cls, cache_dir: Path) -> Path:
+        return cache_dir / "data.sqlite"
+
+
+__all__ = [
+    "DirPubchemStore",
+    "PubchemStore",
+    "PubchemStores",
+    "PubchemStoreType",
+    "SqlitePubchemStore",
+]
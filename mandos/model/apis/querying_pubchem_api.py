@@ -3,10 +3,13 @@ PubChem querying API.
 """
 from __future__ import annotations
 
+import contextvars
 import io
+import threading
 import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime, timezone
-from typing import Any, List, Mapping, NamedTuple, Optional, Sequence, Union
+from typing import Any, Callable, List, Mapping, NamedTuple, Optional, Sequence, TypeVar, Union
 from urllib.error import HTTPError
 
 import orjson
@@ -21,10 +24,12 @@ from pocketutils.core.exceptions import (
 from pocketutils.core.query_utils import QueryExecutor, QueryMixin
 
 from mandos.model.apis.pubchem_api import PubchemApi, PubchemCompoundLookupError
+from mandos.model.apis.pubchem_resolver import PubchemResolution
 from mandos.model.apis.pubchem_support.pubchem_data import PubchemData
 from mandos.model.settings import QUERY_EXECUTORS, SETTINGS
 from mandos.model.utils.setup import logger
 
+T = TypeVar("T")
 _html_cid_pattern = regex.compile(
     r'<meta property="og:url" content="https://pubchem\.ncbi\.nlm\.nih\.gov/compound/(\d+)">',
     flags=regex.V1,
@@ -44,12 +49,24 @@ class QueryingPubchemApi(PubchemApi, QueryMixin):
         classifiers: bool = False,
         extra_classifiers: bool = False,
         executor: QueryExecutor = QUERY_EXECUTORS.pubchem,
+        max_concurrent: int = SETTINGS.pubchem_max_concurrent,
     ):
+        """
+        Constructor.
+
+        Args:
+            executor: Rate-limits all requests, so must be thread-safe if ``max_concurrent > 1``
+            max_concurrent: Max number of requests for a single compound to have in flight at once
+        """
         self._use_chem_data = chem_data
         self._use_extra_tables = extra_tables
         self._use_classifiers = classifiers
         self._use_extra_classifiers = extra_classifiers
         self._executor = executor
+        self._max_concurrent = max_concurrent
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+        self._resolution = PubchemResolution.empty()
 
     _pug = "https://pubchem.ncbi.nlm.nih.gov/rest/pug"
     _pug_view = "https://pubchem.ncbi.nlm.nih.gov/rest/pug_view"
@@ -57,8 +74,14 @@ class QueryingPubchemApi(PubchemApi, QueryMixin):
     _classifications = "https://pubchem.ncbi.nlm.nih.gov/classification/cgi/classifications.fcgi"
     _link_db = "https://pubchem.ncbi.nlm.nih.gov/link_db/link_db_server.cgi"
 
+    def use_resolution(self, resolution: PubchemResolution) -> None:
+        self._resolution = resolution
+
     def find_inchikey(self, cid: int) -> str:
         # return self.fetch_data(cid).names_and_identifiers.inchikey
+        inchikey = self._resolution.inchikey_of(cid)
+        if inchikey is not None:
+            return inchikey
         props = self.fetch_properties(cid)
         return props["InChIKey"]
 
@@ -112,8 +135,14 @@ class QueryingPubchemApi(PubchemApi, QueryMixin):
             inchikey = self.find_inchikey(cid)
             logger.debug(f"Matched CID {cid} to {inchikey}")
         else:
-            cid = self._scrape_cid(inchikey)
-            logger.debug(f"Matched inchikey {inchikey} to CID {cid} (scraped)")
+            cid = self._resolution.cid_of(inchikey)
+            if cid is not None:
+                logger.debug(f"Matched inchikey {inchikey} to CID {cid} (batch)")
+            elif inchikey in self._resolution.missing_inchikeys:
+                raise PubchemCompoundLookupError(f"{inchikey} not found in batch lookup")
+            else:
+                cid = self._scrape_cid(inchikey)
+                logger.debug(f"Matched inchikey {inchikey} to CID {cid} (scraped)")
         stack = []
         data = self._fetch_data(cid, inchikey, stack)
         logger.debug(f"DLed raw data for {cid}/{inchikey}")
@@ -203,15 +232,49 @@ class QueryingPubchemApi(PubchemApi, QueryMixin):
         return PubchemData(NestedDotDict(data))
 
     def _fetch_core_data(self, cid: int, stack: List[_CidInchikey]) -> dict:
-        return dict(
-            record=self._fetch_display_data(cid),
-            linked_records=self._get_linked_records(cid, stack),
-            structure=self._fetch_structure_data(cid),
-            external_tables=self._fetch_external_tables(cid),
-            link_sets=self._fetch_external_linksets(cid),
-            classifications=self._fetch_hierarchies(cid),
-            properties=NestedDotDict(self.fetch_properties(cid)),
-        )
+        # these ~30 requests are independent, so issue them all at once
+        # the (shared) executor still limits how quickly they start
+        record = self._submit(self._fetch_display_data, cid)
+        linked_records = self._submit(self._get_linked_records, cid, stack)
+        structure = self._submit(self._fetch_structure_data, cid)
+        tables = {
+            table: self._submit(self._fetch_external_table, cid, table)
+            for table in self._tables_to_use.values()
+        }
+        linksets = {
+            table: self._submit(self._fetch_external_linkset, cid, table)
+            for table in self._linksets_to_use.values()
+        }
+        hierarchies = {
+            hname: self._submit(self._fetch_hierarchy, cid, hname, hid)
+            for hname, hid in self._hierarchies_to_use.items()
+        }
+        properties = self._submit(self.fetch_properties, cid)
+        futures = [record, linked_records, structure, properties]
+        futures += [*tables.values(), *linksets.values(), *hierarchies.values()]
+        try:
+            return dict(
+                record=record.result(),
+                linked_records=linked_records.result(),
+                structure=structure.result(),
+                external_tables=self._fetch_external_tables(cid, tables),
+                link_sets=self._fetch_external_linksets(cid, linksets),
+                classifications=self._fetch_hierarchies(cid, hierarchies),
+                properties=NestedDotDict(properties.result()),
+            )
+        except BaseException:
+            # don't keep querying for a compound we've failed on
+            for future in futures:
+                future.cancel()
+            raise
+
+    def _submit(self, fn: Callable[..., T], *args) -> Future[T]:
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(self._max_concurrent, thread_name_prefix="pubchem")
+        # copy the context so that logger.contextualize works in the pool
+        ctx = contextvars.copy_context()
+        return self._pool.submit(ctx.run, fn, *args)
 
     def _get_metadata(
         self, inchikey: str, started: datetime, finished: datetime, t0: float, t1: float
@@ -249,34 +312,35 @@ class QueryingPubchemApi(PubchemApi, QueryMixin):
         logger.debug(f"DLed structure for {cid}")
         return data
 
-    def _fetch_external_tables(self, cid: int) -> Mapping[str, str]:
-        x = {
-            ext_table: self._fetch_external_table(cid, ext_table)
-            for ext_table in self._tables_to_use.values()
-        }
-        logger.debug(f"DLed {len(self._tables_to_use)} external tables for {cid}")
+    def _fetch_external_tables(
+        self, cid: int, futures: Mapping[str, Future[Sequence[dict]]]
+    ) -> Mapping[str, Sequence[dict]]:
+        x = {ext_table: future.result() for ext_table, future in futures.items()}
+        logger.debug(f"DLed {len(futures)} external tables for {cid}")
         return x
 
-    def _fetch_external_linksets(self, cid: int) -> Mapping[str, str]:
-        x = {
-            table: self._fetch_external_linkset(cid, table)
-            for table in self._linksets_to_use.values()
-        }
-        logger.debug(f"DLed {len(self._linksets_to_use)} external linksets for {cid}")
+    def _fetch_external_linksets(
+        self, cid: int, futures: Mapping[str, Future[NestedDotDict]]
+    ) -> Mapping[str, NestedDotDict]:
+        x = {table: future.result() for table, future in futures.items()}
+        logger.debug(f"DLed {len(futures)} external linksets for {cid}")
         return x
 
-    def _fetch_hierarchies(self, cid: int) -> NestedDotDict:
+    def _fetch_hierarchies(
+        self, cid: int, futures: Mapping[str, Future[Sequence[dict]]]
+    ) -> NestedDotDict:
         build_up = {}
-        for hname, hid in self._hierarchies_to_use.items():
+        for hname, future in futures.items():
             try:
-                build_up[hname] = self._fetch_hierarchy(cid, hname, hid)
+                build_up[hname] = future.result()
             except (HTTPError, KeyError, LookupError) as e:
+                hid = self._hierarchies_to_use[hname]
                 logger.debug(f"No data for classifier {hid}, compound {cid}: {e}")
         # These list all of the child nodes for each node
         # Some of them are > 1000 items -- they're HUGE
         # We don't expect to need to navigate to children
         self._strip_by_key_in_place(build_up, "ChildID")
-        logger.debug(f"DLed {len(self._hierarchies_to_use)} hierarchies for {cid}")
+        logger.debug(f"DLed {len(futures)} hierarchies for {cid}")
         return NestedDotDict(build_up)
 
     def _fetch_external_table(self, cid: int, table: str) -> Sequence[dict]:
@@ -390,7 +454,7 @@ class QueryingPubchemApi(PubchemApi, QueryMixin):
 
     @property
     def executor(self) -> QueryExecutor:
-        raise NotImplementedError()
+        return self._executor
 
     def _strip_by_key_in_place(self, data: Union[dict, list], bad_key: str) -> None:
         if isinstance(data, list):
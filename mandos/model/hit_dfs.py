@@ -1,4 +1,6 @@
-from typing import Sequence
+from collections import defaultdict
+from operator import attrgetter
+from typing import Iterable, Optional, Sequence, Tuple, Type
 
 import numpy as np
 import pandas as pd
@@ -7,76 +9,186 @@ from typeddfs import TypedDfs
 from typeddfs.abs_dfs import AbsDf
 
 from mandos.model.concrete_hits import HIT_CLASSES
-from mandos.model.hits import AbstractHit
+from mandos.model.hits import AbstractHit, Triple
 from mandos.model.utils.setup import logger
 
+# highly repetitive, so dictionary-encoded, in memory and in feather and parquet files
+_CATEGORICAL = [
+    "predicate",
+    "object_name",
+    "search_key",
+    "search_class",
+    "data_source",
+    "hit_class",
+    "compound_name",
+]
+
+
+def _categorical(s: pd.Series) -> pd.Series:
+    if not isinstance(s.dtype, pd.CategoricalDtype):
+        s = s.astype("category")
+    # like astype(str) on the distinct values, except that missing values stay missing
+    if pd.api.types.infer_dtype(s.cat.categories, skipna=False) not in {"string", "empty"}:
+        s = s.cat.rename_categories(s.cat.categories.astype(str))
+    return s
+
+
+def _encode(df: AbsDf) -> AbsDf:
+    for c in _CATEGORICAL:
+        if c in df.columns:
+            df[c] = _categorical(df[c])
+    return df
+
+
+def _decode(s: pd.Series) -> list:
+    if isinstance(s.dtype, pd.CategoricalDtype) and s.hasnans:
+        return s.astype(object).where(s.notna(), None).tolist()
+    return s.tolist()
+
+
+def _concat(cls, dfs: Iterable[pd.DataFrame], keys: Optional[Iterable[str]] = None) -> AbsDf:
+    # pd.concat would decode categorical columns unless they have the same categories
+    dfs = [df.copy(deep=False) for df in dfs]
+    for c in _CATEGORICAL:
+        cols = [df[c] for df in dfs if c in df.columns]
+        if len(cols) > 1 and all(isinstance(col.dtype, pd.CategoricalDtype) for col in cols):
+            cats = pd.Index(np.concatenate([col.cat.categories.to_numpy() for col in cols]))
+            cats = cats.unique()
+            for df in dfs:
+                if c in df.columns:
+                    df[c] = df[c].cat.set_categories(cats)
+    return cls.of(dfs, keys=keys)
+
 
 def _from_hits(cls, hits: Sequence[AbstractHit]) -> AbsDf:
-    data = []
     if len(hits) == 0:
         logger.debug(f"No hits")
         return cls.new_df()
-    for hit in hits:
-        x = {f: getattr(hit, f) for f in hit.__class__.fields()}
-        x["universal_id"] = hit.universal_id
-        x["hit_class"] = hit.hit_class
-        data.append(x)
-    return cls.of([pd.Series(x) for x in data])
+    # build columns for each hit class, rather than a Series for each hit
+    positions = defaultdict(list)
+    for i, hit in enumerate(hits):
+        positions[hit.__class__].append(i)
+    dfs = []
+    for clazz, indices in positions.items():
+        class_hits = [hits[i] for i in indices] if len(positions) > 1 else hits
+        fields = clazz.fields()
+        # every hit class has several fields, so attrgetter returns tuples
+        columns = zip(*map(attrgetter(*fields), class_hits))
+        df = pd.DataFrame(dict(zip(fields, columns)), index=indices)
+        df["universal_id"] = _universal_ids(clazz, df)
+        df["hit_class"] = clazz.__name__
+        dfs.append(df)
+    # a column that is all None for one class would otherwise make the whole column object
+    df = dfs[0] if len(dfs) == 1 else pd.concat(dfs).sort_index().infer_objects()
+    return cls.of(df.reset_index(drop=True))
 
 
-def _to_hits(self: AbsDf) -> Sequence[AbstractHit]:
-    hits = []
-    for row in self.itertuples():
-        # noinspection PyUnresolvedReferences
-        c = row.hit_class
-        # TODO: remove
-        if c == "_DrugbankInteractionHit" and row.data_source == "drugbank:target-functions":
-            c = "DrugbankGeneralFunctionHit"
-        elif c == "_DrugbankInteractionHit" and row.data_source == "drugbank:targets":
-            c = "DrugbankTargetHit"
+def _universal_ids(clazz: Type[AbstractHit], df: pd.DataFrame) -> Sequence[str]:
+    # the same as hit.universal_id, but hashing each distinct value of a column only once
+    digests = []
+    for field in clazz.id_fields():
+        col = df[field]
+        if isinstance(col.dtype, pd.CategoricalDtype):
+            codes, uniques = col.cat.codes.to_numpy(), col.cat.categories
+        else:
+            codes, uniques = pd.factorize(col.to_numpy())
+        buffer = b"".join(clazz.field_digest(field, v) for v in [*uniques, None])
+        # code -1 (missing) indexes the digest of None, which is last
+        digests.append(np.frombuffer(buffer, dtype=np.uint64)[codes])
+    rows = np.column_stack(digests).tobytes()
+    width = 8 * len(digests)
+    view = memoryview(rows)
+    return [clazz.universal_id_of(view[i : i + width]) for i in range(0, len(rows), width)]
+
+
+def _hit_classes(self: AbsDf) -> Tuple[np.ndarray, Sequence[Type[AbstractHit]]]:
+    classes = self["hit_class"].to_numpy(dtype=object)
+    # TODO: remove
+    old = classes == "_DrugbankInteractionHit"
+    if old.any():
+        classes = classes.copy()
+        sources = self["data_source"].to_numpy(dtype=object)
+        classes[old & (sources == "drugbank:target-functions")] = "DrugbankGeneralFunctionHit"
+        classes[old & (sources == "drugbank:targets")] = "DrugbankTargetHit"
+    codes, names = pd.factorize(classes)
+    clazzes = []
+    for c in names:
         try:
             clazz = HIT_CLASSES[c]
         except KeyError:
             raise InjectionError(f"No hit class {c}") from None
         # ignore extra columns
-        # if cols are missing, let it fail on clazz.__init__
-        data = {f: getattr(row, f) for f in clazz.fields()}
-        missing = set(clazz.fields()) - set(data.keys())
-        extra = set(data.keys()) - set(clazz.fields())
-        if len(missing) + len(extra) > 0:
-            logger.opt(exception=True).debug(
+        missing = [f for f in clazz.fields() if f not in self.columns]
+        if len(missing) > 0:
+            logger.debug(
                 f"Fields for {c} do not match:"
                 + f" expected {', '.join(clazz.fields())};"
-                + f" got {', '.join(data.keys())}"
-            )
-            logger.debug(f"Data passed to {clazz}: {data}")
-            raise InjectionError(
-                f"Mismatch of fields for {c}: missing {','.join(missing)}; extra {','.join(extra)}"
+                + f" got {', '.join(self.columns)}"
             )
+            raise InjectionError(f"Mismatch of fields for {c}: missing {','.join(missing)}")
+        clazzes.append(clazz)
+    return codes, clazzes
+
+
+def _with_universal_ids(self: AbsDf) -> AbsDf:
+    # recalculates them; files written by older versions have ids that differ between processes
+    if len(self) == 0:
+        return self
+    codes, clazzes = _hit_classes(self)
+    ids = np.empty(len(self), dtype=object)
+    for code, clazz in enumerate(clazzes):
+        indices = np.flatnonzero(codes == code)
+        rows = self.iloc[indices] if len(clazzes) > 1 else self
+        ids[indices] = _universal_ids(clazz, rows)
+    df = self.copy()
+    df["universal_id"] = ids
+    return self.__class__.of(df)
+
+
+def _to_hits(self: AbsDf) -> Sequence[AbstractHit]:
+    if len(self) == 0:
+        return []
+    codes, clazzes = _hit_classes(self)
+    hits = [None] * len(self)
+    for code, clazz in enumerate(clazzes):
+        indices = np.flatnonzero(codes == code)
+        rows = self.iloc[indices] if len(clazzes) > 1 else self
+        # decode a column at a time, then make the hits
+        columns = [_decode(rows[f]) for f in clazz.fields()]
         try:
             # noinspection PyArgumentList
-            hit = clazz(**data)
+            for i, values in zip(indices.tolist(), zip(*columns)):
+                hits[i] = clazz(*values)
         except ValueError:
             raise InjectionError(f"Failed to make {clazz}")
-        hits.append(hit)
     return hits
 
 
+def _to_triples(self: AbsDf) -> Sequence[Triple]:
+    # much cheaper than making the hits when only these columns are needed
+    cols = ["origin_inchikey", "predicate", "object_name", "search_key"]
+    return [Triple(*values) for values in zip(*[_decode(self[c]) for c in cols])]
+
+
 HitDf = (
     TypedDfs.typed("HitDf")
     .require("record_id", dtype=str)
     .require("origin_inchikey", "matched_inchikey", dtype=str)
-    .require("predicate", dtype=str)
-    .require("object_id", "object_name", dtype=str)
-    .require("search_key", "search_class", "data_source", dtype=str)
-    .require("hit_class", dtype=str)
+    .require("predicate")
+    .require("object_id", dtype=str)
+    .require("object_name")
+    .require("search_key", "search_class", "data_source")
+    .require("hit_class")
     .require("cache_date", "run_date")
     .reserve("inchi", "smiles", dtype=str)
-    .reserve("compound_id", "compound_name", dtype=str)
+    .reserve("compound_id", dtype=str)
+    .reserve("compound_name")
     .reserve("chembl_id", "pubchem_id", dtype=str)
     .reserve("weight", dtype=np.float64)
-    .add_classmethods(from_hits=_from_hits)
-    .add_methods(to_hits=_to_hits)
+    .post(_encode)
+    .add_classmethods(from_hits=_from_hits, concat=_concat)
+    .add_methods(to_hits=_to_hits, to_triples=_to_triples)
+    .add_methods(with_universal_ids=_with_universal_ids)
     .strict(cols=False)
     .secure()
 ).build()
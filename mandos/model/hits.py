@@ -1,10 +1,25 @@
 import dataclasses
+import functools
 import html
+import numbers
 from dataclasses import dataclass
 from datetime import datetime
-from typing import Optional, Sequence
+from functools import cached_property
+from hashlib import blake2b
+from typing import Any, Optional, Sequence
 
 HIT_FIELD_TYPE = frozenset([str, int, float, datetime])
+_NOT_IDENTIFYING = frozenset(
+    {
+        "record_id",
+        "origin_inchikey",
+        "compound_name",
+        "search_key",
+        "search_class",
+        "run_date",
+        "cache_date",
+    }
+)
 
 
 @dataclass(frozen=True, repr=True, order=True)
@@ -112,35 +127,70 @@ class AbstractHit:
     def __hash__(self):
         return hash(self.record_id)
 
-    @property
+    @cached_property
     def universal_id(self) -> str:
         """
         Gets an identifier (a hex key) that uniquely identifies the record by its unique attributes.
         Does **NOT** distinguish between hits with duplicate information and does **NOT**
         include ``record_id``.
+        The identifier is a BLAKE2 hash, so it is the same between processes and runs.
+        ``HitDf`` calculates the same identifiers for its rows.
 
         Returns:
             A 16-character hexadecimal string
         """
-        # excluding record_id only because it's not available for some hit types
-        # we'd rather immediately see duplicates if the exist
-        # TODO: cache instead
-        fields = {
-            field
-            for field in self.fields()
-            if field
-            not in {"record_id", "origin_inchikey", "compound_name", "search_key", "search_class"}
-        }
-        hexed = hex(hash(tuple([getattr(self, f) for f in fields])))
-        # remove negative signs -- still unique
-        return hexed.replace("-", "").replace("0x", "")
+        digests = [self.field_digest(f, getattr(self, f)) for f in self.id_fields()]
+        return self.universal_id_of(b"".join(digests))
 
     @classmethod
+    @functools.lru_cache()
     def fields(cls) -> Sequence[str]:
         """
         Finds the list of fields in this class by reflection.
         """
-        return [f.name for f in dataclasses.fields(cls)]
+        return tuple(f.name for f in dataclasses.fields(cls))
+
+    @classmethod
+    @functools.lru_cache()
+    def id_fields(cls) -> Sequence[str]:
+        """
+        Returns the fields that ``universal_id`` hashes, in the order it hashes them.
+        """
+        # excluding record_id only because it's not available for some hit types
+        # we'd rather immediately see duplicates if the exist
+        # the dates say when the record was fetched, so the same record from two runs is a duplicate
+        return tuple(sorted(set(cls.fields()) - _NOT_IDENTIFYING))
+
+    @classmethod
+    def field_digest(cls, field: str, value: Any) -> bytes:
+        """
+        Hashes a field's value to 8 bytes, after encoding it canonically.
+
+        Equal values of any type hash the same, e.g. 9606 and 9606.0,
+        or a ``datetime`` and a pandas ``Timestamp``. None and NaN hash the same.
+        """
+        if value is None or value != value:
+            encoded = b"\x00"
+        elif isinstance(value, str):
+            encoded = b"s" + value.encode("utf-8")
+        elif isinstance(value, datetime):
+            encoded = b"t" + value.isoformat().encode("utf-8")
+        elif isinstance(value, numbers.Integral) or (
+            isinstance(value, numbers.Real) and float(value).is_integer()
+        ):
+            encoded = b"n%d" % int(value)
+        elif isinstance(value, numbers.Real):
+            encoded = b"n" + repr(float(value)).encode("utf-8")
+        else:
+            encoded = b"o" + str(value).encode("utf-8")
+        return blake2b(field.encode("utf-8") + b"\x1f" + encoded, digest_size=8).digest()
+
+    @classmethod
+    def universal_id_of(cls, digests: bytes) -> str:
+        """
+        Combines the ``field_digest`` of each of the ``id_fields`` into a ``universal_id``.
+        """
+        return blake2b(digests, digest_size=8).hexdigest()
 
 
 __all__ = ["AbstractHit", "KeyPredObj", "KeyPredObjSource", "Triple", "HIT_FIELD_TYPE"]
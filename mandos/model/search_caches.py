@@ -1,6 +1,8 @@
 """
 Temporary caching of search results as they progress.
 """
+import os
+import threading
 from pathlib import Path
 from typing import Iterator, Sequence
 
@@ -8,47 +10,62 @@ import decorateme
 import orjson
 from pocketutils.core.exceptions import PathExistsError
 
-from mandos.model.settings import SETTINGS
 from mandos.model.utils.setup import logger
 
 
 @decorateme.auto_repr_str()
 class SearchCache:
+    """
+    Tracks which compounds are done in an append-only journal, one InChI Key per line.
+
+    Each call to :meth:`save` appends its compounds with a single ``write`` to a file opened
+    with ``O_APPEND``, then ``fsync``s it. So recording a compound costs the same regardless
+    of how many are done, and several threads can share one cache.
+    Only one process should use a journal at a time.
+    If the process is killed mid-write, the torn last line is discarded on the next load.
+    The journal is only rewritten (atomically) if there is something to drop.
+    Call :meth:`close` or :meth:`kill` when done.
+    """
+
     def __init__(self, path: Path, compounds: Sequence[str], *, restart: bool, proceed: bool):
-        # TODO: This class is pretty bad
         self._path = path
-        exists = self._path.exists() and self._meta_path.exists()
+        self._lock = threading.Lock()
+        self._done = set()
+        self._torn = False
+        # the output file itself is only written at the end (see Searcher)
+        exists = self._meta_path.exists() or self._legacy_meta_path.exists()
         if exists:
-            self._data = orjson.loads(self._meta_path.read_text(encoding="utf8"))
-            if "done" not in self._data:
-                logger.warning(f"Invalid progress file {self._meta_path}; restarting")
-                exists = False
+            self._done = self._load()
         if not exists:
-            self._data = dict(path=str(self.path), done=set())
             logger.debug(f"Starting fresh cache for {self.path}")
         elif exists and restart:
             logger.caution(f"Replacing {path} with {self.at} processed compounds")
-            self._data["done"] = set()
+            self._done = set()
         elif exists and proceed:
             logger.caution(f"Resuming {path} with {self.at} processed compounds")
         elif exists:
             raise PathExistsError(f"{path} already exists with {self.at} processed compounds")
-        self.save()  # must write -- divisible by 0
-        self._queue: Iterator[str] = iter([c for c in compounds if c not in self._data["done"]])
+        if not exists or restart or self._torn or self._legacy_meta_path.exists():
+            self._rewrite()
+        self._fd = os.open(self._meta_path, os.O_WRONLY | os.O_APPEND)
+        self._queue: Iterator[str] = iter([c for c in compounds if c not in self._done])
 
     def next(self) -> str:
         return next(self._queue)
 
     def save(self, *compounds: str) -> None:
-        if isinstance(self._data["done"], list):  # TODO
-            self._data["done"] = set(self._data["done"])
-        for c in compounds:
-            self._data["done"].add(c)
-        if self.at % SETTINGS.save_every == 0:
-            dat = {k: (list(v) if isinstance(v, set) else v) for k, v in self._data.items()}
-            dat = orjson.dumps(dat).decode(encoding="utf8")
-            self._meta_path.write_text(dat, encoding="utf8")
-            logger.debug(f"Saved to {self._meta_path}")
+        """
+        Durably marks compounds as done.
+        Call this only once their results are saved.
+        """
+        with self._lock:
+            new = [c for c in compounds if c not in self._done]
+            if len(new) == 0:
+                return
+            os.write(self._fd, "".join([c + "\n" for c in new]).encode(encoding="utf8"))
+            os.fsync(self._fd)
+            self._done.update(new)
+        logger.debug(f"Marked {len(new)} compounds done in {self._meta_path}")
 
     @property
     def path(self) -> Path:
@@ -56,14 +73,62 @@ class SearchCache:
 
     @property
     def at(self) -> int:
-        return len(self._data["done"])
+        return len(self._done)
 
     @property
     def _meta_path(self) -> Path:
+        return self._path.parent / ("." + self._path.name + ".progress.tmp")
+
+    @property
+    def _legacy_meta_path(self) -> Path:
         return self._path.parent / ("." + self._path.name + ".progress.json.tmp")
 
+    def _load(self) -> set:
+        if self._legacy_meta_path.exists():
+            data = orjson.loads(self._legacy_meta_path.read_text(encoding="utf8"))
+            if "done" in data:
+                return set(data["done"])
+            logger.warning(f"Invalid progress file {self._legacy_meta_path}; restarting")
+            return set()
+        text = self._meta_path.read_text(encoding="utf8")
+        lines = text.split("\n")
+        # the last element is "" unless we were killed mid-write
+        if lines[-1] != "":
+            logger.warning(f"Discarding incomplete line {lines[-1]} in {self._meta_path}")
+            self._torn = True
+        return {line for line in lines[:-1] if line != ""}
+
+    def _rewrite(self) -> None:
+        # write the whole journal once, atomically, to drop torn lines and convert legacy files
+        self._path.parent.mkdir(exist_ok=True, parents=True)
+        tmp = self._meta_path.with_name(f"{self._meta_path.name}.{os.getpid()}.swap")
+        with tmp.open("w", encoding="utf8") as f:
+            f.write("".join([c + "\n" for c in self._done]))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self._meta_path)
+        self._legacy_meta_path.unlink(missing_ok=True)
+        # make the rename itself durable
+        if os.name != "nt":
+            fd = os.open(self._meta_path.parent, os.O_RDONLY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+
+    def close(self) -> None:
+        """
+        Closes the journal, keeping it so the search can be resumed.
+        Does nothing if already closed.
+        """
+        with self._lock:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+
     def kill(self) -> None:
-        self._data = None
+        self.close()
+        self._done = None
         if self._meta_path.exists():
             self._meta_path.unlink()
             logger.debug(f"Destroyed search cache {self._meta_path}")
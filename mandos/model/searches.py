@@ -2,9 +2,13 @@ from __future__ import annotations
 
 import abc
 import dataclasses
+import functools
+import threading
 from datetime import datetime
-from typing import Generic, Mapping, Sequence, TypeVar, Union
+from functools import cached_property
+from typing import Any, Dict, Generic, Mapping, Sequence, Tuple, Type, TypeVar, Union
 
+import regex
 from pocketutils.core.exceptions import XTypeError
 from pocketutils.tools.reflection_tools import ReflectionTools
 from suretime import Suretime
@@ -14,6 +18,62 @@ from mandos.model.hits import AbstractHit
 from mandos.model.utils.setup import MandosResources, logger
 
 H = TypeVar("H", bound=AbstractHit, covariant=True)
+_FIELD_PATTERN = regex.compile(r"\{([^{}]*)\}")
+_MAX_FORMATTED = 10_000
+
+
+@functools.lru_cache()
+def _compile(template: str) -> Sequence[str]:
+    # the even indices are literal text, and the odd ones are the names in braces
+    return tuple(_FIELD_PATTERN.split(template))
+
+
+def _render(parts: Sequence[str], kwargs: Mapping[str, Any]) -> str:
+    return "".join(
+        part if i % 2 == 0 else str(kwargs[part]) if part in kwargs else "{" + part + "}"
+        for i, part in enumerate(parts)
+    )
+
+
+class _HitFactory:
+    """
+    What ``Search._create_hit`` needs that is the same for many hits.
+    Holds the hit class, the current ``run_date``, and the ``strings.json`` templates,
+    which are formatted once for each distinct set of parameters.
+    The ``run_date`` is kept per thread, so that workers can stamp it independently.
+    """
+
+    def __init__(self, search: Search):
+        self.clazz: Type[AbstractHit] = search.get_h()
+        self.search_key = search.key
+        self.search_class = search.search_class
+        self.strings = MandosResources.from_memory("strings")[search.search_class]
+        self.formatted: Dict[Tuple[Any, ...], str] = {}
+        self._local = threading.local()
+
+    @property
+    def run_date(self) -> str:
+        try:
+            return self._local.run_date
+        except AttributeError:  # not yet stamped in this thread
+            self.stamp()
+            return self._local.run_date
+
+    def stamp(self) -> None:
+        self._local.run_date = Suretime.tagged.now_utc_sys().iso_with_zone
+
+    def format(self, kind: str, kwargs: Mapping[str, Any]) -> str:
+        # 1, 1.0, and True are equal but are formatted differently
+        key = (kind, *kwargs.items(), *map(type, kwargs.values()))
+        try:
+            return self.formatted[key]
+        except KeyError:
+            s = _render(_compile(self.strings[kind]), kwargs)
+            if len(self.formatted) < _MAX_FORMATTED:
+                self.formatted[key] = s
+            return s
+        except TypeError:  # unhashable
+            return _render(_compile(self.strings[kind]), kwargs)
 
 
 class SearchError(Exception):
@@ -72,6 +132,19 @@ class Search(Generic[H], metaclass=abc.ABCMeta):
         # override this
         raise NotImplementedError()
 
+    @property
+    def batch_size(self) -> int:
+        """
+        The number of compounds to pass to ``prefetch`` at once; 1 if this search doesn't prefetch.
+        """
+        return 1
+
+    def prefetch(self, inchikeys: Sequence[str]) -> None:
+        """
+        Called with compounds that will soon be passed to ``find``, so they can be queried together.
+        ``find`` must still work on compounds that were not prefetched (or failed to prefetch).
+        """
+
     @classmethod
     def hit_fields(cls) -> Sequence[str]:
         """
@@ -97,17 +170,23 @@ class Search(Generic[H], metaclass=abc.ABCMeta):
         # noinspection PyTypeChecker
         return ReflectionTools.get_generic_arg(cls, AbstractHit)
 
+    def stamp(self) -> None:
+        """
+        Sets the ``run_date`` of hits created from now on to the current time.
+        Applies only to the calling thread. ``Searcher`` calls this before each compound;
+        otherwise, the time of the first hit in the thread is used.
+        """
+        self._hits.stamp()
+
+    @cached_property
+    def _hits(self) -> _HitFactory:
+        return _HitFactory(self)
+
     def _format_source(self, **kwargs) -> str:
-        s = MandosResources.from_memory("strings")[self.search_class]["source"]
-        for k, v in kwargs.items():
-            s = s.replace(f"{{{k}}}", str(v))
-        return s
+        return self._hits.format("source", kwargs)
 
     def _format_predicate(self, **kwargs) -> str:
-        s = MandosResources.from_memory("strings")[self.search_class]["predicate"]
-        for k, v in kwargs.items():
-            s = s.replace(f"{{{k}}}", str(v))
-        return s
+        return self._hits.format("predicate", kwargs)
 
     def _create_hit(
         self,
@@ -121,13 +200,14 @@ class Search(Generic[H], metaclass=abc.ABCMeta):
         object_name: str,
         **kwargs,
     ) -> H:
+        factory = self._hits
         # ignore statement -- we've removed it for now
         entry = dict(
             record_id=None,
-            search_key=self.key,
-            search_class=self.search_class,
+            search_key=factory.search_key,
+            search_class=factory.search_class,
             data_source=data_source,
-            run_date=Suretime.tagged.now_utc_sys().iso_with_zone,
+            run_date=factory.run_date,
             cache_date=None,
             weight=1,
             compound_id=c_id,
@@ -139,10 +219,10 @@ class Search(Generic[H], metaclass=abc.ABCMeta):
             object_name=object_name,
         )
         entry.update(kwargs)
-        clazz = self.__class__.get_h()
         # noinspection PyArgumentList
-        inst = clazz(**entry)
-        logger.trace(f"Hit: {inst}")
+        inst = factory.clazz(**entry)
+        # formatting a hit for a message that will be discarded is expensive
+        logger.opt(lazy=True).trace("Hit: {}", lambda: inst)
         return inst
 
     def __repr__(self) -> str:
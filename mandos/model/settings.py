@@ -8,13 +8,13 @@ from typing import AbstractSet, Any, Collection, Mapping, Optional, Type, TypeVa
 
 from pocketutils.core.dot_dict import NestedDotDict
 from pocketutils.core.exceptions import ConfigError, DirDoesNotExistError, XValueError
-from pocketutils.core.query_utils import QueryExecutor
 from pocketutils.tools.common_tools import CommonTools
 from pocketutils.tools.sys_tools import SystemTools
 from suretime import Suretime
 from typeddfs import FileFormat, FrozeDict
 
 from mandos.model.utils.globals import Globals
+from mandos.model.utils.query_executors import ConcurrentQueryExecutor
 from mandos.model.utils.setup import LOG_SETUP, MandosResources, logger
 
 defaults: Mapping[str, Any] = FrozeDict(MandosResources.json_dict("default_settings.json"))
@@ -41,12 +41,19 @@ class Settings:
     chembl_query_delay_min: float
     chembl_query_delay_max: float
     chembl_fast_save: bool
+    chembl_release: Optional[str]
+    chembl_batch_size: int
+    chembl_db_path: Optional[Path]
     pubchem_expire_sec: int
     pubchem_n_tries: int
     pubchem_timeout_sec: float
     pubchem_backoff_factor: float
     pubchem_query_delay_min: float
     pubchem_query_delay_max: float
+    pubchem_memory_cache_mb: int
+    pubchem_cache_backend: str
+    pubchem_max_concurrent: int
+    pubchem_batch_size: int
     hmdb_expire_sec: int
     hmdb_timeout_sec: float
     hmdb_backoff_factor: float
@@ -114,6 +121,10 @@ class Settings:
         FileFormat.from_suffix(self.table_suffix)
         FileFormat.from_suffix(self.archive_filename_suffix)
         LOG_SETUP.guess_file_sink_info(self.log_suffix)
+        if self.pubchem_cache_backend not in {"json", "sqlite"}:
+            raise XValueError(
+                f"cache.pubchem.backend {self.pubchem_cache_backend} is not json or sqlite"
+            )
         for k, v in self.as_dict.items():
             # this happens to work for now -- we have none that can be < 0
             if isinstance(v, (int, float)) and v < 0:
@@ -135,6 +146,9 @@ class Settings:
         _selenium_path = get("query.selenium_driver_path", Path)
         if _selenium_path is not None:
             _selenium_path = _selenium_path.expanduser()
+        _chembl_db_path = get("query.chembl.db_path", Path)
+        if _chembl_db_path is not None:
+            _chembl_db_path = _chembl_db_path.expanduser()
         chembl_delay = get("query.chembl.delay_sec", float)
         pubchem_delay = get("query.pubchem.delay_sec", float)
         hmdb_delay = get("query.hmdb.delay_sec", float)
@@ -153,6 +167,9 @@ class Settings:
             archive_filename_suffix=get("cache.archive_filename_suffix", str),
             chembl_n_tries=get("query.chembl.n_tries", int),
             chembl_fast_save=get("query.chembl.fast_save", bool),
+            chembl_release=get("cache.chembl.release", str),
+            chembl_batch_size=get("query.chembl.batch_size", int),
+            chembl_db_path=_chembl_db_path,
             chembl_timeout_sec=get("query.chembl.timeout_sec", int),
             chembl_backoff_factor=get("query.chembl.backoff_factor", float),
             chembl_query_delay_min=chembl_delay,
@@ -163,6 +180,10 @@ class Settings:
             pubchem_query_delay_min=get("query.pubchem.delay_sec", float),
             pubchem_query_delay_max=pubchem_delay * max_coeff,
             pubchem_n_tries=get("query.pubchem.n_tries", int),
+            pubchem_max_concurrent=get("query.pubchem.max_concurrent", int),
+            pubchem_batch_size=get("query.pubchem.batch_size", int),
+            pubchem_memory_cache_mb=get("cache.pubchem.memory_mb", int),
+            pubchem_cache_backend=get("cache.pubchem.backend", str).lower(),
             hmdb_timeout_sec=get("query.hmdb.timeout_sec", int),
             hmdb_backoff_factor=get("query.hmdb.backoff_factor", float),
             hmdb_query_delay_min=hmdb_delay,
@@ -234,9 +255,14 @@ else:
 
 
 class QueryExecutors:
-    chembl = QueryExecutor(SETTINGS.chembl_query_delay_min, SETTINGS.chembl_query_delay_max)
-    pubchem = QueryExecutor(SETTINGS.pubchem_query_delay_min, SETTINGS.pubchem_query_delay_max)
-    hmdb = QueryExecutor(SETTINGS.hmdb_query_delay_min, SETTINGS.hmdb_query_delay_max)
+    # these are shared between search worker threads
+    chembl = ConcurrentQueryExecutor(
+        SETTINGS.chembl_query_delay_min, SETTINGS.chembl_query_delay_max
+    )
+    pubchem = ConcurrentQueryExecutor(
+        SETTINGS.pubchem_query_delay_min, SETTINGS.pubchem_query_delay_max
+    )
+    hmdb = ConcurrentQueryExecutor(SETTINGS.hmdb_query_delay_min, SETTINGS.hmdb_query_delay_max)
 
 
 QUERY_EXECUTORS = QueryExecutors
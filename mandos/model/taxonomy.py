@@ -1,9 +1,12 @@
 from __future__ import annotations
 
 import enum
-from collections import defaultdict
+import os
+import shutil
+import time
 from dataclasses import dataclass
-from functools import total_ordering
+from functools import cached_property, total_ordering
+from hashlib import blake2b
 from pathlib import Path
 from typing import (
     Collection,
@@ -15,9 +18,12 @@ from typing import (
     Optional,
     Sequence,
     Set,
+    Tuple,
     Union,
 )
 
+import numpy as np
+import orjson
 import pandas as pd
 from pocketutils.core.enums import CleverEnum
 from pocketutils.core.exceptions import (
@@ -230,19 +236,198 @@ class _Taxon(Taxon):
         return self.id < other.id
 
 
+class _TreeTaxon(Taxon):
+    """
+    A :class:`Taxon` that reads from the arrays of a :class:`Taxonomy`.
+    These are created only when a taxon is accessed.
+    """
+
+    def __init__(self, tree: Taxonomy, index: int):
+        self._tree = tree
+        self._index = index
+
+    @property
+    def id(self) -> int:
+        return int(self._tree._ids[self._index])
+
+    @property
+    def scientific_name(self) -> str:
+        return self._tree._names[self._tree._scientific[self._index]]
+
+    @property
+    def common_name(self) -> Optional[str]:
+        return self._tree._names[self._tree._common[self._index]]
+
+    @property
+    def mnemonic(self) -> Optional[str]:
+        return self._tree._names[self._tree._mnemonic[self._index]]
+
+    @property
+    def as_series(self) -> pd.Series:
+        return pd.Series(
+            dict(
+                taxon=self.id,
+                scientific_name=self.scientific_name,
+                common_name=self.common_name,
+                mnemonic=self.mnemonic,
+                parent=int(self._tree._parent_ids[self._index]),
+            )
+        )
+
+    @property
+    def parent(self) -> Optional[Taxon]:
+        parent = self._tree._parents[self._index]
+        return None if parent < 0 else _TreeTaxon(self._tree, int(parent))
+
+    @property
+    def children(self) -> Set[Taxon]:
+        return set(self._tree._taxa(self._tree._children(self._index)))
+
+    @property
+    def ancestors(self) -> Sequence[Taxon]:
+        lst = []
+        parent = self.parent
+        while parent is not None:
+            lst.append(parent)
+            parent = parent.parent
+        return lst
+
+    @property
+    def descendents(self) -> Sequence[Taxon]:
+        return self._tree._taxa(range(self._index + 1, self._tree._ends[self._index]))
+
+    def __repr__(self):
+        parent = self.parent.id if self.parent else "none"
+        return f"Taxon({self.id}: {self.scientific_name} (parent={parent}))"
+
+
+class _MappedNames:
+    """
+    A table of names stored as one UTF-8 buffer and the offset of each name.
+    Like the in-memory table, the last entry is None.
+    """
+
+    def __init__(self, data: np.ndarray, offsets: np.ndarray):
+        self._data = data
+        self._offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    def __getitem__(self, i: Union[int, np.integer, np.ndarray]) -> Union[None, str, np.ndarray]:
+        if isinstance(i, np.ndarray):
+            # decode each distinct name once
+            unique, inverse = np.unique(i, return_inverse=True)
+            return np.array([self[u] for u in unique] + [None], dtype=object)[:-1][inverse]
+        i = int(i)
+        if i in {-1, len(self) - 1}:
+            return None
+        return bytes(self._data[self._offsets[i] : self._offsets[i + 1]]).decode("utf-8")
+
+    @classmethod
+    def encode(cls, names: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+        encoded = [s.encode("utf-8") for s in names]
+        offsets = np.cumsum([0, *[len(e) for e in encoded]], dtype=np.int64)
+        return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+
+class _NameHashes:
+    """
+    An open-addressing hash table (with linear probing) from lower-cased names to keys.
+    Each slot holds a key (an index into ``names``) or -1 if it's empty.
+    """
+
+    def __init__(self, names: _MappedNames, slots: np.ndarray):
+        self._names = names
+        self._slots = slots
+
+    def get(self, name: str, default: Optional[int] = None) -> Optional[int]:
+        mask = len(self._slots) - 1
+        slot = self.hash(name) & mask
+        while True:
+            key = self._slots[slot]
+            if key < 0:
+                return default
+            if self._names[key] == name:
+                return int(key)
+            slot = (slot + 1) & mask
+
+    def keys(self) -> Sequence[str]:
+        return [self._names[i] for i in range(len(self._names) - 1)]
+
+    def __contains__(self, name: str) -> bool:
+        return self.get(name) is not None
+
+    @classmethod
+    def hash(cls, name: str) -> int:
+        # stable across processes, unlike hash()
+        return int.from_bytes(blake2b(name.encode("utf-8"), digest_size=8).digest(), "little")
+
+    @classmethod
+    def build_slots(cls, names: Sequence[str]) -> np.ndarray:
+        size = 1 << max(2 * len(names) - 1, 1).bit_length()
+        slots = np.full(size, -1, dtype=np.int64)
+        pending = np.arange(len(names), dtype=np.int64)
+        at = np.array([cls.hash(n) & (size - 1) for n in names], dtype=np.int64)
+        while len(pending) > 0:
+            # of the keys that reached a free slot, the first for each slot takes it
+            free = np.flatnonzero(slots[at] < 0)
+            taken, first = np.unique(at[free], return_index=True)
+            slots[taken] = pending[free[first]]
+            placed = np.zeros(len(pending), dtype=bool)
+            placed[free[first]] = True
+            pending, at = pending[~placed], (at[~placed] + 1) & (size - 1)
+        return slots
+
+
 class Taxonomy:
     """
     A taxonomic tree of organisms from UniProt.
     Elements in the tree can be looked up by name or ID using ``__getitem__`` and ``get``.
+
+    The tree is stored as arrays in pre-order (depth-first, children sorted by ID),
+    so every subtree is a contiguous interval ``[i, end[i])``.
+    Checking whether one taxon is under another is then just an interval check,
+    and extracting a subtree is a slice.
+    Names are factorized into a single table that subtrees share.
+    :class:`Taxon` objects are only created for taxa that are accessed.
     """
 
-    def __init__(self, by_id: Mapping[int, Taxon], by_name: Mapping[str, FrozenSet[Taxon]]):
+    _name_columns = ["scientific_name", "common_name", "mnemonic"]
+    _mapped_version = 1
+    _mapped_arrays = [
+        "ids",
+        "parent_ids",
+        "parents",
+        "ends",
+        "names",
+        "name_offsets",
+        "scientific",
+        "common",
+        "mnemonic",
+        "keys",
+        "key_offsets",
+        "key_slots",
+        "key_taxa",
+        "key_taxa_offsets",
+        "sorted_ids",
+        "sorted_order",
+    ]
+
+    def __init__(
+        self, by_id: Mapping[int, Taxon], by_name: Optional[Mapping[str, FrozenSet[Taxon]]] = None
+    ):
         # constructor provided for consistency with the members
-        self._by_id = dict(by_id)
-        self._by_name = dict(by_name)
-        # this probably isn't actually possible
-        if len(self) == 0:
-            logger.warning(f"{self} contains 0 taxa")
+        # by_name is always recalculated from the taxa
+        taxa = list(by_id.values())
+        codes, names = self._factorize(
+            [t.scientific_name for t in taxa],
+            [t.common_name for t in taxa],
+            [t.mnemonic for t in taxa],
+        )
+        ids = np.array([t.id for t in taxa], dtype=np.int64)
+        parent_ids = [0 if t.parent is None else t.parent.id for t in taxa]
+        self._set(*self._build(ids, np.array(parent_ids, dtype=np.int64), names, *codes))
 
     @classmethod
     def from_trees(cls, taxonomies: Collection[Taxonomy]) -> Taxonomy:
@@ -259,12 +444,10 @@ class Taxonomy:
     @classmethod
     def from_list(cls, taxa: Collection[Taxon]) -> Taxonomy:
         by_id = {x.id: x for x in taxa}
-        by_name = cls._build_by_name(by_id.values())
-        tax = Taxonomy(by_id, by_name)
         # catch duplicate values
-        if len(tax._by_id) != len(taxa):
-            raise DataIntegrityError(f"{len(tax._by_id)} != {len(taxa)}")
-        return tax
+        if len(by_id) != len(taxa):
+            raise DataIntegrityError(f"{len(by_id)} != {len(taxa)}")
+        return Taxonomy(by_id)
 
     @classmethod
     def from_path(cls, path: Path) -> Taxonomy:
@@ -278,71 +461,200 @@ class Taxonomy:
     def from_df(cls, df: TaxonomyDf) -> Taxonomy:
         """
         Reads from a DataFrame from a file provided by a UniProt download.
-        Strips any entries with missing or empty-string scientific names.
+        If a taxon is listed more than once, its last row is used.
+        Parents that are not listed are treated as outside the tree.
 
         Args:
             df: A TaxonomyDf DataFrame
 
         Returns:
             The corresponding taxonomic tree
+
+        Raises:
+            DataIntegrityError: If a taxon has a missing or empty-string scientific name
         """
-        # just build up a tree, sticking the elements in by_id
-        tax: Dict[int, _Taxon] = {}
-        for row in df.itertuples():
-            _new_child = _Taxon(
-                row.taxon, row.scientific_name, row.common_name, row.mnemonic, None, set()
-            )
-            child = tax.setdefault(row.taxon, _new_child)
-            child.set_names(row.scientific_name, row.common_name, row.mnemonic)
-            if row.parent != 0:
-                _new_parent = _Taxon(row.parent, "", None, None, None, set())
-                parent = tax.setdefault(row.parent, _new_parent)
-                child.set_parent(parent)
-                parent.add_child(child)
-        bad = [t for t in tax.values() if t.scientific_name.strip() == ""]
-        if len(bad) > 0:
+        return cls.from_chunks([df])
+
+    @classmethod
+    def from_chunks(cls, chunks: Iterable[pd.DataFrame]) -> Taxonomy:
+        """
+        Like :meth:`from_df`, but reads the rows in any number of chunks (with the same columns).
+        Only the IDs and name codes of each chunk are kept, plus one copy of each distinct name,
+        so a large file can be read with ``chunksize``.
+
+        Raises:
+            DataIntegrityError: If a taxon has a missing or empty-string scientific name
+        """
+        interned: Dict[str, int] = {}
+        ids, parent_ids, codes = [np.zeros(0, np.int64)], [np.zeros(0, np.int64)], []
+        for chunk in chunks:
+            ids.append(chunk["taxon"].to_numpy(dtype=np.int64))
+            parent_ids.append(chunk["parent"].fillna(0).to_numpy(dtype=np.int64))
+            values = [np.asarray(chunk[c], dtype=object) for c in cls._name_columns]
+            local, uniques = pd.factorize(np.concatenate(values))
+            # -1 (no name) maps to the extra -1 at the end
+            to_global = [interned.setdefault(u, len(interned)) for u in uniques]
+            codes.append(np.array([*to_global, -1], dtype=np.int64)[local].reshape(3, -1))
+        ids, parent_ids = np.concatenate(ids), np.concatenate(parent_ids)
+        codes = np.concatenate([np.zeros((3, 0), np.int64), *codes], axis=1)
+        names = np.array([*interned, None], dtype=object)
+        codes = np.where(codes < 0, len(names) - 1, codes).astype(np.int32)
+        # if a taxon is listed more than once, use its last row
+        _, last = np.unique(ids[::-1], return_index=True)
+        keep = np.sort(len(ids) - 1 - last)
+        ids, parent_ids, codes = ids[keep], parent_ids[keep], codes[:, keep]
+        # check the (fewer) unique names rather than every row
+        blank = np.array([s is None or s.strip() == "" for s in names], dtype=bool)
+        bad = blank[codes[0]]
+        if bad.any():
             raise DataIntegrityError(
-                f"{len(bad)} taxa with missing or empty scientific names: {bad}."
+                f"{bad.sum()} taxa with missing or empty scientific names: {list(ids[bad])}."
             )
-        for v in tax.values():
-            v.__class__ = Taxon
-        by_name = cls._build_by_name(tax.values())
-        return Taxonomy(tax, by_name)
+        return cls._new(*cls._build(ids, parent_ids, names, *codes))
 
     def to_df(self) -> TaxonomyDf:
-        return TaxonomyDf.convert(pd.DataFrame([taxon.as_series for taxon in self.taxa]))
+        return TaxonomyDf.convert(
+            pd.DataFrame(
+                dict(
+                    taxon=self._ids,
+                    scientific_name=self._names[self._scientific],
+                    common_name=self._names[self._common],
+                    mnemonic=self._names[self._mnemonic],
+                    parent=self._parent_ids,
+                )
+            )
+        )
+
+    @classmethod
+    def from_mapped(cls, path: Path) -> Taxonomy:
+        """
+        Reads a tree written by :meth:`write_mapped`.
+        The arrays are memory-mapped read-only, so this takes a few milliseconds,
+        and processes that read the same files share their pages.
+
+        Raises:
+            DataIntegrityError: If the files were written by an incompatible version
+        """
+        pointer = path / "current"
+        # files written before versioning are directly in the directory
+        if pointer.exists():
+            path = path / pointer.read_text(encoding="utf8").strip()
+        info = orjson.loads((path / "info.json").read_bytes())
+        if info.get("version") != cls._mapped_version:
+            raise DataIntegrityError(
+                f"{path} has version {info.get('version')}, not {cls._mapped_version}"
+            )
+        a = {name: np.load(path / f"{name}.npy", mmap_mode="r") for name in cls._mapped_arrays}
+        names = _MappedNames(a["names"], a["name_offsets"])
+        tree = cls._new(
+            a["ids"],
+            a["parent_ids"],
+            a["parents"],
+            a["ends"],
+            names,
+            a["scientific"],
+            a["common"],
+            a["mnemonic"],
+        )
+        # fill in the cached properties
+        keys = _NameHashes(_MappedNames(a["keys"], a["key_offsets"]), a["key_slots"])
+        tree.__dict__["_name_index"] = keys, a["key_taxa"], a["key_taxa_offsets"]
+        tree.__dict__["_sorted"] = a["sorted_ids"], a["sorted_order"]
+        return tree
+
+    def write_mapped(self, path: Path) -> None:
+        """
+        Writes the tree as a directory of arrays that :meth:`from_mapped` can memory-map.
+        Also writes the ID and name indices, so that reading needs no computation.
+
+        Each write goes to a new version under ``path``, which is never modified,
+        and then atomically replaces the ``current`` file that names it.
+        So a reader always sees one complete version.
+        The version that was current is kept until the next write, for readers still opening it.
+        """
+        none = len(self._names) - 1
+        codes = np.concatenate([self._scientific, self._common, self._mnemonic])
+        # only keep the names that this tree uses
+        used = np.unique(codes[codes != none])
+        recode = np.full(len(self._names), len(used), dtype=np.int32)
+        recode[used] = np.arange(len(used), dtype=np.int32)
+        names, name_offsets = _MappedNames.encode([self._names[c] for c in used])
+        key_to_id, key_taxa, key_taxa_offsets = self._name_index
+        key_names = list(key_to_id.keys())
+        keys, key_offsets = _MappedNames.encode(key_names)
+        sorted_ids, sorted_order = self._sorted
+        arrays = dict(
+            ids=self._ids,
+            parent_ids=self._parent_ids,
+            parents=self._parents,
+            ends=self._ends,
+            names=names,
+            name_offsets=name_offsets,
+            scientific=recode[self._scientific],
+            common=recode[self._common],
+            mnemonic=recode[self._mnemonic],
+            keys=keys,
+            key_offsets=key_offsets,
+            key_slots=_NameHashes.build_slots(key_names),
+            key_taxa=key_taxa,
+            key_taxa_offsets=key_taxa_offsets,
+            sorted_ids=sorted_ids,
+            sorted_order=sorted_order,
+        )
+        path.mkdir(parents=True, exist_ok=True)
+        pointer = path / "current"
+        previous = pointer.read_text(encoding="utf8").strip() if pointer.exists() else None
+        version = f"v{time.time_ns()}-{os.getpid()}"
+        # nothing reads the version until the pointer names it
+        (path / version).mkdir()
+        for name, array in arrays.items():
+            np.save(path / version / f"{name}.npy", np.ascontiguousarray(array))
+        info = dict(version=self._mapped_version, n_taxa=len(self))
+        (path / version / "info.json").write_bytes(orjson.dumps(info))
+        tmp = path / f".current.{os.getpid()}.tmp"
+        tmp.write_text(version, encoding="utf8")
+        os.replace(tmp, pointer)
+        for old in path.iterdir():
+            if old.name not in {"current", version, previous} and not old.name.startswith("."):
+                if old.is_dir():
+                    shutil.rmtree(old, ignore_errors=True)
+                else:
+                    old.unlink(missing_ok=True)
 
     @property
     def taxa(self) -> Sequence[Taxon]:
         """
         Returns all taxa in the tree.
         """
-        return list(self._by_id.values())
+        return self._taxa(range(len(self)))
 
     @property
     def roots(self) -> Sequence[Taxon]:
         """
         Returns the roots of the tree (at least 1).
         """
-        return [k for k in self.taxa if k.parent is None or k.parent not in self]
+        return self._taxa(np.flatnonzero(self._parents < 0))
 
     @property
     def leaves(self) -> Sequence[Taxon]:
         """
         Returns the leaves (typically species or sub-species) of the tree.
         """
-        return [k for k in self.taxa if len(k.children) == 0]
+        return self._taxa(np.flatnonzero(self._ends == np.arange(len(self)) + 1))
+
+    def is_under(self, item: Union[int, Taxon], ancestor: Union[int, Taxon]) -> bool:
+        """
+        Returns whether a taxon is a descendent of, or identical to, another.
+        Returns False if either is not in the tree.
+        """
+        i, a = self._index(item), self._index(ancestor)
+        return i >= 0 and a >= 0 and a <= i < self._ends[a]
 
     def exclude_subtree(self, item: Union[int, Taxon]) -> Taxonomy:
         """
         Returns a new tree that excludes a single specified taxon and its descendents.
         """
-        descendents = self.get_by_id_or_name(item)
-        for i in set(descendents):
-            descendents += i.descendents
-        by_id = {d.id: d for d in descendents}
-        by_name = self.__class__._build_by_name(by_id.values())
-        return Taxonomy(by_id, by_name)
+        return self._take(~self._cover(self._indices(item)))
 
     def exclude_subtrees_by_ids_or_names(self, items: TaxaIdsAndNames) -> Taxonomy:
         """
@@ -354,20 +666,15 @@ class Taxonomy:
         """
         if isinstance(items, (int, str, Taxon)):
             items = [items]
-        bad_taxa = self.subtrees_by_ids_or_names(items).taxa
-        by_id = {i: t for i, t in self._by_id.items() if i not in bad_taxa}
-        by_name = self.__class__._build_by_name(by_id.values())
-        return Taxonomy(by_id, by_name)
+        indices = [self._indices(item) for item in items]
+        return self._take(~self._cover(np.concatenate([[], *indices]).astype(np.int64)))
 
     def subtree(self, item: int) -> Taxonomy:
         """
         Returns the tree that is rooted at a single taxon (by ID).
         """
-        item = self[item]
-        descendents = {item, *item.descendents}
-        by_id = {d.id: d for d in descendents}
-        by_name = self.__class__._build_by_name(by_id.values())
-        return Taxonomy(by_id, by_name)
+        i = self._index(self[item])
+        return self._slice(i, int(self._ends[i]))
 
     def subtrees_by_ids_or_names(self, items: TaxaIdsAndNames) -> Taxonomy:
         """
@@ -379,13 +686,8 @@ class Taxonomy:
         """
         if isinstance(items, (int, str, Taxon)):
             items = [items]
-        descendents: Set[Taxon] = set()
-        for item in items:
-            for taxon in self.get_by_id_or_name(item):
-                descendents.update({taxon, *taxon.descendents})
-        by_id = {d.id: d for d in descendents}
-        by_name = self.__class__._build_by_name(by_id.values())
-        return Taxonomy(by_id, by_name)
+        indices = [self._indices(item) for item in items]
+        return self._take(self._cover(np.concatenate([[], *indices]).astype(np.int64)))
 
     def subtrees_by_name(self, item: str) -> Taxonomy:
         """
@@ -394,7 +696,7 @@ class Taxonomy:
         Arguments:
             item: A scientific name, common name, or mnemonic
         """
-        return self.subtrees_by_names(item)
+        return self.subtrees_by_names([item])
 
     def subtrees_by_names(self, items: Iterable[str]) -> Taxonomy:
         """
@@ -403,13 +705,8 @@ class Taxonomy:
         Arguments:
             items: A sequence of scientific name, common name, and/or mnemonics
         """
-        descendents: Set[Taxon] = set()
-        for item in items:
-            for taxon in self._by_name.get(item, []):
-                descendents.update({taxon, *taxon.descendents})
-        by_id = {d.id: d for d in descendents}
-        by_name = self.__class__._build_by_name(by_id.values())
-        return Taxonomy(by_id, by_name)
+        indices = [self._named(item) for item in items]
+        return self._take(self._cover(np.concatenate([[], *indices]).astype(np.int64)))
 
     def req_one_by_name(self, item: str) -> Taxon:
         """
@@ -460,20 +757,20 @@ class Taxonomy:
             item: A scientific name, common name, or mnemonic
         """
         taxa = self.get_by_name(item)
-        ids = ",".join([str(t.id) for t in taxa])
+        ids = ",".join([str(t.id) for t in sorted(taxa)])
         if len(taxa) > 1:
             logger.warning(f"Got multiple results for {item}: {ids}")
         elif len(taxa) == 0:
             return None
-        return next(iter(taxa))
+        return min(taxa)
 
     def get_by_name(self, item: str) -> FrozenSet[Taxon]:
         """
-        Gets all taxa that match a scientific name.
+        Gets all taxa that match a scientific name, common name, or mnemonic (case-insensitive).
         """
         if isinstance(item, Taxon):
             item = item.scientific_name
-        return self._by_name.get(item, frozenset(set()))
+        return frozenset(self._taxa(self._named(item)))
 
     def get_all_by_id_or_name(self, items: Iterable[Union[int, str, Taxon]]) -> FrozenSet[Taxon]:
         """
@@ -489,15 +786,7 @@ class Taxonomy:
         """
         Gets all taxa that match an ID or name.
         """
-        if isinstance(item, Taxon):
-            item = item.id
-        if isinstance(item, int):
-            taxon = self._by_id.get(item)
-            return frozenset([]) if taxon is None else frozenset([taxon])
-        elif isinstance(item, str):
-            return self._by_name.get(item, frozenset(set()))
-        else:
-            raise XTypeError(f"Unknown type {type(item)} of {item}")
+        return frozenset(self._taxa(self._indices(item)))
 
     def req(self, item: Union[int, Taxon]) -> Taxon:
         """
@@ -518,12 +807,10 @@ class Taxonomy:
         Returns:
             The taxon, or None if it was not found
         """
-        if isinstance(item, Taxon):
-            item = item.id
-        if isinstance(item, int):
-            return self._by_id.get(item)
-        else:
+        if not isinstance(item, (int, np.integer, Taxon)):
             raise XTypeError(f"Type {type(item)} of {item} not applicable")
+        i = self._index(item)
+        return None if i < 0 else _TreeTaxon(self, i)
 
     def __getitem__(self, item: int) -> Taxon:
         """
@@ -547,38 +834,229 @@ class Taxonomy:
         return self.get(item) is not None
 
     def n_taxa(self) -> int:
-        return len(self._by_id)
+        return len(self._ids)
 
     def __contains__(self, item: Union[Taxon, int, str]):
         if isinstance(item, str):
-            return self._by_name.get(item) is not None
-        return self.get(item) is not None
+            return item.lower() in self._name_index[0]
+        return self._index(item) >= 0
 
     def __len__(self) -> int:
-        return len(self._by_id)
+        return len(self._ids)
 
     def __str__(self) -> str:
         return repr(self)
 
     def __repr__(self) -> str:
         roots = ", ".join(r.scientific_name for r in self.roots)
-        return f"{self.__class__.__name__}(n={len(self._by_id)} (roots={roots}) @ {hex(id(self))})"
+        return f"{self.__class__.__name__}(n={len(self)} (roots={roots}) @ {hex(id(self))})"
+
+    @cached_property
+    def _sorted(self) -> Tuple[np.ndarray, np.ndarray]:
+        order = np.argsort(self._ids, kind="stable")
+        return self._ids[order], order
+
+    @cached_property
+    def _name_index(self) -> Tuple[Mapping[str, int], np.ndarray, np.ndarray]:
+        # a dict from each lower-cased name to a key,
+        # and the indices of the taxa with each key in indices[offsets[key] : offsets[key + 1]]
+        # favor mnemonic, then scientific name, then common name
+        codes = np.concatenate([self._mnemonic, self._scientific, self._common])
+        where = np.tile(np.arange(len(self), dtype=np.int64), 3)
+        used = codes < len(self._names) - 1
+        codes, where = codes[used], where[used]
+        # NOTE: lower-casing the keys for lookup
+        # only lower-case the names in this tree, not the whole shared table
+        name_codes = np.unique(codes)
+        lowered, lowered_names = pd.factorize([self._names[c].lower() for c in name_codes])
+        to_key = np.zeros(len(self._names), dtype=np.int64)
+        to_key[name_codes] = lowered
+        keys = to_key[codes]
+        order = np.argsort(keys, kind="stable")
+        offsets = np.searchsorted(keys[order], np.arange(len(lowered_names) + 1))
+        return dict(zip(lowered_names, range(len(lowered_names)))), where[order], offsets
+
+    def _named(self, name: str) -> np.ndarray:
+        keys, indices, offsets = self._name_index
+        key = keys.get(name.lower())
+        if key is None:
+            return np.zeros(0, dtype=np.int64)
+        return np.unique(indices[offsets[key] : offsets[key + 1]])
+
+    def _index(self, item: Union[int, np.integer, Taxon]) -> int:
+        if isinstance(item, Taxon):
+            item = item.id
+        sorted_ids, order = self._sorted
+        i = np.searchsorted(sorted_ids, item)
+        if i < len(sorted_ids) and sorted_ids[i] == item:
+            return int(order[i])
+        return -1
+
+    def _indices(self, item: Union[int, str, Taxon]) -> np.ndarray:
+        if isinstance(item, str):
+            return self._named(item)
+        elif isinstance(item, (int, np.integer, Taxon)):
+            i = self._index(item)
+            return np.array([] if i < 0 else [i], dtype=np.int64)
+        else:
+            raise XTypeError(f"Unknown type {type(item)} of {item}")
+
+    def _taxa(self, indices: Iterable[int]) -> List[Taxon]:
+        return [_TreeTaxon(self, int(i)) for i in indices]
+
+    def _children(self, i: int) -> Iterable[int]:
+        # each child's subtree ends where the next child starts
+        child, end = i + 1, self._ends[i]
+        while child < end:
+            yield child
+            child = int(self._ends[child])
+
+    def _cover(self, indices: np.ndarray) -> np.ndarray:
+        # marks everything under the taxa at indices
+        marks = np.zeros(len(self) + 1, dtype=np.int64)
+        np.add.at(marks, indices, 1)
+        np.add.at(marks, self._ends[indices], -1)
+        return np.cumsum(marks[:-1]) > 0
+
+    def _slice(self, start: int, stop: int) -> Taxonomy:
+        parents = self._parents[start:stop] - start
+        parents[parents < 0] = -1
+        return self._new(
+            self._ids[start:stop],
+            self._parent_ids[start:stop],
+            parents,
+            self._ends[start:stop] - start,
+            self._names,
+            self._scientific[start:stop],
+            self._common[start:stop],
+            self._mnemonic[start:stop],
+        )
+
+    def _take(self, mask: np.ndarray) -> Taxonomy:
+        # the mask must include or exclude whole subtrees,
+        # so the remaining taxa are still in pre-order
+        keep = np.flatnonzero(mask)
+        remap = np.full(len(self) + 1, -1, dtype=np.int64)
+        remap[keep] = np.arange(len(keep))
+        # -1 (no parent) maps to the extra -1 at the end
+        parents = remap[self._parents[keep]]
+        ends = np.searchsorted(keep, self._ends[keep])
+        return self._new(
+            self._ids[keep],
+            self._parent_ids[keep],
+            parents,
+            ends,
+            self._names,
+            self._scientific[keep],
+            self._common[keep],
+            self._mnemonic[keep],
+        )
 
     @classmethod
-    def _build_by_name(cls, tax: Iterable[Taxon]) -> Mapping[str, FrozenSet[Taxon]]:
-        by_name = defaultdict(set)
-        # put these in the right order
-        # so that we favor mnemonic, then scientific name, then common name
-        for t in tax:
-            if t.mnemonic is not None:
-                by_name[t.mnemonic].add(t)
-        for t in tax:
-            by_name[t.scientific_name].add(t)
-        for t in tax:
-            if t.common_name is not None:
-                by_name[t.common_name].add(t)
-        # NOTE: lower-casing the keys for lookup
-        return {k.lower(): frozenset(v) for k, v in by_name.items()}
+    def _new(cls, *arrays: np.ndarray) -> Taxonomy:
+        tree = cls.__new__(cls)
+        tree._set(*arrays)
+        return tree
+
+    def _set(
+        self,
+        ids: np.ndarray,
+        parent_ids: np.ndarray,
+        parents: np.ndarray,
+        ends: np.ndarray,
+        names: np.ndarray,
+        scientific: np.ndarray,
+        common: np.ndarray,
+        mnemonic: np.ndarray,
+    ) -> None:
+        self._ids = ids
+        self._parent_ids = parent_ids
+        self._parents = parents
+        self._ends = ends
+        self._names = names
+        self._scientific = scientific
+        self._common = common
+        self._mnemonic = mnemonic
+        # this probably isn't actually possible
+        if len(self) == 0:
+            logger.warning(f"{self} contains 0 taxa")
+
+    @classmethod
+    def _factorize(
+        cls, *columns: Sequence[Optional[str]]
+    ) -> Tuple[Sequence[np.ndarray], np.ndarray]:
+        # one table of unique names, with None as the last entry
+        # so code -1 maps to None
+        lengths = [len(c) for c in columns]
+        values = np.concatenate([np.asarray(c, dtype=object) for c in columns])
+        codes, uniques = pd.factorize(values)
+        names = np.append(np.asarray(uniques, dtype=object), None)
+        codes = np.where(codes < 0, len(names) - 1, codes).astype(np.int32)
+        return np.split(codes, np.cumsum(lengths)[:-1]), names
+
+    @classmethod
+    def _build(
+        cls,
+        ids: np.ndarray,
+        parent_ids: np.ndarray,
+        names: np.ndarray,
+        scientific: np.ndarray,
+        common: np.ndarray,
+        mnemonic: np.ndarray,
+    ) -> Tuple[np.ndarray, ...]:
+        n = len(ids)
+        order = np.argsort(ids, kind="stable")
+        sorted_ids = ids[order]
+        at = np.minimum(np.searchsorted(sorted_ids, parent_ids), max(n - 1, 0))
+        if n > 0:
+            found = (parent_ids != 0) & (sorted_ids[at] == parent_ids)
+        else:
+            found = np.zeros(0, dtype=bool)
+        parents = np.where(found, order[at] if n > 0 else at, -1)
+        # depth by walking all taxa up one level at a time
+        depth = np.zeros(n, dtype=np.int64)
+        walking = np.flatnonzero(parents >= 0)
+        up = parents[walking]
+        while len(walking) > 0:
+            if depth[walking[0]] >= n:
+                raise DataIntegrityError(f"Taxonomy contains a cycle through {ids[walking[0]]}")
+            depth[walking] += 1
+            up = parents[up]
+            walking, up = walking[up >= 0], up[up >= 0]
+        levels = np.argsort(depth, kind="stable")
+        bounds = np.searchsorted(depth[levels], np.arange(depth.max(initial=0) + 2))
+        # subtree sizes, from the deepest level up
+        sizes = np.ones(n, dtype=np.int64)
+        for d in range(len(bounds) - 2, 0, -1):
+            level = levels[bounds[d] : bounds[d + 1]]
+            np.add.at(sizes, parents[level], sizes[level])
+        # the offset of each taxon among its siblings (by ID), counting their subtrees
+        siblings = np.lexsort((ids, parents))
+        sizes_ = sizes[siblings]
+        before = np.cumsum(sizes_) - sizes_
+        parents_ = parents[siblings]
+        first = np.concatenate([[True], parents_[1:] != parents_[:-1]])
+        offsets = np.empty(n, dtype=np.int64)
+        offsets[siblings] = before - np.maximum.accumulate(np.where(first, before, 0))
+        # pre-order positions, from the top level down
+        starts = offsets.copy()
+        for d in range(1, len(bounds) - 1):
+            level = levels[bounds[d] : bounds[d + 1]]
+            starts[level] = starts[parents[level]] + 1 + offsets[level]
+        perm = np.empty(n, dtype=np.int64)
+        perm[starts] = np.arange(n)
+        new_parents = np.where(parents >= 0, starts[parents], -1)[perm]
+        ends = (starts + sizes)[perm]
+        return (
+            ids[perm],
+            parent_ids[perm],
+            new_parents,
+            ends,
+            names,
+            scientific[perm],
+            common[perm],
+            mnemonic[perm],
+        )
 
 
 __all__ = ["KnownTaxa", "Taxon", "Taxonomy", "TaxonomyDf"]
@@ -8,17 +8,17 @@ import abc
 import shutil
 from functools import cached_property
 from pathlib import Path
-from typing import Collection, Iterable, Mapping, Optional, Set, Union
+from typing import Collection, Iterable, Iterator, Mapping, Optional, Set, Union
 
 import decorateme
 import pandas as pd
 import requests
 from pocketutils.core.exceptions import XValueError
 from pocketutils.tools.filesys_tools import FilesysTools
-from typeddfs import Checksums, TypedDfs
+from typeddfs import Checksums
 
 from mandos.model.settings import SETTINGS
-from mandos.model.taxonomy import KnownTaxa, Taxonomy, TaxonomyDf
+from mandos.model.taxonomy import KnownTaxa, Taxonomy
 from mandos.model.utils import unlink
 from mandos.model.utils.globals import Globals
 from mandos.model.utils.setup import MandosResources, logger
@@ -44,8 +44,13 @@ class CachedTaxonomyCache(TaxonomyFactory, metaclass=abc.ABCMeta):
     (To find manually, follow the ``All lower taxonomy nodes`` link and click ``Download``.)
     Then applies fixes and reduces the file size, creating a new file alongside.
     Puts both the raw data and fixed data in the cache under ``~/.mandos/taxonomy/``.
+    Alongside the fixed data, also writes the built tree as memory-mappable arrays
+    (see :meth:`Taxonomy.write_mapped`), which are much faster to load.
     """
 
+    # rows of the UniProt download to read at once
+    chunk_size: int = 100_000
+
     def __init__(self, *, cache_dir: Path = SETTINGS.taxonomy_cache_path, local_only: bool):
         self.cache_dir = cache_dir
         self.local_only = local_only
@@ -73,7 +78,7 @@ class CachedTaxonomyCache(TaxonomyFactory, metaclass=abc.ABCMeta):
     def load_exact(self, taxon: int) -> Optional[Taxonomy]:
         path = self._resolve_non_vertebrate_final(taxon)
         if (self._check_has(taxon, path) or self.local_only) and path.exists():
-            return Taxonomy.from_path(path)
+            return self._read(taxon, path)
         return None
 
     def load_vertebrate(self, taxon: Union[int, str]) -> Optional[Taxonomy]:
@@ -94,15 +99,40 @@ class CachedTaxonomyCache(TaxonomyFactory, metaclass=abc.ABCMeta):
         path = self._resolve_non_vertebrate_final(taxon)
         raw_path = self._resolve_non_vertebrate_raw(taxon)
         if self._check_has(taxon, path) or self.local_only:
-            return Taxonomy.from_path(path)
+            return self._read(taxon, path)
         else:
             # raise AssertionError(str(taxon))  # TODO
             logger.notice(f"Downloading taxonomy for taxon {taxon}")
             self._download_raw(raw_path, taxon)
             path = self._resolve_non_vertebrate_final(taxon)
-            df = self._fix(raw_path, taxon, path)
+            tree = self._fix(raw_path, taxon, path)
             logger.success(f"Cached taxonomy at {path} .")
-            return Taxonomy.from_df(df)
+            self._write_mapped(taxon, tree)
+            return tree
+
+    def _read(self, taxon: int, path: Path) -> Taxonomy:
+        mapped = self._resolve_mapped(taxon)
+        if mapped.exists() and (
+            not path.exists() or mapped.stat().st_mtime >= path.stat().st_mtime
+        ):
+            logger.debug(f"Mapping taxonomy arrays at {mapped}")
+            try:
+                return Taxonomy.from_mapped(mapped)
+            except OSError:
+                # another process replaced them twice while we were reading
+                logger.opt(exception=True).warning(f"Could not map {mapped}; reading {path}")
+        tree = Taxonomy.from_path(path)
+        self._write_mapped(taxon, tree)
+        return tree
+
+    def _write_mapped(self, taxon: int, tree: Taxonomy) -> None:
+        mapped = self._resolve_mapped(taxon)
+        try:
+            tree.write_mapped(mapped)
+        except OSError:
+            logger.opt(exception=True).warning(f"Could not write taxonomy arrays to {mapped}")
+        else:
+            logger.debug(f"Wrote taxonomy arrays to {mapped}")
 
     def rebuild(self, *taxa: int, replace: bool) -> None:
         if self.local_only:
@@ -113,6 +143,9 @@ class CachedTaxonomyCache(TaxonomyFactory, metaclass=abc.ABCMeta):
                 self.delete_exact(taxon)
                 self._load_or_dl(taxon)
                 logger.success(f"Regenerated {taxon} taxonomy")
+            elif not self._resolve_mapped(taxon).exists():
+                self._write_mapped(taxon, Taxonomy.from_path(path))
+                logger.success(f"Wrote arrays for {taxon} taxonomy")
 
     def delete_exact(self, taxon: int) -> None:
         raw = self._resolve_non_vertebrate_raw(taxon)
@@ -124,6 +157,10 @@ class CachedTaxonomyCache(TaxonomyFactory, metaclass=abc.ABCMeta):
         # delete either way:
         checksum_file = Checksums().get_filesum_of_file(p)
         checksum_file.unlink(missing_ok=True)
+        mapped = self._resolve_mapped(taxon)
+        if mapped.exists():
+            shutil.rmtree(mapped)
+            logger.warning(f"Deleted cached taxonomy arrays {mapped}")
 
     def resolve_path(self, taxon: int) -> Path:
         return self._resolve_non_vertebrate_final(taxon)
@@ -131,6 +168,9 @@ class CachedTaxonomyCache(TaxonomyFactory, metaclass=abc.ABCMeta):
     def _resolve_non_vertebrate_final(self, taxon: int) -> Path:
         return self._get_resource(f"{taxon}{SETTINGS.archive_filename_suffix}")
 
+    def _resolve_mapped(self, taxon: int) -> Path:
+        return self._get_resource(f"{taxon}.taxa")
+
     def _resolve_non_vertebrate_raw(self, taxon: int) -> Path:
         # this is what is downloaded from PubChem
         # the filename is the same
@@ -151,35 +191,53 @@ class CachedTaxonomyCache(TaxonomyFactory, metaclass=abc.ABCMeta):
             with raw_path.open("wb") as f:
                 shutil.copyfileobj(r.raw, f)
 
-    def _fix(self, raw_path: Path, taxon: int, final_path: Path) -> TaxonomyDf:
+    def _fix(self, raw_path: Path, taxon: int, final_path: Path) -> Taxonomy:
         # now process it!
-        # unfortunately it won't include an entry for the root ancestor (`taxon`)
-        # so, we'll add it in (in ``df.append`` below)
-        # noinspection PyPep8Naming
+        # this reads the download in chunks, keeping only the IDs and (interned) names
+        # so the memory needed doesn't depend on the much larger lineage column
         logger.debug("Fixing raw taxonomy download")
-        raw_type = TypedDfs.untyped("Raw")
-        df = raw_type.read_file(raw_path)
-        # find the scientific name of the parent
-        scientific_name = self._determine_name(df, taxon)
-        # now fix the columns
-        df = df[["Taxon", "Mnemonic", "Scientific name", "Common name", "Parent"]]
-        df.columns = ["taxon", "mnemonic", "scientific_name", "common_name", "parent"]
-        # now add the ancestor back in
-        df = df.append(
-            pd.Series(dict(taxon=taxon, scientific_name=scientific_name, parent=0)),
-            ignore_index=True,
-        )
-        df["parent"] = df["parent"].fillna(0).astype(int)
+        tree = Taxonomy.from_chunks(self._read_raw(raw_path, taxon))
         # write it to a feather / csv / whatever
-        df = TaxonomyDf.convert(df)
-        df.write_file(final_path, dir_hash=True)
+        tree.to_df().write_file(final_path, dir_hash=True)
         unlink(raw_path)
-        return df
+        return tree
 
-    def _determine_name(self, df: pd.DataFrame, taxon: int) -> str:
+    def _read_raw(self, raw_path: Path, taxon: int) -> Iterator[pd.DataFrame]:
+        # unfortunately it won't include an entry for the root ancestor (`taxon`)
+        # so, we'll add it in at the end, taking its name from its children's lineage
+        columns = {
+            "Taxon": "taxon",
+            "Mnemonic": "mnemonic",
+            "Scientific name": "scientific_name",
+            "Common name": "common_name",
+            "Parent": "parent",
+        }
+        scientific_name = None
+        reader = pd.read_csv(
+            raw_path,
+            sep="\t",
+            usecols=[*columns, "Lineage"],
+            dtype={"Mnemonic": str, "Scientific name": str, "Common name": str, "Lineage": str},
+            chunksize=self.chunk_size,
+        )
+        with reader:
+            for chunk in reader:
+                if scientific_name is None:
+                    scientific_name = self._determine_name(chunk, taxon)
+                chunk = chunk.rename(columns=columns)[list(columns.values())]
+                chunk["parent"] = chunk["parent"].fillna(0).astype(int)
+                yield chunk
+        if scientific_name is None:
+            raise XValueError(f"Could not infer scientific name for {taxon}")
+        yield pd.DataFrame(
+            [dict(taxon=taxon, mnemonic=None, scientific_name=scientific_name, parent=0)],
+            columns=list(columns.values()),
+        )
+
+    def _determine_name(self, df: pd.DataFrame, taxon: int) -> Optional[str]:
         got = df[df["Parent"] == taxon]
         if len(got) == 0:
-            raise XValueError(f"Could not infer scientific name for {taxon}")
+            return None
         z = str(list(got["Lineage"])[0])
         return z.split("; ")[-1].strip()
 
@@ -207,9 +265,9 @@ class TaxonomyFactories:
     def list_cached_files(cls) -> Mapping[int, Path]:
         suffix = SETTINGS.archive_filename_suffix
         return {
-            int(p.scientific_name.replace(suffix, "")): p
+            int(p.name[: -len(suffix)]): p
             for p in SETTINGS.taxonomy_cache_path.iterdir()
-            if p.suffix.endswith(suffix)
+            if p.name.endswith(suffix)
         }
 
     @classmethod
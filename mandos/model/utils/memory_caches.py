@@ -0,0 +1,116 @@
+"""
+In-process caches bounded by memory.
+"""
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Generic, Hashable, Optional, Tuple, TypeVar
+
+from pocketutils.core.exceptions import XValueError
+
+from mandos.model.utils.setup import logger
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+@dataclass(frozen=True, repr=True, order=True)
+class MemoryCacheStats:
+    hits: int
+    misses: int
+    evictions: int
+    n_items: int
+    n_bytes: int
+
+    def __str__(self) -> str:
+        return (
+            f"{self.hits} hits, {self.misses} misses, {self.evictions} evictions;"
+            + f" {self.n_items} items in {self.n_bytes / 1024 / 1024:.1f} MiB"
+        )
+
+
+class MemoryLruCache(Generic[K, V]):
+    """
+    A thread-safe least-recently-used cache holding up to ``max_bytes`` total.
+
+    Callers give the size of each value when adding it.
+    A value larger than ``max_bytes`` is not kept. A ``max_bytes`` of 0 disables the cache.
+    """
+
+    def __init__(self, name: str, max_bytes: int):
+        if max_bytes < 0:
+            raise XValueError(f"max_bytes {max_bytes} < 0")
+        self._name = name
+        self._max_bytes = max_bytes
+        self._items: OrderedDict[K, Tuple[V, int]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._n_bytes, self._hits, self._misses, self._evictions = 0, 0, 0, 0
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def max_bytes(self) -> int:
+        return self._max_bytes
+
+    @property
+    def stats(self) -> MemoryCacheStats:
+        with self._lock:
+            return MemoryCacheStats(
+                hits=self._hits,
+                misses=self._misses,
+                evictions=self._evictions,
+                n_items=len(self._items),
+                n_bytes=self._n_bytes,
+            )
+
+    def get(self, key: K) -> Optional[V]:
+        """
+        Returns the value for ``key`` and marks it as recently used, or None if it's not cached.
+        """
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                self._misses += 1
+                return None
+            self._items.move_to_end(key)
+            self._hits += 1
+            return item[0]
+
+    def put(self, key: K, value: V, n_bytes: int) -> None:
+        """
+        Adds or replaces ``key``, evicting the least-recently-used values as needed.
+        """
+        if n_bytes > self._max_bytes:
+            return
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self._n_bytes -= old[1]
+            self._items[key] = (value, n_bytes)
+            self._n_bytes += n_bytes
+            n_evicted = 0
+            while self._n_bytes > self._max_bytes:
+                _, (_, evicted_bytes) = self._items.popitem(last=False)
+                self._n_bytes -= evicted_bytes
+                n_evicted += 1
+            self._evictions += n_evicted
+        if n_evicted > 0:
+            logger.debug(f"Evicted {n_evicted} from {self._name} cache ({self.stats})")
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+            self._n_bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __contains__(self, key: K) -> bool:
+        return key in self._items
+
+
+__all__ = ["MemoryCacheStats", "MemoryLruCache"]
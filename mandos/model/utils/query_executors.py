@@ -0,0 +1,86 @@
+"""
+Rate-limited query executors that can be shared between threads.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from datetime import timedelta
+from typing import Callable, Mapping, Optional, TypeVar
+from urllib import request
+
+from pocketutils.core.query_utils import QueryExecutor, TimeTaken
+
+T = TypeVar("T")
+
+
+class ConcurrentQueryExecutor(QueryExecutor):
+    """
+    A :class:`QueryExecutor` that is safe to call from multiple threads.
+
+    Each call reserves the next free slot (``delay_min`` to ``delay_max`` after the previous one)
+    under a lock, then sleeps and queries outside the lock.
+    So requests *start* no faster than the configured rate,
+    but slow responses do not block other threads from using their slots.
+    Each response also pushes the next free slot to at least that delay after it,
+    so a single thread waits between the end of one request and the start of the next,
+    exactly like :class:`QueryExecutor`.
+    ``last_time_taken`` is tracked per thread.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @property
+    def last_time_taken(self) -> Optional[TimeTaken]:
+        return getattr(self._local, "time_taken", None)
+
+    def __call__(
+        self,
+        url: str,
+        method: str = "get",
+        encoding: Optional[str] = "-1",
+        headers: Optional[Mapping[str, str]] = None,
+        errors: str = "ignore",
+        data: Optional[bytes] = None,
+    ) -> str:
+        """
+        Queries ``url``, waiting for this thread's slot first.
+        Unlike :class:`QueryExecutor`, accepts a request body (``data``), e.g. for POST.
+        """
+        headers = {} if headers is None else headers
+        encoding = self._encoding if encoding == "-1" else encoding
+        req = request.Request(url=url, data=data, method=method.upper(), headers=headers)
+        content = self.limit(lambda: self._querier(req))
+        if encoding is None:
+            return content.decode(errors=errors)
+        return content.decode(encoding=encoding, errors=errors)
+
+    def limit(self, fn: Callable[[], T]) -> T:
+        """
+        Calls ``fn`` in this thread's next slot, exactly as if it were a query.
+        For clients that make their own requests (e.g. ``chembl_webresource_client``).
+        """
+        with self._lock:
+            now = time.monotonic()
+            delay = self._rand.uniform(self._min, self._max)
+            start_at = max(now, self._next_at)
+            self._next_at = start_at + delay
+        wait_secs = start_at - now
+        if wait_secs > 0:
+            time.sleep(wait_secs)
+        now = time.monotonic()
+        try:
+            return fn()
+        finally:
+            end = time.monotonic()
+            with self._lock:
+                self._next_at = max(self._next_at, end + delay)
+            self._local.time_taken = TimeTaken(
+                query=timedelta(seconds=end - now), wait=timedelta(seconds=wait_secs)
+            )
+
+
+__all__ = ["ConcurrentQueryExecutor"]
@@ -6,6 +6,7 @@ from mandos.model.apis.chembl_scrape_api import ChemblScrapeApi, ChemblScrapePag
 from mandos.model.apis.chembl_support.chembl_target_graphs import (
     ChemblTargetGraphFactory,
 )
+from mandos.model.apis.chembl_support.chembl_target_store import ChemblTargetStores
 from mandos.model.apis.chembl_support.chembl_targets import TargetFactory
 from mandos.model.hits import AbstractHit
 from mandos.model.searches import Search
@@ -34,7 +35,7 @@ class ChemblSearch(Search[H], metaclass=abc.ABCMeta):
     def __init__(self, key: str, api: ChemblApi):
         super().__init__(key)
         self.api = api
-        self._target_factory = TargetFactory(self.api)
+        self._target_factory = TargetFactory(self.api, ChemblTargetStores.default())
         self._graph_factory = ChemblTargetGraphFactory.create(self.api, self._target_factory)
         SETTINGS.configure_chembl()
 
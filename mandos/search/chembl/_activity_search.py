@@ -1,12 +1,17 @@
 import abc
-from typing import Optional, Sequence, Set
+import threading
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Sequence, Set
 
 from pocketutils.core.dot_dict import NestedDotDict
 
+from mandos.model import CompoundNotFoundError
 from mandos.model.apis.chembl_api import ChemblApi
 from mandos.model.apis.chembl_support import ChemblCompound
 from mandos.model.apis.chembl_support.chembl_activity import DataValidityComment
 from mandos.model.apis.chembl_support.chembl_target_graphs import ChemblTargetGraph
+from mandos.model.apis.chembl_support.chembl_utils import ChemblUtils
+from mandos.model.settings import SETTINGS
 from mandos.model.taxonomy_caches import LazyTaxonomy
 from mandos.model.utils.setup import logger
 from mandos.search.chembl._protein_search import H, ProteinSearch
@@ -15,6 +20,11 @@ from mandos.search.chembl._protein_search import H, ProteinSearch
 class _ActivitySearch(ProteinSearch[H], metaclass=abc.ABCMeta):
     """
     Search for ``activity``.
+
+    Compounds passed to ``prefetch`` are queried together:
+    activities for all of their parent molecules in one query,
+    then the confidence scores for all of the assays in those activities.
+    ``find`` then uses those results instead of querying again.
     """
 
     def __init__(
@@ -33,21 +43,96 @@ class _ActivitySearch(ProteinSearch[H], metaclass=abc.ABCMeta):
         self.allowed_relations = relations
         self.min_pchembl = min_pchembl
         self.binds_cutoff = binds_cutoff
+        self._compounds: Dict[str, ChemblCompound] = {}
+        self._activities: Dict[str, List[NestedDotDict]] = {}
+        # the number of prefetched compounds that have yet to use the activities for a parent
+        self._n_waiting: Counter[str] = Counter()
+        self._confidence_scores: Dict[str, Optional[int]] = {}
+        self._lock = threading.Lock()
 
     @classmethod
     def assay_type(cls) -> str:
         raise NotImplementedError()
 
+    @property
+    def batch_size(self) -> int:
+        return SETTINGS.chembl_batch_size
+
+    def prefetch(self, inchikeys: Sequence[str]) -> None:
+        compounds = {}
+        for inchikey in inchikeys:
+            try:
+                compounds[inchikey] = ChemblUtils(self.api).get_compound(inchikey)
+            except CompoundNotFoundError:
+                pass  # find() will raise it again
+        chids = sorted({c.chid for c in compounds.values()})
+        if len(chids) == 0:
+            return
+        activities = {c: [] for c in chids}
+        for activity in self.api.activity.filter(
+            **self._filters(parent_molecule_chembl_id__in=chids)
+        ):
+            activities[activity["parent_molecule_chembl_id"]].append(activity)
+        assays = {a["assay_chembl_id"] for found in activities.values() for a in found}
+        self._fetch_confidence_scores(assays)
+        logger.debug(
+            f"Prefetched {sum(len(a) for a in activities.values())} activities"
+            + f" for {len(chids)} compounds, in {len(assays)} assays"
+        )
+        with self._lock:
+            self._compounds.update(compounds)
+            self._activities.update(activities)
+            self._n_waiting.update(c.chid for c in compounds.values())
+
+    def get_compound(self, lookup: str) -> ChemblCompound:
+        with self._lock:
+            compound = self._compounds.pop(lookup, None)
+        return super().get_compound(lookup) if compound is None else compound
+
     def query(self, parent_form: ChemblCompound) -> Sequence[NestedDotDict]:
+        chid = parent_form.chid
+        with self._lock:
+            found = self._activities.get(chid)
+            if found is not None:
+                self._n_waiting[chid] -= 1
+                if self._n_waiting[chid] < 1:
+                    del self._activities[chid], self._n_waiting[chid]
+        if found is not None:
+            return found
+        return list(
+            self.api.activity.filter(**self._filters(parent_molecule_chembl_id=parent_form.chid))
+        )
+
+    def _filters(self, **compounds) -> Dict[str, object]:
         filters = dict(
-            parent_molecule_chembl_id=parent_form.chid,
+            **compounds,
             assay_type=self.assay_type(),
             pchembl_value__isnull=None if self.min_pchembl is None else False,
             target_organism__isnull=None if len(self.taxa.get) == 0 else False,
         )
         # I'd rather not figure out how the API interprets None, so remove them
-        filters = {k: v for k, v in filters.items() if v is not None}
-        return list(self.api.activity.filter(**filters))
+        return {k: v for k, v in filters.items() if v is not None}
+
+    def _fetch_confidence_scores(self, assays: Iterable[str]) -> None:
+        with self._lock:
+            assays = sorted({a for a in assays if a not in self._confidence_scores})
+        for i in range(0, len(assays), self.batch_size):
+            batch = assays[i : i + self.batch_size]
+            found = self.api.assay.filter(assay_chembl_id__in=batch).only(
+                ["assay_chembl_id", "confidence_score"]
+            )
+            scores = {a["assay_chembl_id"]: a.get("confidence_score") for a in found}
+            with self._lock:
+                self._confidence_scores.update(scores)
+
+    def _confidence_score(self, assay: str) -> Optional[int]:
+        with self._lock:
+            if assay in self._confidence_scores:
+                return self._confidence_scores[assay]
+        score = self.api.assay.get(assay).get("confidence_score")
+        with self._lock:
+            self._confidence_scores[assay] = score
+        return score
 
     def should_include(
         self, lookup: str, compound: ChemblCompound, data: NestedDotDict, target: ChemblTargetGraph
@@ -81,14 +166,13 @@ class _ActivitySearch(ProteinSearch[H], metaclass=abc.ABCMeta):
         # Ex: see assay CHEMBL823141 / document CHEMBL1135642 for homo sapiens in xenopus laevis
         # However, it's often something like yeast expressing a human / mouse / etc receptor
         # So there's no need to filter by it
-        assay = self.api.assay.get(data.req_as("assay_chembl_id", str))
         if target.type.name.lower() not in {s.lower() for s in self.allowed_target_types}:
             logger.debug(
                 f"Excluding {target.name} with type {target.type}"
                 + f" (compound {compound.chid} [{compound.inchikey}])"
             )
             return False
-        confidence_score = assay.get("confidence_score")
+        confidence_score = self._confidence_score(data.req_as("assay_chembl_id", str))
         if self.min_confidence_score is not None and (
             confidence_score is None or confidence_score < self.min_confidence_score
         ):
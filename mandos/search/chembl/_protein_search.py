@@ -7,6 +7,7 @@ from pocketutils.core.dot_dict import NestedDotDict
 from mandos.model.apis.chembl_api import ChemblApi
 from mandos.model.apis.chembl_support import ChemblCompound
 from mandos.model.apis.chembl_support.chembl_target_graphs import ChemblTargetGraph
+from mandos.model.apis.chembl_support.chembl_targets import ChemblTarget
 from mandos.model.apis.chembl_support.chembl_utils import ChemblUtils
 from mandos.model.apis.chembl_support.target_traversal import TargetTraversalStrategies
 from mandos.model.concrete_hits import ProteinHit
@@ -37,6 +38,9 @@ class ProteinSearch(ChemblSearch[H], metaclass=abc.ABCMeta):
         self.allowed_target_types = allowed_target_types
         self.min_confidence_score = min_confidence_score
 
+    def get_compound(self, lookup: str) -> ChemblCompound:
+        return ChemblUtils(self.api).get_compound(lookup)
+
     def query(self, parent_form: ChemblCompound) -> Sequence[NestedDotDict]:
         raise NotImplementedError()
 
@@ -61,7 +65,7 @@ class ProteinSearch(ChemblSearch[H], metaclass=abc.ABCMeta):
         lookup: str,
         compound: ChemblCompound,
         data: NestedDotDict,
-        best_target: ChemblTargetGraph,
+        best_target: ChemblTarget,
     ) -> Sequence[H]:
         """
         Gets the desired data as a NestedDotDict from the data from a single element
@@ -86,12 +90,14 @@ class ProteinSearch(ChemblSearch[H], metaclass=abc.ABCMeta):
 
     def find(self, lookup: str) -> Sequence[H]:
         _ = self.taxa.get  # do first for better logging
-        form = ChemblUtils(self.api).get_compound(lookup)
+        form = self.get_compound(lookup)
         results = self.query(form)
         hits = []
         for result in results:
             result = NestedDotDict(result)
             hits.extend(self.process(lookup, form, result))
+        if self.traversal.memo_stats is not None:
+            logger.debug(f"Traversals for {self.key}: {self.traversal.memo_stats}")
         return hits
 
     def process(self, lookup: str, compound: ChemblCompound, data: NestedDotDict) -> Sequence[H]:
@@ -3,7 +3,7 @@ from typing import Sequence
 from pocketutils.core.dot_dict import NestedDotDict
 
 from mandos.model.apis.chembl_support import ChemblCompound
-from mandos.model.apis.chembl_support.chembl_target_graphs import ChemblTargetGraph
+from mandos.model.apis.chembl_support.chembl_targets import ChemblTarget
 from mandos.model.concrete_hits import FunctionalHit
 from mandos.search.chembl._activity_search import _ActivitySearch
 
@@ -22,7 +22,7 @@ class FunctionalSearch(_ActivitySearch[FunctionalHit]):
         lookup: str,
         compound: ChemblCompound,
         data: NestedDotDict,
-        best_target: ChemblTargetGraph,
+        best_target: ChemblTarget,
     ) -> Sequence[FunctionalHit]:
         # these must match the constructor of the Hit,
         # EXCEPT for object_id and object_name, which come from traversal
@@ -4,6 +4,7 @@ from pocketutils.core.dot_dict import NestedDotDict
 
 from mandos.model.apis.chembl_support import ChemblCompound
 from mandos.model.apis.chembl_support.chembl_target_graphs import ChemblTargetGraph
+from mandos.model.apis.chembl_support.chembl_targets import ChemblTarget
 from mandos.model.concrete_hits import MechanismHit
 from mandos.model.utils.setup import logger
 from mandos.search.chembl._protein_search import ProteinSearch
@@ -33,7 +34,7 @@ class MechanismSearch(ProteinSearch[MechanismHit]):
         lookup: str,
         compound: ChemblCompound,
         data: NestedDotDict,
-        best_target: ChemblTargetGraph,
+        best_target: ChemblTarget,
     ) -> Sequence[MechanismHit]:
         # ChEMBL recently dropped target_pref_name, so we'll need to find it
         exact_target_obj = self._target_factory.find(data["target_chembl_id"])
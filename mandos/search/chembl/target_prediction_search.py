@@ -8,11 +8,9 @@ from typeddfs import TypedDf
 
 from mandos.model.apis.chembl_api import ChemblApi
 from mandos.model.apis.chembl_support import ChemblCompound
-from mandos.model.apis.chembl_support.chembl_target_graphs import (
-    ChemblTargetGraph,
-    ChemblTargetGraphFactory,
-)
-from mandos.model.apis.chembl_support.chembl_targets import TargetFactory
+from mandos.model.apis.chembl_support.chembl_target_graphs import ChemblTargetGraphFactory
+from mandos.model.apis.chembl_support.chembl_target_store import ChemblTargetStores
+from mandos.model.apis.chembl_support.chembl_targets import ChemblTarget, TargetFactory
 from mandos.model.apis.chembl_support.chembl_utils import ChemblUtils
 from mandos.model.apis.chembl_support.target_traversal import TargetTraversalStrategies
 from mandos.model.concrete_hits import ChemblTargetPredictionHit
@@ -69,6 +67,8 @@ class TargetPredictionSearch(ChemblScrapeSearch[ChemblTargetPredictionHit]):
         hits = []
         for row in table.itertuples():
             hits.extend(self.process(lookup, compound, row))
+        if self.traversal.memo_stats is not None:
+            logger.debug(f"Traversals for {self.key}: {self.traversal.memo_stats}")
         return hits
 
     def process(
@@ -80,11 +80,11 @@ class TargetPredictionSearch(ChemblScrapeSearch[ChemblTargetPredictionHit]):
         thresh = row.activity_threshold
         if row.activity_threshold < self.min_threshold:
             return []
-        factory = TargetFactory(self.api)
+        factory = TargetFactory(self.api, ChemblTargetStores.default())
         target_obj = factory.find(row.target_chembl_id)
         graph_factory = ChemblTargetGraphFactory.create(self.api, factory)
         graph = graph_factory.at_target(target_obj)
-        ancestors: Sequence[ChemblTargetGraph] = self.traversal(graph)
+        ancestors: Sequence[ChemblTarget] = self.traversal(graph)
         lst = []
         for ancestor in ancestors:
             for conf_t, conf_v in zip(
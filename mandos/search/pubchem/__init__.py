@@ -1,9 +1,10 @@
 import abc
-from typing import TypeVar
+from typing import Sequence, TypeVar
 
 from pocketutils.core.exceptions import XValueError
 
 from mandos.model.apis.pubchem_api import PubchemApi
+from mandos.model.apis.pubchem_support.pubchem_data import PubchemData
 from mandos.model.hits import AbstractHit
 from mandos.model.searches import Search
 
@@ -23,5 +24,16 @@ class PubchemSearch(Search[H], metaclass=abc.ABCMeta):
         super().__init__(key)
         self.api = api
 
+    def find(self, inchikey: str) -> Sequence[H]:
+        data = self.api.fetch_data(inchikey)
+        return self.process(inchikey, data)
+
+    def process(self, inchikey: str, data: PubchemData) -> Sequence[H]:
+        """
+        Gets the hits from already-fetched data.
+        Lets several searches share a single :meth:`PubchemApi.fetch_data` call.
+        """
+        raise NotImplementedError()
+
 
 __all__ = ["PubchemSearch"]
@@ -1,6 +1,7 @@
 from typing import Sequence
 
 from mandos.model.apis.pubchem_api import PubchemApi
+from mandos.model.apis.pubchem_support.pubchem_data import PubchemData
 from mandos.model.concrete_hits import AcuteEffectHit, Ld50Hit
 from mandos.model.utils.setup import logger
 from mandos.search.pubchem import PubchemSearch
@@ -13,8 +14,7 @@ class AcuteEffectSearch(PubchemSearch[AcuteEffectHit]):
         super().__init__(key, api)
         self.top_level = top_level
 
-    def find(self, inchikey: str) -> Sequence[AcuteEffectHit]:
-        data = self.api.fetch_data(inchikey)
+    def process(self, inchikey: str, data: PubchemData) -> Sequence[AcuteEffectHit]:
         results = []
         for dd in data.toxicity.acute_effects:
             for effect in dd.effects:
@@ -62,8 +62,7 @@ class AcuteEffectSearch(PubchemSearch[AcuteEffectHit]):
 
 
 class Ld50Search(PubchemSearch[Ld50Hit]):
-    def find(self, inchikey: str) -> Sequence[Ld50Hit]:
-        data = self.api.fetch_data(inchikey)
+    def process(self, inchikey: str, data: PubchemData) -> Sequence[Ld50Hit]:
         results = []
         for dd in data.toxicity.acute_effects:
             if dd.test_type != "LD50":
@@ -19,15 +19,14 @@ class BioactivitySearch(PubchemSearch[BioactivityHit]):
         super().__init__(key, api)
         self.compound_name_must_match = compound_name_must_match
 
-    def find(self, inchikey: str) -> Sequence[BioactivityHit]:
-        data = self.api.fetch_data(inchikey)
+    def process(self, inchikey: str, data: PubchemData) -> Sequence[BioactivityHit]:
         results = []
         for dd in data.biological_test_results.bioactivity:
             if not self.compound_name_must_match or dd.compound_name.lower() == data.name.lower():
-                results.append(self.process(inchikey, data, dd))
+                results.append(self._process_one(inchikey, data, dd))
         return results
 
-    def process(self, inchikey: str, data: PubchemData, dd: Bioactivity) -> BioactivityHit:
+    def _process_one(self, inchikey: str, data: PubchemData, dd: Bioactivity) -> BioactivityHit:
         target_name, target_abbrev, species = dd.target_name_abbrev_species
         action = dd.activity.name.lower()
         source = self._format_source(
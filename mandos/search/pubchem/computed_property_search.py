@@ -1,6 +1,7 @@
 from typing import Sequence, Set
 
 from mandos.model.apis.pubchem_api import PubchemApi
+from mandos.model.apis.pubchem_support.pubchem_data import PubchemData
 from mandos.model.concrete_hits import ComputedPropertyHit
 from mandos.search.pubchem import PubchemSearch
 
@@ -13,8 +14,7 @@ class ComputedPropertySearch(PubchemSearch[ComputedPropertyHit]):
         self.api = api
         self.descriptors = descriptors
 
-    def find(self, inchikey: str) -> Sequence[ComputedPropertyHit]:
-        data = self.api.fetch_data(inchikey)
+    def process(self, inchikey: str, data: PubchemData) -> Sequence[ComputedPropertyHit]:
         results = []
         # we're really not going to have a case where there are two keys --
         # one with different capitalization or punctuation
@@ -36,8 +36,7 @@ class CoOccurrenceSearch(PubchemSearch[H], metaclass=abc.ABCMeta):
     def _query(self, data: PubchemData):
         raise NotImplementedError()
 
-    def find(self, inchikey: str) -> Sequence[H]:
-        data = self.api.fetch_data(inchikey)
+    def process(self, inchikey: str, data: PubchemData) -> Sequence[H]:
         all_of_them = self._query(data)
         return [
             self._create_hit(
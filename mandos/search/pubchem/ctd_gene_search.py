@@ -2,6 +2,7 @@ from typing import Optional, Sequence
 
 import regex
 
+from mandos.model.apis.pubchem_support.pubchem_data import PubchemData
 from mandos.model.concrete_hits import CtdGeneHit
 from mandos.model.utils.setup import logger
 from mandos.search.pubchem import PubchemSearch
@@ -10,8 +11,7 @@ from mandos.search.pubchem import PubchemSearch
 class CtdGeneSearch(PubchemSearch[CtdGeneHit]):
     """ """
 
-    def find(self, inchikey: str) -> Sequence[CtdGeneHit]:
-        data = self.api.fetch_data(inchikey)
+    def process(self, inchikey: str, data: PubchemData) -> Sequence[CtdGeneHit]:
         results = []
         for dd in data.biomolecular_interactions_and_pathways.chemical_gene_interactions:
             for interaction in dd.interactions:
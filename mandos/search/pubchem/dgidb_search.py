@@ -1,6 +1,7 @@
 from typing import Sequence
 
 from mandos.model.apis.pubchem_api import PubchemApi
+from mandos.model.apis.pubchem_support.pubchem_data import PubchemData
 from mandos.model.concrete_hits import DgiHit
 from mandos.search.pubchem import PubchemSearch
 
@@ -11,8 +12,7 @@ class DgiSearch(PubchemSearch[DgiHit]):
     def __init__(self, key: str, api: PubchemApi):
         super().__init__(key, api)
 
-    def find(self, inchikey: str) -> Sequence[DgiHit]:
-        data = self.api.fetch_data(inchikey)
+    def process(self, inchikey: str, data: PubchemData) -> Sequence[DgiHit]:
         results = []
         for dd in data.biomolecular_interactions_and_pathways.drug_gene_interactions:
             if len(dd.interactions) == 0:
@@ -1,5 +1,6 @@
 from typing import Sequence
 
+from mandos.model.apis.pubchem_support.pubchem_data import PubchemData
 from mandos.model.concrete_hits import DiseaseHit
 from mandos.search.pubchem import PubchemSearch
 
@@ -7,8 +8,7 @@ from mandos.search.pubchem import PubchemSearch
 class DiseaseSearch(PubchemSearch[DiseaseHit]):
     """ """
 
-    def find(self, inchikey: str) -> Sequence[DiseaseHit]:
-        data = self.api.fetch_data(inchikey)
+    def process(self, inchikey: str, data: PubchemData) -> Sequence[DiseaseHit]:
         return [
             self._create_hit(
                 data_source=self._format_source(evidence=dd.evidence_type),
@@ -2,6 +2,7 @@ from typing import Optional, Sequence
 
 import regex
 
+from mandos.model.apis.pubchem_support.pubchem_data import PubchemData
 from mandos.model.apis.pubchem_support.pubchem_models import DrugbankDdi
 from mandos.model.concrete_hits import DrugbankDdiHit
 from mandos.model.utils.setup import logger
@@ -15,8 +16,7 @@ def _re(s: str) -> regex.Pattern:
 class DrugbankDdiSearch(PubchemSearch[DrugbankDdiHit]):
     """ """
 
-    def find(self, inchikey: str) -> Sequence[DrugbankDdiHit]:
-        data = self.api.fetch_data(inchikey)
+    def process(self, inchikey: str, data: PubchemData) -> Sequence[DrugbankDdiHit]:
         hits = []
         for dd in data.biomolecular_interactions_and_pathways.drugbank_ddis:
             kind = self._guess_type(dd.description)
@@ -1,6 +1,7 @@
 from typing import Optional, Sequence, Set, TypeVar
 
 from mandos.model.apis.pubchem_api import PubchemApi
+from mandos.model.apis.pubchem_support.pubchem_data import PubchemData
 from mandos.model.apis.pubchem_support.pubchem_models import (
     DrugbankInteraction,
     DrugbankTargetType,
@@ -27,8 +28,7 @@ class _DrugbankInteractionSearch(PubchemSearch[T]):
     def _get_obj(cls, dd: DrugbankInteraction) -> Optional[str]:
         raise NotImplementedError()
 
-    def find(self, inchikey: str) -> Sequence[T]:
-        data = self.api.fetch_data(inchikey)
+    def process(self, inchikey: str, data: PubchemData) -> Sequence[T]:
         results = []
         for dd in data.biomolecular_interactions_and_pathways.drugbank_interactions:
             if dd.target_type in self.target_types:
@@ -3,6 +3,7 @@ from typing import AbstractSet, Optional, Sequence, Set
 from pocketutils.tools.common_tools import CommonTools
 
 from mandos.model.apis.pubchem_api import PubchemApi
+from mandos.model.apis.pubchem_support.pubchem_data import PubchemData
 from mandos.model.apis.pubchem_support.pubchem_models import (
     ClinicalTrial,
     ClinicalTrialSimplifiedStatus,
@@ -27,8 +28,7 @@ class TrialSearch(PubchemSearch[TrialHit]):
         self.statuses = statuses
         self.explicit = explicit
 
-    def find(self, inchikey: str) -> Sequence[TrialHit]:
-        data = self.api.fetch_data(inchikey)
+    def process(self, inchikey: str, data: PubchemData) -> Sequence[TrialHit]:
         hits = []
         # {std_status}:phase{std_phase}
         for dd in data.drug_and_medication_information.clinical_trials:
@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from mandos.analysis.concordance import ConcordanceCalculation
+from mandos.analysis.io_defns import SimilarityDfLongForm
+
+
+def _brute(phi, psi) -> float:
+    n, total = len(phi), 0
+    for i in range(n):
+        for j in range(i):
+            z = np.sign(phi[i] - phi[j]) * np.sign(psi[i] - psi[j])
+            total += 0 if np.isnan(z) else int(z)
+    return total / (n * (n - 1) / 2)
+
+
+class TestTau:
+    @pytest.mark.parametrize("seed", range(8))
+    def test_same_as_definition(self, seed: int):
+        rand = np.random.RandomState(seed)
+        for _ in range(20):
+            n = rand.randint(2, 40)
+            phi = rand.randint(0, rand.randint(1, 8), size=n).astype(float)
+            psi = rand.uniform(size=n) if seed % 2 else rand.randint(0, 4, size=n).astype(float)
+            if seed % 3 == 0:
+                phi[rand.randint(n)] = np.nan
+            calc = ConcordanceCalculation.create("tau", n_samples=0, seed=0)
+            assert list(calc.generate(phi, psi)) == [_brute(phi, psi)]
+
+    def test_samples(self):
+        calc = ConcordanceCalculation.create("tau", n_samples=50, seed=0)
+        phi = np.arange(30.0)
+        taus = list(calc.generate(phi, phi[::-1]))
+        assert len(taus) == 51
+        assert taus[0] == -1
+        # samples repeat pairs, and repeated pairs are ties
+        assert all(-1 <= t < -0.5 for t in taus[1:])
+
+    def test_calc_all(self):
+        keys = ["a", "b", "c", "d"]
+        pairs = [(x, y) for i, x in enumerate(keys) for y in keys[i + 1 :]]
+
+        def df(name: str, values):
+            return SimilarityDfLongForm(
+                [(x, y, "phi", name, v) for (x, y), v in zip(pairs, values)],
+                columns=["inchikey_1", "inchikey_2", "type", "key", "value"],
+            )
+
+        phis = df("p", [1, 2, 3, 4, 5, np.nan])
+        psis = pd.concat([df("q", [1, 2, 3, 4, 6, 5]), df("r", [6, 5, 4, 3, 2, 1])])
+        psis["type"] = "psi"
+        calc = ConcordanceCalculation.create("tau", n_samples=3, seed=0)
+        found = calc.calc_all(phis, SimilarityDfLongForm.convert(psis))
+        assert len(found) == 8
+        observed = found[found["sample"] == 0].set_index("psi")["tau"].to_dict()
+        assert observed == dict(q=1.0, r=-1.0)
+
+
+if __name__ == "__main__":
+    pytest.main()
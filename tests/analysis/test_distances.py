@@ -0,0 +1,90 @@
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+from typeddfs import Checksums
+
+from mandos.analysis import AnalysisUtils as Au
+from mandos.analysis.distances import JPrimeMatrixCalculator
+from mandos.model.hit_dfs import HitDf
+
+from ..builders import binding_hits
+
+
+def _calc() -> JPrimeMatrixCalculator:
+    return JPrimeMatrixCalculator(min_compounds=2, min_nonzero=0, min_hits=1)
+
+
+class TestJPrime:
+    @pytest.mark.parametrize("n_targets", [8, 50])
+    def test_same_as_definition(self, n_targets: int):
+        hits = binding_hits(30, n_targets=n_targets, per_compound=(1, 8))
+        calc = _calc()
+        df = calc.calc_one("binding", hits)
+        ik2hits = Au.hit_multidict(hits, "origin_inchikey")
+        compounds = list(ik2hits.keys())
+        assert df.index.tolist() == df.columns.tolist() == compounds
+        for i, c1 in enumerate(compounds):
+            for j, c2 in enumerate(compounds):
+                z = df.loc[c2, c1]
+                if i > j:
+                    assert np.isnan(z)
+                elif i == j:
+                    assert z == 1
+                else:
+                    expected = calc._j_prime("binding", ik2hits[c1], ik2hits[c2])
+                    assert z == expected or np.isnan(z) and np.isnan(expected)
+
+    def test_values(self):
+        hits = binding_hits(2, n_targets=1, per_compound=(1, 1))
+        for h in hits:
+            object.__setattr__(h, "data_source", "chembl:binding:1")
+            object.__setattr__(h, "predicate", "binds")
+        df = _calc().calc_one("binding", hits)
+        a, b = Au.elle(hits[0].weight), Au.elle(hits[1].weight)
+        z = df.loc[hits[1].origin_inchikey, hits[0].origin_inchikey]
+        assert z == math.sqrt(a * b) / (a + b - math.sqrt(a * b))
+
+
+def _dropna(df) -> pd.DataFrame:
+    df = pd.DataFrame(df).dropna(subset=["value"])
+    return df.sort_values(["inchikey_1", "inchikey_2"]).reset_index(drop=True)
+
+
+class TestBlocked:
+    @pytest.mark.parametrize("n_procs", [1, 2])
+    def test_same_as_unblocked(self, tmp_path, n_procs: int):
+        path = tmp_path / "hits.feather"
+        HitDf.from_hits(binding_hits(23, n_targets=8, per_compound=(1, 6))).write_file(path)
+        expected = _calc().calc_all(path, tmp_path / "a" / "j.feather")
+        calc = JPrimeMatrixCalculator(
+            min_compounds=2, min_nonzero=0, min_hits=1, block_size=5, n_procs=n_procs
+        )
+        found = calc.calc_all(path, tmp_path / "b" / "j.feather")
+        assert len(found) == 23 * 24 // 2
+        assert _dropna(found).equals(_dropna(expected))
+        assert not any(p.name.endswith(".tmp.feather") for p in (tmp_path / "b").iterdir())
+
+    def test_resume(self, tmp_path):
+        path = tmp_path / "hits.feather"
+        HitDf.from_hits(binding_hits(12, n_targets=8, per_compound=(1, 6))).write_file(path)
+        calc = JPrimeMatrixCalculator(min_compounds=2, min_nonzero=0, min_hits=1, block_size=5)
+        out = tmp_path / "out"
+        expected = calc.calc_all(path, out / "j.feather", keep_temp=True)
+        blocks = sorted(out.glob(".j.feather-binding-5-*.tmp.feather"))
+        assert len(blocks) == 6
+        # as if interrupted while writing the last block
+        for p in out.iterdir():
+            if not p.name.startswith(".j.feather-binding-5-"):
+                p.unlink()
+        Checksums().get_filesum_of_file(blocks[-1]).unlink()
+        mtimes = [p.stat().st_mtime_ns for p in blocks]
+        found = calc.calc_all(path, out / "j.feather", keep_temp=True)
+        assert _dropna(found).equals(_dropna(expected))
+        assert [p.stat().st_mtime_ns for p in blocks][:-1] == mtimes[:-1]
+        assert Checksums().get_filesum_of_file(blocks[-1]).exists()
+
+
+if __name__ == "__main__":
+    pytest.main()
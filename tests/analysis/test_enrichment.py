@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from mandos.analysis.enrichment import BoolAlg, EnrichmentCalculation, RealAlg
+from mandos.analysis.io_defns import ScoreDf
+from mandos.model.hit_dfs import HitDf
+
+from ..builders import binding_hits
+
+
+def _scores(inchikeys) -> ScoreDf:
+    rand = np.random.RandomState(0)
+    reals = pd.DataFrame(dict(inchikey=inchikeys, score_name="score_x"))
+    reals["score_value"] = rand.uniform(-1, 2, len(reals))
+    bools = pd.DataFrame(dict(inchikey=inchikeys, score_name="is_x"))
+    bools["score_value"] = (rand.uniform(size=len(bools)) > 0.5).astype(float)
+    return ScoreDf.convert(pd.concat([reals, bools], ignore_index=True))
+
+
+class TestEnrichment:
+    @pytest.mark.parametrize("real_alg", ["alpha", "weighted", "unweighted"])
+    @pytest.mark.parametrize("bool_alg", ["weighted", "unweighted"])
+    def test_same_as_definition(self, tmp_path, real_alg: str, bool_alg: str):
+        hits = binding_hits(40, n_targets=10)
+        inchikeys = list(dict.fromkeys(h.origin_inchikey for h in hits))
+        scores = _scores(inchikeys)
+        calc = EnrichmentCalculation(bool_alg, real_alg, n_samples=0, seed=0)
+        df = calc.calculate(HitDf.from_hits(hits), scores, tmp_path / "out.feather")
+        assert (tmp_path / "out.feather").exists()
+        assert df["sample"].unique().tolist() == [0]
+        for name, alg in [("score_x", RealAlg.of(real_alg)), ("is_x", BoolAlg.of(bool_alg))]:
+            vals = scores[scores["score_name"] == name].set_index("inchikey")["score_value"]
+            if alg.dtype() is bool:
+                vals, inverse = vals.astype(bool), ~vals.astype(bool)
+            else:
+                vals, inverse = vals, -vals
+            forward = alg.clazz().calc(hits, vals.to_dict())
+            backward = alg.clazz().calc(hits, inverse.to_dict())
+            found = df[df["score_name"] == name]
+            assert len(found) == len(forward) == 20
+            for row in found.itertuples():
+                kpo = next(
+                    k
+                    for k in forward
+                    if (k.key, k.pred, k.obj) == (row.key, row.predicate, row.object)
+                )
+                assert row.value == pytest.approx(forward[kpo])
+                assert row.inverse == pytest.approx(backward[kpo])
+                assert row.algorithm == alg.clazz.alg_name()
+
+    def test_bootstrap(self, tmp_path):
+        hits = HitDf.from_hits(binding_hits(40, n_targets=10))
+        scores = _scores(hits["origin_inchikey"].unique())
+        calc = EnrichmentCalculation("weighted", "weighted", n_samples=30, seed=0)
+        df = calc.calculate(hits, scores, tmp_path / "out.feather")
+        assert sorted(df["sample"].unique()) == list(range(31))
+        real = df[df["score_name"] == "score_x"]
+        assert np.allclose(real["inverse"], -real["value"], equal_nan=True)
+        observed = real[real["sample"] == 0]["value"].to_numpy()
+        samples = real[real["sample"] > 0]["value"].to_numpy().reshape(30, -1)
+        assert not np.allclose(samples, observed)
+        # a sample weights the same compounds differently, so it stays in the same range
+        assert np.nanmax(samples) <= real["value"].max()
+        again = EnrichmentCalculation("weighted", "weighted", n_samples=30, seed=0)
+        assert again.calculate(hits, scores, tmp_path / "again.feather").equals(df)
+
+    def test_default_scores(self, tmp_path):
+        hits = HitDf.from_hits(binding_hits(10, n_targets=4, per_compound=(1, 4)))
+        calc = EnrichmentCalculation("unweighted", "weighted", n_samples=0, seed=0)
+        df = calc.calculate(hits, None, tmp_path / "out.feather")
+        assert set(df["score_name"]) == {"count", "weight"}
+        weights = df[df["score_name"] == "weight"]
+        means = hits.groupby(["search_key", "predicate", "object_name"])["weight"].mean()
+        assert np.allclose(weights["value"], means.to_numpy())
+        assert (df[df["score_name"] == "count"]["value"] == np.inf).all()
+
+
+if __name__ == "__main__":
+    pytest.main()
@@ -0,0 +1,141 @@
+"""
+A small harness that times the production code paths on recorded data.
+
+Run with ``pytest tests/benchmarks --mandos-bench``.
+Add ``--mandos-bench-json results.json`` to save the results,
+and ``--mandos-bench-compare results.json`` to fail on anything that got slower.
+"""
+import gc
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Callable, List, Mapping, Optional, Tuple
+
+import orjson
+import pytest
+from loguru import logger
+
+from mandos.model.utils.setup import LOG_SETUP
+
+_results: List["BenchmarkResult"] = []
+
+
+@dataclass(frozen=True, repr=True, order=True)
+class BenchmarkResult:
+    """
+    Attributes:
+        name: What was run
+        size: The input size
+        n: The number of ``unit`` processed per run
+        unit: Compounds, hits, pairs, etc.
+        seconds: The fastest of the timed runs
+        peak_mib: The peak memory allocated by Python during one run
+    """
+
+    name: str
+    size: int
+    n: int
+    unit: str
+    seconds: float
+    peak_mib: float
+
+    @property
+    def rate(self) -> float:
+        return self.n / self.seconds
+
+    def __str__(self) -> str:
+        return (
+            f"{self.name:<40} {self.size:>7,}  {self.rate:>12,.1f} {self.unit}/s"
+            + f"  {self.seconds:>8.3f} s  {self.peak_mib:>8.1f} MiB"
+        )
+
+
+class Benchmarker:
+    """
+    Times a function and measures its peak memory.
+
+    ``setup`` runs before each run, untimed, and its return value is passed to ``fn``.
+    The timed runs and the memory run are separate, because tracing memory is slow.
+    """
+
+    def __init__(self, rounds: int, baseline: Mapping[Tuple[str, int], float], tolerance: float):
+        self._rounds = rounds
+        self._baseline = baseline
+        self._tolerance = tolerance
+
+    def __call__(
+        self,
+        name: str,
+        fn: Callable[[Any], Any],
+        *,
+        size: int,
+        n: int,
+        unit: str,
+        setup: Optional[Callable[[], Any]] = None,
+    ) -> Any:
+        setup = (lambda: None) if setup is None else setup
+        times = []
+        value = None
+        for _ in range(self._rounds):
+            arg = setup()
+            gc.collect()
+            t0 = time.perf_counter()
+            value = fn(arg)
+            times.append(time.perf_counter() - t0)
+        arg = setup()
+        gc.collect()
+        tracemalloc.start()
+        try:
+            fn(arg)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        result = BenchmarkResult(name, size, n, unit, min(times), peak / 1024 / 1024)
+        _results.append(result)
+        before = self._baseline.get((name, size))
+        if before is not None and result.rate < before * (1 - self._tolerance):
+            pytest.fail(f"{name} (size {size}) slowed from {before:,.1f} to {result.rate:,.1f}/s")
+        return value
+
+
+@pytest.fixture(scope="session")
+def bench(pytestconfig) -> Benchmarker:
+    path = pytestconfig.getoption("--mandos-bench-compare")
+    baseline = {}
+    if path is not None:
+        for r in orjson.loads(Path(path).read_bytes())["results"]:
+            baseline[(r["name"], r["size"])] = r["n"] / r["seconds"]
+    return Benchmarker(3, baseline, pytestconfig.getoption("--mandos-bench-tolerance"))
+
+
+@pytest.fixture(scope="session")
+def _log_levels():
+    # set up the custom levels like MandosCli.as_library
+    LOG_SETUP.config_levels(
+        levels=LOG_SETUP.defaults.levels_extended,
+        icons=LOG_SETUP.defaults.icons_extended,
+        colors=LOG_SETUP.defaults.colors_extended,
+    ).add_log_methods()
+
+
+@pytest.fixture(scope="module", autouse=True)
+def _quiet_logging(_log_levels):
+    # silence mandos's messages, which would dominate some timings;
+    # other handlers are left alone, and later tests still log
+    logger.disable("mandos")
+    yield
+    logger.enable("mandos")
+
+
+def pytest_terminal_summary(terminalreporter, exitstatus, config):
+    if len(_results) == 0:
+        return
+    terminalreporter.section("benchmarks")
+    for result in sorted(_results):
+        terminalreporter.write_line(str(result))
+    path = config.getoption("--mandos-bench-json")
+    if path is not None:
+        data = dict(results=[dict(**asdict(r), rate=r.rate) for r in sorted(_results)])
+        Path(path).write_bytes(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+        terminalreporter.write_line(f"Wrote {len(_results)} results to {path}")
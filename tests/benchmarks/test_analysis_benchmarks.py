@@ -0,0 +1,93 @@
+import numpy as np
+import pytest
+
+from mandos.analysis.concordance import TauConcordanceCalculator
+from mandos.analysis.distances import JPrimeMatrixCalculator
+from mandos.analysis.enrichment import EnrichmentCalculation
+from mandos.model.hit_dfs import HitDf
+
+from ..builders import binding_hits
+
+pytestmark = pytest.mark.mandos_bench
+
+
+class TestAnalysisBenchmarks:
+    @pytest.mark.parametrize("size", [1_000, 5_000, 20_000])
+    def test_hit_df(self, bench, size: int):
+        hits = binding_hits(size // 6, per_compound=(6, 6))
+        df = bench(
+            "HitDf.from_hits",
+            HitDf.from_hits,
+            size=size,
+            n=len(hits),
+            unit="hits",
+            setup=lambda: hits,
+        )
+        assert len(df) == len(hits)
+
+    @pytest.mark.parametrize("size", [1_000, 5_000, 20_000])
+    def test_to_hits(self, bench, size: int):
+        df = HitDf.from_hits(binding_hits(size // 6, per_compound=(6, 6)))
+        hits = bench(
+            "HitDf.to_hits",
+            lambda d: d.to_hits(),
+            size=size,
+            n=len(df),
+            unit="hits",
+            setup=lambda: df,
+        )
+        assert len(hits) == len(df)
+
+    @pytest.mark.parametrize("size", [20, 50, 100])
+    def test_j_prime(self, bench, tmp_path, size: int):
+        path = tmp_path / "hits.feather"
+        HitDf.from_hits(binding_hits(size)).write_file(path)
+        calc = JPrimeMatrixCalculator(min_compounds=2, min_nonzero=0, min_hits=1)
+        outputs = iter(range(1_000_000))
+
+        def setup():
+            # a new output each time, so it doesn't resume from the last run
+            return tmp_path / f"out-{next(outputs)}" / "j.feather"
+
+        n_pairs = size * (size + 1) // 2
+        df = bench(
+            "JPrimeMatrixCalculator.calc_all",
+            lambda to: calc.calc_all(path, to),
+            size=size,
+            n=n_pairs,
+            unit="pairs",
+            setup=setup,
+        )
+        assert len(df) > 0
+
+    @pytest.mark.parametrize("size", [1_000, 5_000, 20_000])
+    def test_enrichment(self, bench, tmp_path, size: int):
+        hits = HitDf.from_hits(binding_hits(size // 6, per_compound=(6, 6)))
+        calc = EnrichmentCalculation("weighted", "alpha", n_samples=100, seed=0)
+        df = bench(
+            "EnrichmentCalculation (100 samples)",
+            lambda _: calc.calculate(hits, None, tmp_path / "enrichment.feather"),
+            size=size,
+            n=len(hits),
+            unit="hits",
+        )
+        assert df["sample"].max() == 100
+
+    @pytest.mark.parametrize("size", [50, 100, 200])
+    def test_tau(self, bench, size: int):
+        rand = np.random.RandomState(0)
+        phi, psi = rand.uniform(size=size), rand.uniform(size=size)
+        calc = TauConcordanceCalculator(n_samples=0, seed=0)
+        n_pairs = size * (size - 1) // 2
+        taus = bench(
+            "TauConcordanceCalculator",
+            lambda _: list(calc.generate(phi, psi)),
+            size=size,
+            n=n_pairs,
+            unit="pairs",
+        )
+        assert -1 <= taus[0] <= 1
+
+
+if __name__ == "__main__":
+    pytest.main()
@@ -0,0 +1,111 @@
+import pytest
+
+from mandos.model.apis.caching_pubchem_api import CachingPubchemApi
+from mandos.model.apis.hmdb_api import CachingHmdbApi
+from mandos.model.apis.pubchem_support.pubchem_stores import PubchemStores
+from mandos.search.chembl.binding_search import BindingSearch
+from mandos.search.pubchem.acute_effects_search import AcuteEffectSearch
+
+from ..builders import (
+    RecordedTaxa,
+    inchikeys,
+    recorded_chembl,
+    recorded_hmdb,
+    recorded_pubchem,
+)
+
+pytestmark = pytest.mark.mandos_bench
+
+
+class TestSearchBenchmarks:
+    @pytest.mark.parametrize("backend", ["json", "sqlite"])
+    @pytest.mark.parametrize("size", [10, 100, 500])
+    def test_pubchem(self, bench, tmp_path, backend: str, size: int):
+        keys = inchikeys(size)
+        store = PubchemStores.new(tmp_path / "pubchem", backend)
+        store.write(recorded_pubchem(), *keys)
+
+        def setup():
+            # no memory cache, so every compound is read and parsed
+            api = CachingPubchemApi(None, tmp_path / "pubchem", memory_bytes=0, store=store)
+            return AcuteEffectSearch("acute-effects", api, top_level=True)
+
+        def run(search: AcuteEffectSearch):
+            return [hit for key in keys for hit in search.find(key)]
+
+        hits = bench(
+            f"AcuteEffectSearch.find[{backend}]",
+            run,
+            size=size,
+            n=size,
+            unit="compounds",
+            setup=setup,
+        )
+        assert len(hits) == 3 * size
+
+    @pytest.mark.parametrize("traversal", ["@null", "@split_flex"])
+    @pytest.mark.parametrize("size", [10, 50, 200])
+    def test_chembl(self, bench, traversal: str, size: int):
+        keys = inchikeys(size)
+
+        def setup():
+            types = {"single_protein", "protein_complex", "protein_complex_group"}
+            api = recorded_chembl(keys)
+            return BindingSearch(
+                "binding", api, RecordedTaxa(), traversal, types, 5, {"=", "<", "<="}, 5.0, 7.0
+            )
+
+        def run(search: BindingSearch):
+            return [hit for key in keys for hit in search.find(key)]
+
+        def run_prefetched(search: BindingSearch):
+            hits = []
+            for i in range(0, len(keys), search.batch_size):
+                batch = keys[i : i + search.batch_size]
+                search.prefetch(batch)
+                hits.extend(hit for key in batch for hit in search.find(key))
+            return hits
+
+        hits = bench(
+            f"BindingSearch.find[{traversal}]",
+            run,
+            size=size,
+            n=size,
+            unit="compounds",
+            setup=setup,
+        )
+        assert len(hits) >= 3 * size
+        prefetched = bench(
+            f"BindingSearch.find[{traversal},prefetch]",
+            run_prefetched,
+            size=size,
+            n=size,
+            unit="compounds",
+            setup=setup,
+        )
+        assert [h.record_id for h in prefetched] == [h.record_id for h in hits]
+
+    @pytest.mark.parametrize("size", [10, 100, 500])
+    def test_hmdb(self, bench, tmp_path, size: int):
+        # TissueConcentrationSearch calls fetch_data, which HmdbApi does not have,
+        # so this times the cache reads and parsing that it would need
+        keys = inchikeys(size)
+        api = CachingHmdbApi(None, tmp_path / "hmdb")
+        for key in keys:
+            recorded_hmdb().write_json(api.path(key), mkdirs=True)
+
+        def run(_):
+            found = []
+            for key in keys:
+                data = api.fetch(key)
+                found.extend(data.normal_concentrations)
+                assert len(data.predicted_properties) == 7
+                assert len(data.rules) == 4
+            return found
+
+        found = bench("CachingHmdbApi.fetch", run, size=size, n=size, unit="compounds")
+        assert len(found) == 6 * size
+
+
+if __name__ == "__main__":
+    pytest.main()
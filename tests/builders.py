@@ -0,0 +1,150 @@
+"""
+Recorded data and synthetic inputs, shared by the tests and the benchmarks.
+"""
+import random
+from datetime import datetime
+from functools import cached_property
+from pathlib import Path
+from typing import Any, Mapping, Sequence, Tuple
+
+import orjson
+from pocketutils.core.dot_dict import NestedDotDict
+
+from mandos.model.apis.chembl_api import ChemblApi, ChemblEntrypoint
+from mandos.model.apis.pubchem_support.pubchem_data import PubchemData
+from mandos.model.concrete_hits import BindingHit
+from mandos.model.taxonomy import Taxon, Taxonomy
+from mandos.model.taxonomy_caches import LazyTaxonomy
+
+RESOURCES = Path(__file__).parent / "resources"
+
+
+def inchikeys(n: int) -> Sequence[str]:
+    """
+    Makes ``n`` distinct, fake InChI Keys.
+    """
+    return [f"{i:014d}-UHFFFAOYSA-N" for i in range(n)]
+
+
+def recorded_pubchem(**tables: Sequence[Mapping[str, Any]]) -> PubchemData:
+    """
+    Reads the recorded PubChem data for cocaine HCl.
+
+    Args:
+        tables: External tables (e.g. ``bioactivity``) to replace in the recorded data
+    """
+    path = RESOURCES / "pchem_store" / "data" / "PIQVDUKEQYOJNR-VZXSFKIWSA-N.json"
+    data = NestedDotDict.read_json(path)
+    external = {**data["external_tables"], **tables}
+    # this file predates linked_records
+    return PubchemData(
+        NestedDotDict({**data, "external_tables": external, "linked_records": {"CID": [656832]}})
+    )
+
+
+def recorded_hmdb() -> NestedDotDict:
+    """
+    Reads a trimmed HMDB metabolite record (for caffeine), as ``CachingHmdbApi`` stores it.
+    """
+    return NestedDotDict(orjson.loads((RESOURCES / "benchmarks" / "hmdb.json").read_bytes()))
+
+
+def recorded_chembl(keys: Sequence[str]) -> ChemblApi:
+    """
+    Replays recorded ChEMBL responses for alprazolam; every key in ``keys`` finds that compound.
+    """
+    rec: Mapping[str, Any] = orjson.loads((RESOURCES / "benchmarks" / "chembl.json").read_bytes())
+    molecule = next(iter(rec["molecule"].values()))
+
+    def activities(kwargs: Mapping[str, Any]) -> Sequence[dict]:
+        parents = kwargs.get(
+            "parent_molecule_chembl_id__in", [kwargs.get("parent_molecule_chembl_id")]
+        )
+        return [
+            a
+            for a in rec["activity"]
+            if a["parent_molecule_chembl_id"] in parents and a["assay_type"] == kwargs["assay_type"]
+        ]
+
+    def assays(kwargs: Mapping[str, Any]) -> Sequence[dict]:
+        return [rec["assay"][a] for a in kwargs["assay_chembl_id__in"] if a in rec["assay"]]
+
+    return ChemblApi.mock(
+        {
+            "molecule": ChemblEntrypoint.mock({k: molecule for k in keys}),
+            "activity": ChemblEntrypoint.mock({}, activities),
+            "assay": ChemblEntrypoint.mock(rec["assay"], assays),
+            "target": ChemblEntrypoint.mock(
+                rec["target"], lambda kwargs: [rec["target"][kwargs["target_chembl_id"]]]
+            ),
+            "target_relation": ChemblEntrypoint.mock(
+                {}, lambda kwargs: rec["target_relation"][kwargs["target_chembl_id"]]
+            ),
+        }
+    )
+
+
+class RecordedTaxa(LazyTaxonomy):
+    """
+    Just the organisms in the recorded ChEMBL data.
+    """
+
+    @cached_property
+    def get(self) -> Taxonomy:
+        taxa = [(9606, "Homo sapiens"), (10090, "Mus musculus"), (10116, "Rattus norvegicus")]
+        return Taxonomy.from_list([Taxon(i, name, None, None, None, set()) for i, name in taxa])
+
+
+def binding_hits(
+    n_compounds: int, *, n_targets: int = 50, per_compound: Tuple[int, int] = (2, 10), seed: int = 0
+) -> Sequence[BindingHit]:
+    """
+    Makes random (but reproducible) binding hits, with several sources and taxa.
+    """
+    rng = random.Random(seed)
+    now = datetime(2021, 11, 1)
+    hits = []
+    for c, inchikey in enumerate(inchikeys(n_compounds)):
+        for t in rng.sample(range(n_targets), rng.randint(*per_compound)):
+            source = rng.choice(["chembl:binding:1", "chembl:binding:7"])
+            taxon_id, taxon_name = rng.choice(
+                [(9606, "Homo sapiens"), (10116, "Rattus norvegicus")]
+            )
+            pchembl = round(rng.uniform(5, 10), 2)
+            hits.append(
+                BindingHit(
+                    record_id=str(len(hits)),
+                    origin_inchikey=inchikey,
+                    matched_inchikey=inchikey,
+                    compound_id=f"CHEMBL{c}",
+                    compound_name=f"compound {c}",
+                    predicate=rng.choice(["binds", "="]),
+                    object_id=f"CHEMBL{100000 + t}",
+                    object_name=f"target {t}",
+                    weight=pchembl / 10,
+                    search_key="binding",
+                    search_class="BindingSearch",
+                    data_source=source,
+                    run_date=now,
+                    cache_date=now,
+                    exact_target_id=f"CHEMBL{100000 + t}",
+                    exact_target_name=f"target {t}",
+                    taxon_id=taxon_id,
+                    taxon_name=taxon_name,
+                    src_id=source.split(":")[-1],
+                    pchembl=pchembl,
+                    std_type="Ki",
+                    std_rel="=",
+                )
+            )
+    return hits
+
+
+__all__ = [
+    "binding_hits",
+    "inchikeys",
+    "recorded_chembl",
+    "recorded_pubchem",
+    "RecordedTaxa",
+    "RESOURCES",
+]
@@ -4,6 +4,50 @@ import pytest
 from _pytest.logging import caplog as _caplog
 from loguru import logger
 
+from mandos.model.utils.setup import LOG_SETUP
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("benchmarks")
+    group.addoption(
+        "--mandos-bench", action="store_true", help="run the benchmarks in tests/benchmarks"
+    )
+    group.addoption("--mandos-bench-json", default=None, help="write the benchmark results here")
+    group.addoption(
+        "--mandos-bench-compare",
+        default=None,
+        help="fail benchmarks that are slower than in this file (from --mandos-bench-json)",
+    )
+    group.addoption(
+        "--mandos-bench-tolerance",
+        default=0.25,
+        type=float,
+        help="the fraction of throughput a benchmark can lose before it fails",
+    )
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "mandos_bench: slow; only runs with --mandos-bench")
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption("--mandos-bench"):
+        return
+    skip = pytest.mark.skip(reason="benchmarks only run with --mandos-bench")
+    for item in items:
+        if "mandos_bench" in item.keywords:
+            item.add_marker(skip)
+
+
+@pytest.fixture(scope="module", autouse=True)
+def _log_levels():
+    # mandos logs with the custom levels, which MandosCli.as_library would set up
+    LOG_SETUP.config_levels(
+        levels=LOG_SETUP.defaults.levels_extended,
+        icons=LOG_SETUP.defaults.icons_extended,
+        colors=LOG_SETUP.defaults.colors_extended,
+    ).add_log_methods()
+
 
 # see: https://loguru.readthedocs.io/en/stable/resources/migration.html#making-things-work-with-pytest-and-caplog
 @pytest.fixture
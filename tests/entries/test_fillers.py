@@ -0,0 +1,76 @@
+from typing import List, Union
+from urllib.error import URLError
+
+import pandas as pd
+import pytest
+
+from mandos.entry.api_singletons import Apis
+from mandos.entry.tools.fillers import CompoundIdFiller, IdMatchDf
+from mandos.model.apis.pubchem_api import PubchemApi
+from mandos.model.apis.pubchem_resolver import PubchemResolution, PubchemResolver
+from mandos.model.utils.setup import logger
+
+_CACHED = "PIQVDUKEQYOJNR-VZXSFKIWSA-N"
+_UNCACHED = "RYYVLZVUVIJVGH-UHFFFAOYSA-N"
+
+
+class _Api(PubchemApi):
+    def __init__(self):
+        self.resolutions: List[PubchemResolution] = []
+
+    def is_cached(self, inchikey_or_cid: Union[str, int]) -> bool:
+        return inchikey_or_cid in {_CACHED, 656832}
+
+    def use_resolution(self, resolution: PubchemResolution) -> None:
+        self.resolutions.append(resolution)
+
+
+@pytest.fixture
+def api(monkeypatch):
+    api = _Api()
+    monkeypatch.setattr(Apis, "Pubchem", api)
+    return api
+
+
+def _df() -> IdMatchDf:
+    df = pd.DataFrame(
+        dict(origin_inchikey=[_CACHED, _UNCACHED], origin_pubchem_id=["656832", None])
+    )
+    return IdMatchDf.of(df)
+
+
+class TestCompoundIdFiller:
+    def test_resolve_skips_cached(self, api, monkeypatch):
+        queried = []
+
+        def resolve(self, *, inchikeys=(), cids=()):
+            queried.append((inchikeys, cids))
+            return PubchemResolution.empty()
+
+        monkeypatch.setattr(PubchemResolver, "resolve", resolve)
+        CompoundIdFiller()._resolve_pubchem(_df())
+        assert queried == [([_UNCACHED], [])]
+        assert len(api.resolutions) == 1
+
+    def test_resolve_nothing_uncached(self, api, monkeypatch):
+        monkeypatch.setattr(PubchemResolver, "resolve", pytest.fail)
+        CompoundIdFiller()._resolve_pubchem(_df().iloc[:1])
+        assert api.resolutions == []
+
+    def test_resolve_fails(self, api, monkeypatch):
+        def resolve(self, *, inchikeys=(), cids=()):
+            raise URLError("no network")
+
+        monkeypatch.setattr(PubchemResolver, "resolve", resolve)
+        messages = []
+        handler_id = logger.add(messages.append, level="WARNING", format="{message}")
+        try:
+            CompoundIdFiller()._resolve_pubchem(_df())
+        finally:
+            logger.remove(handler_id)
+        assert api.resolutions == []
+        assert len(messages) == 1 and "one at a time" in messages[0]
+
+
+if __name__ == "__main__":
+    pytest.main()
@@ -0,0 +1,86 @@
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import pandas as pd
+import pytest
+from pocketutils.core.exceptions import XValueError
+
+from mandos.entry import abstract_entries
+from mandos.entry.api_singletons import Apis
+from mandos.entry.tools import multi_searches
+from mandos.entry.tools.multi_searches import MultiSearch, SearchConfigDf
+from mandos.model.hit_dfs import HitDf
+
+from ..builders import inchikeys
+from .test_searchers import _SlowApi
+
+
+class _LogSetup:
+    """
+    Records the log files that would be set up.
+    """
+
+    def __init__(self):
+        self.calls: List[Tuple[Optional[Path], Optional[str]]] = []
+
+    def __call__(self, path: Optional[Path], main: Optional[str]) -> None:
+        self.calls.append((path, main))
+
+
+@pytest.fixture
+def log_setup(monkeypatch) -> _LogSetup:
+    log_setup = _LogSetup()
+    monkeypatch.setattr(abstract_entries, "LOG_SETUP", log_setup)
+    monkeypatch.setattr(multi_searches, "LOG_SETUP", log_setup)
+    return log_setup
+
+
+@pytest.fixture
+def api(monkeypatch) -> _SlowApi:
+    api = _SlowApi()
+    monkeypatch.setattr(Apis, "Pubchem", api)
+    return api
+
+
+def _multi(tmp_path: Path, *searches, **kwargs) -> MultiSearch:
+    path = tmp_path / "compounds.csv"
+    pd.DataFrame(dict(inchikey=inchikeys(7))).to_csv(path, index=False)
+    config = SearchConfigDf.of(pd.DataFrame([dict(s) for s in searches]))
+    kwargs = {**dict(restart=False, proceed=False, log_path=None), **kwargs}
+    return MultiSearch(config, path, tmp_path / "out", ".feather", **kwargs)
+
+
+_ACUTE = dict(key="acute", source="tox.chemidplus:acute")
+_ACUTE_2 = dict(key="acute-2", source="tox.chemidplus:acute", level=2)
+_RANDOM = dict(key="random", source="meta:random")
+
+
+class TestMultiSearch:
+    def test_fused(self, tmp_path, api, log_setup):
+        multi = _multi(tmp_path, _ACUTE, _ACUTE_2, _RANDOM, workers=3, fused=True)
+        multi.run()
+        # each compound was fetched once for both PubChem searches
+        assert sorted(api.fetched) == sorted(inchikeys(7))
+        out = tmp_path / "out"
+        for key in ["acute", "acute-2", "random"]:
+            assert (out / f"{key}.feather").exists()
+        df = HitDf.read_file(multi.final_path)
+        assert set(df["search_key"].unique()) == {"acute", "acute-2", "random"}
+        assert len(df[df["search_key"] == "acute"]) == 3 * 7
+        # the fused searches log to a single file, set up after everything else
+        assert log_setup.calls[-1] == (out / ("fused" + multi_searches.SETTINGS.log_suffix), None)
+
+    def test_fused_rejects_own_workers(self, tmp_path, api, log_setup):
+        multi = _multi(tmp_path, _ACUTE, dict(**_ACUTE_2, workers=2), workers=3, fused=True)
+        with pytest.raises(XValueError):
+            multi.test()
+
+    def test_global_workers_only_where_offered(self, tmp_path, api, log_setup):
+        multi = _multi(tmp_path, _ACUTE, _RANDOM, workers=3)
+        commands = {cmd.key: cmd for cmd in multi._build_commands()}
+        assert commands["acute"].params["workers"] == 3
+        assert "workers" not in commands["random"].params
+
+
+if __name__ == "__main__":
+    pytest.main()
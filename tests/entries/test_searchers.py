@@ -0,0 +1,96 @@
+import dataclasses
+import random
+import time
+from pathlib import Path
+from typing import List, Union
+
+import pandas as pd
+import pytest
+from pocketutils.core.exceptions import XValueError
+
+from mandos.entry.tools import searchers
+from mandos.entry.tools.searchers import InputCompoundsDf, Searcher
+from mandos.model.apis.pubchem_api import PubchemApi
+from mandos.model.apis.pubchem_support.pubchem_data import PubchemData
+from mandos.model.hit_dfs import HitDf
+from mandos.search.meta.random_search import RandomSearch
+from mandos.search.pubchem.acute_effects_search import AcuteEffectSearch
+
+from ..builders import inchikeys, recorded_pubchem
+
+
+class _SlowApi(PubchemApi):
+    """
+    Takes a random amount of time for each compound, so that threads finish out of order.
+    """
+
+    def __init__(self):
+        self.data = recorded_pubchem()
+        self.fetched: List[str] = []
+
+    def fetch_data(self, inchikey: Union[str, int]) -> PubchemData:
+        time.sleep(random.uniform(0, 0.01))  # nosec
+        self.fetched.append(inchikey)
+        return self.data
+
+
+def _input(n: int) -> InputCompoundsDf:
+    return InputCompoundsDf.of(pd.DataFrame(dict(inchikey=inchikeys(n))))
+
+
+def _search(input_df: InputCompoundsDf, to: Path, workers: int, **kwargs) -> Searcher:
+    search = AcuteEffectSearch("acute-effects", _SlowApi(), top_level=True)
+    return Searcher(
+        search, input_df, to, **{**dict(proceed=False, restart=False), **kwargs}, workers=workers
+    )
+
+
+@pytest.fixture
+def save_every_5(monkeypatch):
+    monkeypatch.setattr(
+        searchers, "SETTINGS", dataclasses.replace(searchers.SETTINGS, save_every=5)
+    )
+
+
+class TestSearcher:
+    def test_workers_in_order(self, tmp_path, save_every_5):
+        input_df = _input(23)
+        info = _search(input_df, tmp_path / "one.feather", 1).search()
+        assert (info.n_processed, info.n_errored) == (23, 0)
+        _search(input_df, tmp_path / "four.feather", 4).search()
+        one = HitDf.read_file(tmp_path / "one.feather")
+        four = HitDf.read_file(tmp_path / "four.feather")
+        assert len(one) == 3 * 23
+        assert four["origin_inchikey"].tolist() == one["origin_inchikey"].tolist()
+        assert four["origin_inchikey"].unique().tolist() == input_df["inchikey"].tolist()
+        # the parts were concatenated and removed
+        assert [p.name for p in tmp_path.iterdir() if ".part-" in p.name] == []
+
+    def test_checkpoints(self, tmp_path, save_every_5):
+        input_df = _input(12)
+        to = tmp_path / "hits.feather"
+        searcher = _search(input_df, to, 4)
+        run = searcher._start()
+        found = {c: searcher._find(c) for c in input_df["inchikey"]}
+        for c in input_df["inchikey"][:7]:
+            run.add(c, found[c])
+        # 5 compounds were saved to a part and marked done; the other 2 were not
+        parts = searcher._part_paths()
+        assert len(parts) == 1
+        assert HitDf.read_file(parts[0])["origin_inchikey"].nunique() == 5
+        resumed = _search(input_df, to, 4, proceed=True)
+        info = resumed.search()
+        assert (info.n_kept, info.n_processed) == (5, 7)
+        assert resumed.what.api.fetched.count(input_df["inchikey"][0]) == 0
+        df = HitDf.read_file(to)
+        assert df["origin_inchikey"].unique().tolist() == input_df["inchikey"].tolist()
+
+    def test_workers_need_pubchem_or_chembl(self, tmp_path):
+        with pytest.raises(XValueError):
+            Searcher(
+                RandomSearch("random", 0, 10), _input(2), tmp_path / "x.feather", False, False, 2
+            )
+
+
+if __name__ == "__main__":
+    pytest.main()
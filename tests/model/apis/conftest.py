@@ -0,0 +1,71 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Mapping
+from urllib.parse import parse_qs
+
+import orjson
+import pytest
+
+# a few real compounds (cocaine, its HCl salt, and caffeine)
+PUBCHEM_COMPOUNDS = [
+    dict(CID=446220, InChIKey="ZPUCINDJVBIVPJ-LJISPDSOSA-N", InChI="InChI=1S/C17H21NO4/c1-18"),
+    dict(CID=656832, InChIKey="PIQVDUKEQYOJNR-VZXSFKIWSA-N", InChI="InChI=1S/C17H21NO4.ClH"),
+    dict(CID=2519, InChIKey="RYYVLZVUVIJVGH-UHFFFAOYSA-N", InChI="InChI=1S/C8H10N4O2/c1-10"),
+]
+
+
+class PubchemStandIn:
+    """
+    A local HTTP server that answers PUG REST batch property requests like PubChem does.
+    """
+
+    def __init__(self, compounds: Mapping[str, dict]):
+        self.compounds = compounds
+        self.requests = []
+        outer = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers["Content-Length"])).decode("utf8")
+                nodes = self.path.strip("/").split("/")
+                # rest/pug/compound/<namespace>/property/<properties>/JSON
+                namespace, props = nodes[3], nodes[5].split(",")
+                ids = parse_qs(body)[namespace][0].split(",")
+                outer.requests.append((namespace, ids))
+                if any(i == "bad" for i in ids):
+                    return self._send(400, {"Fault": {"Code": "PUGREST.BadRequest"}})
+                key = "CID" if namespace == "cid" else "InChIKey"
+                rows = [
+                    {"CID": c["CID"], **{p: c[p] for p in props if p in c}}
+                    for i in ids
+                    for c in outer.compounds
+                    if str(c[key]) == i
+                ]
+                if len(rows) == 0:
+                    return self._send(404, {"Fault": {"Code": "PUGREST.NotFound"}})
+                self._send(200, {"PropertyTable": {"Properties": rows}})
+
+            def _send(self, code: int, data: dict) -> None:
+                self.send_response(code)
+                self.send_header("Content-Type", "application/json")
+                self.end_headers()
+                self.wfile.write(orjson.dumps(data))
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+
+    @property
+    def pug(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_address[1]}/rest/pug"
+
+
+@pytest.fixture
+def pubchem_stand_in():
+    stand_in = PubchemStandIn(PUBCHEM_COMPOUNDS)
+    thread = threading.Thread(target=stand_in.server.serve_forever, daemon=True)
+    thread.start()
+    yield stand_in
+    stand_in.server.shutdown()
+    stand_in.server.server_close()
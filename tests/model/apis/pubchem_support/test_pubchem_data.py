@@ -0,0 +1,39 @@
+from datetime import date
+
+import pytest
+
+from mandos.model.apis.pubchem_support._nav import JsonNavigator
+from tests.builders import recorded_pubchem
+
+
+class TestPubchemData:
+    def test_views_share_navigation(self):
+        data = recorded_pubchem()
+        assert data.toxicity is data.toxicity
+        assert data.toxicity._toc is data.literature._toc
+        assert data.drug_and_medication_information._refs is data._refs
+        tables = data.biomolecular_interactions_and_pathways._tables
+        assert tables / "dgidb" is data.toxicity._tables / "dgidb"
+
+    def test_values(self):
+        data = recorded_pubchem()
+        assert data.cid == 446220
+        assert data.title_and_summary.safety == {"Irritant", "Acute Toxic"}
+        assert len(data.toxicity.acute_effects) == 3
+
+    def test_dates(self):
+        data = recorded_pubchem()
+        assert data.names_and_identifiers.create_date == date(2005, 6, 8)
+        assert data.names_and_identifiers.modify_date == date(2020, 12, 12)
+
+    def test_no_copies(self):
+        inner = dict(x=1)
+        nav = JsonNavigator.create(dict(a=dict(b=[inner])))
+        got = (nav / "a" / "b").contents
+        assert len(got) == 1
+        assert got[0]._x is inner
+        assert (nav / "a" // ["b"]).contents == [[[inner]]]
+
+
+if __name__ == "__main__":
+    pytest.main()
@@ -1,7 +1,31 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
 import pytest
 from pocketutils.core.dot_dict import NestedDotDict
 
 from mandos.model.apis.chembl_api import ChemblApi, ChemblEntrypoint, ChemblFilterQuery
+from mandos.model.utils.query_executors import ConcurrentQueryExecutor
+
+
+class _Target:
+    """
+    Looks like ``new_client.target``, and records the thread that made it.
+    """
+
+    def __init__(self):
+        self.thread = threading.get_ident()
+
+    def get(self, arg: str):
+        return {"target_chembl_id": arg, "made_in": self.thread, "used_in": threading.get_ident()}
+
+    def filter(self, **kwargs):
+        return [dict(target_chembl_id=c) for c in kwargs["target_chembl_id__in"]]
+
+
+class _Client:
+    def __init__(self):
+        self.target = _Target()
 
 
 class TestChemblApi:
@@ -19,6 +43,19 @@ class TestChemblApi:
         z = list(api.target.filter().only([]))
         assert z == [dotdict]
 
+    def test_per_thread(self):
+        executor = ConcurrentQueryExecutor(0.01, 0.01)
+        api = ChemblApi.wrap_per_thread(_Client, executor)
+        with ThreadPoolExecutor(3) as pool:
+            found = list(pool.map(lambda c: api.target.get(c), [f"CHEMBL{i}" for i in range(9)]))
+        assert [f["target_chembl_id"] for f in found] == [f"CHEMBL{i}" for i in range(9)]
+        # each thread used its own client
+        assert all(f["made_in"] == f["used_in"] for f in found)
+        assert executor.last_time_taken is None  # this thread never waited
+        got = list(api.target.filter(target_chembl_id__in=["CHEMBL1", "CHEMBL2"]))
+        assert [g["target_chembl_id"] for g in got] == ["CHEMBL1", "CHEMBL2"]
+        assert executor.last_time_taken is not None
+
 
 if __name__ == "__main__":
     pytest.main()
@@ -0,0 +1,144 @@
+import sqlite3
+from pathlib import Path
+
+import pytest
+from pocketutils.core.exceptions import UnsupportedOpError
+
+from mandos.model.apis.chembl_db_api import ChemblDbApi
+from mandos.model.apis.chembl_support.chembl_targets import TargetFactory, TargetType
+
+# a small subset of the ChEMBL schema, with only the columns that are queried
+_schema = """
+CREATE TABLE molecule_dictionary (molregno INTEGER PRIMARY KEY, chembl_id TEXT, pref_name TEXT,
+    max_phase INTEGER, molecule_type TEXT, structure_type TEXT);
+CREATE TABLE molecule_hierarchy (molregno INTEGER PRIMARY KEY, parent_molregno INTEGER);
+CREATE TABLE compound_structures (molregno INTEGER PRIMARY KEY, canonical_smiles TEXT,
+    standard_inchi TEXT, standard_inchi_key TEXT);
+CREATE TABLE molecule_atc_classification (mol_atc_id INTEGER PRIMARY KEY, level5 TEXT,
+    molregno INTEGER);
+CREATE TABLE target_dictionary (tid INTEGER PRIMARY KEY, chembl_id TEXT, pref_name TEXT,
+    organism TEXT, tax_id INTEGER, target_type TEXT, species_group_flag INTEGER);
+CREATE TABLE target_relations (targrel_id INTEGER PRIMARY KEY, tid INTEGER, relationship TEXT,
+    related_tid INTEGER);
+CREATE TABLE component_sequences (component_id INTEGER PRIMARY KEY, component_type TEXT,
+    accession TEXT, description TEXT);
+CREATE TABLE target_components (targcomp_id INTEGER PRIMARY KEY, tid INTEGER,
+    component_id INTEGER, relationship TEXT);
+CREATE TABLE go_classification (go_id TEXT PRIMARY KEY, pref_name TEXT, aspect TEXT);
+CREATE TABLE component_go (comp_go_id INTEGER PRIMARY KEY, component_id INTEGER, go_id TEXT);
+CREATE TABLE docs (doc_id INTEGER PRIMARY KEY, chembl_id TEXT);
+CREATE TABLE assays (assay_id INTEGER PRIMARY KEY, chembl_id TEXT, description TEXT,
+    assay_type TEXT, assay_category TEXT, assay_cell_type TEXT, assay_organism TEXT,
+    assay_tax_id INTEGER, assay_tissue TEXT, confidence_score INTEGER, relationship_type TEXT,
+    src_id INTEGER, tid INTEGER, doc_id INTEGER);
+CREATE TABLE activities (activity_id INTEGER PRIMARY KEY, assay_id INTEGER, doc_id INTEGER,
+    record_id INTEGER, molregno INTEGER, standard_relation TEXT, standard_value REAL,
+    standard_units TEXT, standard_flag INTEGER, standard_type TEXT, activity_comment TEXT,
+    data_validity_comment TEXT, potential_duplicate INTEGER, pchembl_value REAL, relation TEXT,
+    src_id INTEGER, type TEXT, units TEXT, value REAL);
+CREATE TABLE drug_mechanism (mec_id INTEGER PRIMARY KEY, record_id INTEGER, molregno INTEGER,
+    mechanism_of_action TEXT, tid INTEGER, site_id INTEGER, action_type TEXT,
+    direct_interaction INTEGER, molecular_mechanism INTEGER, disease_efficacy INTEGER,
+    mechanism_comment TEXT, selectivity_comment TEXT, binding_site_comment TEXT);
+CREATE TABLE drug_indication (drug_ind_id INTEGER PRIMARY KEY, record_id INTEGER,
+    molregno INTEGER, max_phase_for_ind INTEGER, mesh_id TEXT, mesh_heading TEXT, efo_id TEXT,
+    efo_term TEXT);
+CREATE TABLE atc_classification (who_name TEXT, level1 TEXT, level1_description TEXT,
+    level2 TEXT, level2_description TEXT, level3 TEXT, level3_description TEXT, level4 TEXT,
+    level4_description TEXT, level5 TEXT PRIMARY KEY);
+INSERT INTO molecule_dictionary VALUES
+    (1, 'CHEMBL10', 'ALPRAZOLAM', 4, 'Small molecule', 'MOL'),
+    (2, 'CHEMBL11', 'ALPRAZOLAM SALT', 4, 'Small molecule', 'MOL');
+INSERT INTO molecule_hierarchy VALUES (1, 1), (2, 1);
+INSERT INTO compound_structures VALUES
+    (1, 'Cc1nnc2n1', 'InChI=1S/x', 'VREFGVBLTWBCJP-UHFFFAOYSA-N'),
+    (2, 'Cc1nnc2n1.Cl', 'InChI=1S/y', 'AAAAAAAAAAAAAA-UHFFFAOYSA-N');
+INSERT INTO molecule_atc_classification VALUES (1, 'N05BA12', 1);
+INSERT INTO target_dictionary VALUES
+    (1, 'CHEMBL1', 'alpha', 'Homo sapiens', 9606, 'SINGLE PROTEIN', 0),
+    (2, 'CHEMBL2', 'beta', 'Homo sapiens', 9606, 'PROTEIN COMPLEX', 0);
+INSERT INTO target_relations VALUES (1, 1, 'SUBSET OF', 2), (2, 2, 'SUPERSET OF', 1);
+INSERT INTO component_sequences VALUES (1, 'PROTEIN', 'P12345', 'Alpha subunit');
+INSERT INTO target_components VALUES (1, 1, 1, 'SINGLE PROTEIN');
+INSERT INTO go_classification VALUES ('GO:0004890', 'GABA-A receptor activity', 'F');
+INSERT INTO component_go VALUES (1, 1, 'GO:0004890');
+INSERT INTO docs VALUES (1, 'CHEMBL1000');
+INSERT INTO assays VALUES (1, 'CHEMBL100', 'binding', 'B', NULL, NULL, NULL, NULL, NULL, 9,
+    'D', 1, 1, 1);
+INSERT INTO activities VALUES
+    (1, 1, 1, 5, 1, '=', 10.0, 'nM', 1, 'Ki', NULL, NULL, 0, 8.0, '=', 1, 'Ki', 'nM', 10.0),
+    (2, 1, 1, 6, 2, '=', 20.0, 'nM', 1, 'Ki', NULL, NULL, 0, 7.7, '=', 1, 'Ki', 'nM', 20.0);
+INSERT INTO drug_mechanism VALUES (1, 7, 1, 'GABA-A receptor; agonist', 2, NULL,
+    'POSITIVE ALLOSTERIC MODULATOR', 1, 1, 1, NULL, NULL, NULL);
+"""
+
+
+@pytest.fixture()
+def api(tmp_path: Path) -> ChemblDbApi:
+    path = tmp_path / "chembl.sqlite"
+    conn = sqlite3.connect(str(path))
+    conn.executescript(_schema)
+    conn.close()
+    return ChemblDbApi(path)
+
+
+class TestChemblDbApi:
+    def test_molecule(self, api: ChemblDbApi):
+        mol = api.molecule.get("VREFGVBLTWBCJP-UHFFFAOYSA-N")
+        assert mol["molecule_chembl_id"] == "CHEMBL10"
+        assert mol["molecule_structures.standard_inchi"] == "InChI=1S/x"
+        assert mol["molecule_hierarchy.parent_chembl_id"] == "CHEMBL10"
+        assert mol["atc_classifications"] == ["N05BA12"]
+        assert api.molecule.get("CHEMBL11")["pref_name"] == "ALPRAZOLAM SALT"
+        assert api.molecule.get("CHEMBL99") is None
+        found = api.molecule.filter(molecule_structures__canonical_smiles__flexmatch="Cc1nnc2n1")
+        assert [m["molecule_chembl_id"] for m in found] == ["CHEMBL10"]
+
+    def test_activity(self, api: ChemblDbApi):
+        found = api.activity.filter(parent_molecule_chembl_id="CHEMBL10", assay_type__in=["B"])
+        assert [a["record_id"] for a in found] == [5, 6]
+        assert found[1]["molecule_chembl_id"] == "CHEMBL11"
+        assert found[1]["parent_molecule_chembl_id"] == "CHEMBL10"
+        assert found[0]["target_chembl_id"] == "CHEMBL1"
+        found = api.activity.filter(parent_molecule_chembl_id__in=["CHEMBL10"]).only(["record_id"])
+        assert [dict(a.items()) for a in found] == [dict(record_id=5), dict(record_id=6)]
+        assert len(api.activity.filter(parent_molecule_chembl_id="CHEMBL11")) == 0
+
+    def test_many_in(self, api: ChemblDbApi):
+        # more values than SQLite allows variables in one statement by default
+        ids = [f"CHEMBL{i}" for i in range(100, 40000)] + ["CHEMBL10"]
+        found = api.activity.filter(parent_molecule_chembl_id__in=ids)
+        assert [a["record_id"] for a in found] == [5, 6]
+        assert len(api.target.filter(target_chembl_id__in=ids)) == 0
+
+    def test_mechanism(self, api: ChemblDbApi):
+        found = api.mechanism.filter(parent_molecule_chembl_id="CHEMBL10")
+        assert len(found) == 1
+        assert found[0]["target_chembl_id"] == "CHEMBL2"
+        assert found[0]["direct_interaction"] == 1
+
+    def test_targets(self, api: ChemblDbApi):
+        target = TargetFactory(api).find("CHEMBL1")
+        assert target.name == "alpha"
+        assert target.type == TargetType.single_protein
+        rels = api.target_relation.filter(target_chembl_id="CHEMBL1")
+        assert [(r["related_target_chembl_id"], r["relationship"]) for r in rels] == [
+            ("CHEMBL2", "SUBSET OF")
+        ]
+        component = api.target.get("CHEMBL1")["target_components"][0]
+        assert component["accession"] == "P12345"
+        assert component["target_component_xrefs"] == [
+            dict(
+                xref_src_db="GoFunction", xref_id="GO:0004890", xref_name="GABA-A receptor activity"
+            )
+        ]
+
+    def test_unsupported(self, api: ChemblDbApi):
+        with pytest.raises(UnsupportedOpError):
+            api.document.get("CHEMBL1000")
+        with pytest.raises(UnsupportedOpError):
+            api.activity.filter(document_chembl_id="CHEMBL1000")
+
+
+if __name__ == "__main__":
+    pytest.main()
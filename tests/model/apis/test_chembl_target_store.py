@@ -0,0 +1,163 @@
+from pathlib import Path
+
+import pytest
+
+from mandos.model.apis.chembl_api import ChemblApi, ChemblEntrypoint
+from mandos.model.apis.chembl_support.chembl_target_graphs import (
+    ChemblTargetGraphFactory,
+    TargetRelType,
+)
+from mandos.model.apis.chembl_support.chembl_target_store import ChemblTargetStore
+from mandos.model.apis.chembl_support.chembl_targets import (
+    ChemblTarget,
+    TargetFactory,
+    TargetType,
+)
+from mandos.model.apis.chembl_support.target_traversal import (
+    TargetTraversalStrategies,
+    TraversalMemo,
+)
+
+_targets = {
+    "CHEMBL1": dict(target_chembl_id="CHEMBL1", pref_name="alpha", target_type="SINGLE_PROTEIN"),
+    "CHEMBL2": dict(target_chembl_id="CHEMBL2", pref_name="beta", target_type="PROTEIN_COMPLEX"),
+    "CHEMBL3": dict(target_chembl_id="CHEMBL3", pref_name="gamma", target_type="PROTEIN_FAMILY"),
+}
+_relations = {
+    "CHEMBL1": [("CHEMBL2", "SUBSET OF")],
+    "CHEMBL2": [("CHEMBL1", "SUPERSET OF"), ("CHEMBL3", "SUBSET OF")],
+    "CHEMBL3": [("CHEMBL2", "SUPERSET OF")],
+}
+
+_strategy = [
+    "single_protein            < protein_complex         accept:-",
+    "protein_complex           < protein_family          accept:$",
+]
+
+
+def _api(calls):
+    def filter_targets(kwargs):
+        calls.append(("target", kwargs))
+        ids = kwargs.get("target_chembl_id__in", [kwargs.get("target_chembl_id")])
+        return list(_targets.values()) if ids == [None] else [_targets[i] for i in ids]
+
+    def filter_relations(kwargs):
+        calls.append(("target_relation", kwargs))
+        ids = kwargs.get("target_chembl_id__in", [kwargs.get("target_chembl_id")])
+        ids = list(_relations.keys()) if ids == [None] else ids
+        return [
+            dict(target_chembl_id=i, related_target_chembl_id=d, relationship=r)
+            for i in ids
+            for d, r in _relations[i]
+        ]
+
+    return ChemblApi.mock(
+        {
+            "target": ChemblEntrypoint.mock(_targets, filter_targets),
+            "target_relation": ChemblEntrypoint.mock({}, filter_relations),
+        }
+    )
+
+
+class TestChemblTargetStore:
+    def test_prefetch_all(self):
+        calls = []
+        store = ChemblTargetStore(None)
+        store.prefetch_all(_api(calls))
+        assert len(calls) == 2
+        assert store.n_targets == 3
+        assert store.target("CHEMBL3").type is TargetType.protein_family
+        assert store.relations("CHEMBL2") == (("CHEMBL1", "SUPERSET OF"), ("CHEMBL3", "SUBSET OF"))
+
+    def test_traverse_offline(self):
+        calls = []
+        store = ChemblTargetStore(None)
+        store.prefetch_all(_api(calls))
+        calls.clear()
+        api = _api(calls)
+        factory = TargetFactory(api, store)
+        graph = ChemblTargetGraphFactory.create(api, factory).at_chembl_id("CHEMBL1")
+        links = graph.links({TargetRelType.subset_of})
+        assert [(t.chembl, r) for t, r in links] == [("CHEMBL2", TargetRelType.subset_of)]
+        assert calls == []
+
+    def test_persist(self, tmp_path: Path):
+        path = tmp_path / "targets.sqlite"
+        store = ChemblTargetStore("ChEMBL_29", path)
+        store.prefetch_all(_api([]))
+        store.close()
+        store = ChemblTargetStore("ChEMBL_29", path)
+        assert store.n_targets == 3
+        assert store.relations("CHEMBL1") == (("CHEMBL2", "SUBSET OF"),)
+        assert store.target("CHEMBL2").name == "beta"
+        store.close()
+        # other releases are kept separately
+        store = ChemblTargetStore("ChEMBL_30", path)
+        assert store.n_targets == 0
+        assert store.relations("CHEMBL1") is None
+        store.close()
+
+    def test_factory_remembers(self):
+        calls = []
+        store = ChemblTargetStore(None)
+        factory = TargetFactory(_api(calls), store)
+        assert factory.find("CHEMBL2").name == "beta"
+        assert factory.relations("CHEMBL2") == [
+            ("CHEMBL1", "SUPERSET OF"),
+            ("CHEMBL3", "SUBSET OF"),
+        ]
+        factory.find("CHEMBL2")
+        factory.relations("CHEMBL2")
+        assert len(calls) == 2
+
+
+class TestTraversalMemo:
+    def test_memory(self):
+        calls = []
+        api = _api(calls)
+        factory = TargetFactory(api, ChemblTargetStore(None))
+        graph = ChemblTargetGraphFactory.create(api, factory).at_chembl_id("CHEMBL1")
+        strategy = TargetTraversalStrategies.from_lines(_strategy, api, name="Test")
+        assert [t.chembl for t in strategy(graph)] == ["CHEMBL3"]
+        n_calls = len(calls)
+        assert [t.chembl for t in strategy(graph)] == ["CHEMBL3"]
+        assert len(calls) == n_calls
+        assert strategy.memo_stats.hits == 1
+        assert strategy.memo_stats.misses == 1
+        assert strategy.memo_stats.hit_rate == 0.5
+
+    def test_disk(self, tmp_path: Path):
+        path = tmp_path / "targets.sqlite"
+        api = _api([])
+        store = ChemblTargetStore("ChEMBL_29", path)
+        graph = ChemblTargetGraphFactory.create(api, TargetFactory(api, store)).at_chembl_id(
+            "CHEMBL1"
+        )
+        strategy = TargetTraversalStrategies.from_lines(_strategy, api, name="Test")
+        strategy = type(strategy)(TraversalMemo(strategy.key(), store))
+        strategy(graph)
+        store.close()
+        store = ChemblTargetStore("ChEMBL_29", path)
+        memo = TraversalMemo(strategy.key(), store)
+        assert [t.chembl for t in memo.get("CHEMBL1")] == ["CHEMBL3"]
+        assert memo.get("CHEMBL2") is None
+        assert memo.stats.disk_hits == 1
+        # a different strategy doesn't see it
+        assert TraversalMemo("other", store).get("CHEMBL1") is None
+        store.close()
+
+
+class TestTargetTraversalStrategies:
+    def test_same_type(self):
+        api = _api([])
+        factory = TargetFactory(api, ChemblTargetStore(None))
+        graph = ChemblTargetGraphFactory.create(api, factory).at_chembl_id("CHEMBL1")
+        null = TargetTraversalStrategies.null(api)
+        standard = TargetTraversalStrategies.from_lines(_strategy, api, name="Test")
+        assert null(graph) == [graph.target]
+        for found in [null(graph), standard(graph)]:
+            assert all(isinstance(t, ChemblTarget) for t in found)
+
+
+if __name__ == "__main__":
+    pytest.main()
@@ -0,0 +1,45 @@
+import pytest
+
+from mandos.model.apis.pubchem_resolver import PubchemResolver
+from mandos.model.utils.query_executors import ConcurrentQueryExecutor
+
+
+class TestPubchemResolver:
+    def _resolver(self, stand_in, chunk_size: int) -> PubchemResolver:
+        executor = ConcurrentQueryExecutor(0, 0)
+        return PubchemResolver(executor, chunk_size=chunk_size, pug=stand_in.pug)
+
+    def test_inchikeys(self, pubchem_stand_in):
+        resolver = self._resolver(pubchem_stand_in, 2)
+        keys = [
+            "ZPUCINDJVBIVPJ-LJISPDSOSA-N",
+            "PIQVDUKEQYOJNR-VZXSFKIWSA-N",
+            "RYYVLZVUVIJVGH-UHFFFAOYSA-N",
+            "AAAAAAAAAAAAAA-UHFFFAOYSA-N",
+        ]
+        x = resolver.resolve(inchikeys=keys)
+        assert x.cid_of("ZPUCINDJVBIVPJ-LJISPDSOSA-N") == 446220
+        assert x.cid_of("RYYVLZVUVIJVGH-UHFFFAOYSA-N") == 2519
+        assert x.cid_of("AAAAAAAAAAAAAA-UHFFFAOYSA-N") is None
+        assert x.missing_inchikeys == {"AAAAAAAAAAAAAA-UHFFFAOYSA-N"}
+        assert x.by_inchikey["RYYVLZVUVIJVGH-UHFFFAOYSA-N"][0].inchi.startswith("InChI=1S/C8")
+        # 4 keys in chunks of 2
+        assert len(pubchem_stand_in.requests) == 2
+
+    def test_cids(self, pubchem_stand_in):
+        resolver = self._resolver(pubchem_stand_in, 100)
+        x = resolver.resolve(cids=[656832, "2519", 1])
+        assert x.inchikey_of(656832) == "PIQVDUKEQYOJNR-VZXSFKIWSA-N"
+        assert x.inchikey_of(2519) == "RYYVLZVUVIJVGH-UHFFFAOYSA-N"
+        assert x.missing_cids == {1}
+        assert pubchem_stand_in.requests == [("cid", ["656832", "2519", "1"])]
+
+    def test_bad_request(self, pubchem_stand_in):
+        resolver = self._resolver(pubchem_stand_in, 100)
+        x = resolver.resolve(inchikeys=["bad", "RYYVLZVUVIJVGH-UHFFFAOYSA-N"])
+        assert x.cid_of("RYYVLZVUVIJVGH-UHFFFAOYSA-N") == 2519
+        assert x.missing_inchikeys == {"bad"}
+
+
+if __name__ == "__main__":
+    pytest.main()
@@ -0,0 +1,45 @@
+import pytest
+
+from mandos.model.apis.pubchem_support.pubchem_stores import (
+    DirPubchemStore,
+    SqlitePubchemStore,
+)
+from tests.builders import recorded_pubchem
+
+inchikey = "PIQVDUKEQYOJNR-VZXSFKIWSA-N"
+
+
+class TestPubchemStores:
+    def test_sqlite(self, tmp_path):
+        store = SqlitePubchemStore(tmp_path / "data.sqlite")
+        assert not store.contains(inchikey)
+        store.write(recorded_pubchem(), inchikey)
+        store.write_missing("AAAAAAAAAAAAAA-UHFFFAOYSA-N")
+        assert store.contains(inchikey)
+        assert store.contains(446220)
+        assert store.read("AAAAAAAAAAAAAA-UHFFFAOYSA-N") is None
+        with pytest.raises(KeyError):
+            store.read("BBBBBBBBBBBBBB-UHFFFAOYSA-N")
+        x = store.read(inchikey)
+        # only the sections we touch are decoded
+        assert x.biomolecular_interactions_and_pathways.drug_gene_interactions is not None
+        assert "record" not in dict.keys(x._data._x)
+        assert x.cid == 446220
+        assert x.title_and_summary.safety == {"Irritant", "Acute Toxic"}
+        assert x.to_json() == recorded_pubchem().to_json()
+        store.close()
+
+    def test_migrate(self, tmp_path):
+        source = DirPubchemStore(tmp_path / "pubchem")
+        source.write(recorded_pubchem(), inchikey)
+        source.write_missing("AAAAAAAAAAAAAA-UHFFFAOYSA-N")
+        dest = SqlitePubchemStore(tmp_path / "data.sqlite")
+        assert dest.migrate_from(source) == 2
+        assert dest.read(inchikey).cid == 446220
+        assert dest.read(446220).cid == 446220
+        assert dest.read("AAAAAAAAAAAAAA-UHFFFAOYSA-N") is None
+        dest.close()
+
+
+if __name__ == "__main__":
+    pytest.main()
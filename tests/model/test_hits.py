@@ -1,11 +1,20 @@
+import dataclasses
+import os
+import subprocess
+import sys
 from dataclasses import dataclass
+from pathlib import Path
 
+import pandas as pd
 import pytest
+from pocketutils.core.exceptions import InjectionError
 
+from mandos.model.concrete_hits import AtcHit, BindingHit
 from mandos.model.hit_dfs import HitDf
 from mandos.model.hits import AbstractHit
 
 from .. import get_test_resource
+from ..builders import binding_hits
 
 
 @dataclass(frozen=True, order=True, repr=True)
@@ -22,5 +31,90 @@ class TestHits:
         assert len(df2) == 10
 
 
+class TestHitDf:
+    def test_round_trip(self):
+        hits = binding_hits(20, n_targets=8, per_compound=(2, 4))
+        atcs = [
+            AtcHit(**{f: getattr(h, f) for f in AbstractHit.fields()}, level=3) for h in hits[::3]
+        ]
+        # interleave the classes
+        mixed = [h for pair in zip(hits, atcs) for h in pair]
+        df = HitDf.from_hits(mixed)
+        assert df["hit_class"].tolist() == [h.hit_class for h in mixed]
+        assert df["universal_id"].tolist() == [h.universal_id for h in mixed]
+        assert df["weight"].tolist() == [h.weight for h in mixed]
+        assert df["level"].isna().tolist() == [isinstance(h, BindingHit) for h in mixed]
+        back = df.to_hits()
+        assert [h.__class__ for h in back] == [h.__class__ for h in mixed]
+        assert back[0] == mixed[0]
+        assert back[1].level == 3 and back[1].record_id == mixed[1].record_id
+        assert HitDf.from_hits(hits).to_hits() == hits
+
+    def test_universal_ids(self):
+        hits = binding_hits(20, n_targets=8, per_compound=(2, 4))
+        # a column that is missing for one class and sometimes None for the other
+        atcs = [
+            AtcHit(**{f: getattr(h, f) for f in AbstractHit.fields()}, level=i % 2 or None)
+            for i, h in enumerate(hits[::3])
+        ]
+        mixed = [h for pair in zip(hits, atcs) for h in pair]
+        df = HitDf.from_hits(mixed)
+        assert df["universal_id"].tolist() == [h.universal_id for h in mixed]
+        df["universal_id"] = "0"
+        assert df.with_universal_ids()["universal_id"].tolist() == [h.universal_id for h in mixed]
+        assert len(set(df.with_universal_ids()["universal_id"])) == len(set(mixed))
+
+    def test_universal_id_is_stable(self):
+        hit = binding_hits(1, n_targets=1, per_compound=(1, 1))[0]
+        code = (
+            "from tests.builders import binding_hits;"
+            + "print(binding_hits(1, n_targets=1, per_compound=(1, 1))[0].universal_id)"
+        )
+        env = {**os.environ, "PYTHONHASHSEED": "1"}
+        root = Path(__file__).parent.parent.parent
+        found = subprocess.check_output([sys.executable, "-c", code], env=env, cwd=root)
+        assert found.decode().strip() == hit.universal_id
+        assert len(hit.universal_id) == 16
+        # equal values hash equally, whatever their types
+        assert AtcHit.field_digest("level", 3) == AtcHit.field_digest("level", 3.0)
+        assert AtcHit.field_digest("level", None) == AtcHit.field_digest("level", float("nan"))
+        assert AtcHit.field_digest("level", 3) != AtcHit.field_digest("object_id", 3)
+
+    @pytest.mark.parametrize("suffix", [".feather", ".csv"])
+    def test_categorical(self, tmp_path, suffix: str):
+        hits = binding_hits(12, n_targets=4, per_compound=(1, 3))
+        hits[0] = dataclasses.replace(hits[0], compound_name=None)
+        df = HitDf.from_hits(hits)
+        assert isinstance(df["predicate"].dtype, pd.CategoricalDtype)
+        assert df["compound_name"].isna().tolist() == [h.compound_name is None for h in hits]
+        df.write_file(tmp_path / f"hits{suffix}")
+        back = HitDf.read_file(tmp_path / f"hits{suffix}")
+        assert isinstance(back["search_key"].dtype, pd.CategoricalDtype)
+        assert back.to_triples() == [h.to_triple for h in hits]
+        assert [h.compound_name for h in back.to_hits()] == [h.compound_name for h in hits]
+        if suffix == ".feather":
+            assert back.to_hits() == hits
+
+    def test_concat(self):
+        a = HitDf.from_hits(binding_hits(4, n_targets=4, per_compound=(1, 2)))
+        b = HitDf.from_hits(binding_hits(4, n_targets=8, per_compound=(1, 2), seed=1))
+        b["search_key"] = "other"
+        df = HitDf.concat([a, b])
+        assert isinstance(df["search_key"].dtype, pd.CategoricalDtype)
+        assert isinstance(df["object_name"].dtype, pd.CategoricalDtype)
+        assert df["search_key"].tolist() == ["binding"] * len(a) + ["other"] * len(b)
+        assert df["object_name"].tolist() == a["object_name"].tolist() + b["object_name"].tolist()
+
+    def test_bad_class(self):
+        df = HitDf.from_hits(binding_hits(2, n_targets=4, per_compound=(1, 1)))
+        df["hit_class"] = "NoSuchHit"
+        with pytest.raises(InjectionError):
+            df.to_hits()
+
+    def test_triples(self):
+        hits = binding_hits(3, n_targets=4, per_compound=(1, 2))
+        assert HitDf.from_hits(hits).to_triples() == [h.to_triple for h in hits]
+
+
 if __name__ == "__main__":
     pytest.main()
@@ -0,0 +1,39 @@
+import pytest
+
+from mandos.model.utils.memory_caches import MemoryLruCache
+
+
+class TestMemoryLruCache:
+    def test_evicts_least_recent(self):
+        cache = MemoryLruCache("test", 10)
+        cache.put("a", 1, 4)
+        cache.put("b", 2, 4)
+        assert cache.get("a") == 1  # now b is the least recent
+        cache.put("c", 3, 4)
+        assert "b" not in cache
+        assert cache.get("a") == 1
+        assert cache.get("c") == 3
+        assert cache.get("b") is None
+        stats = cache.stats
+        assert (stats.hits, stats.misses, stats.evictions) == (3, 1, 1)
+        assert (stats.n_items, stats.n_bytes) == (2, 8)
+
+    def test_replace(self):
+        cache = MemoryLruCache("test", 10)
+        cache.put("a", 1, 6)
+        cache.put("a", 2, 8)
+        assert cache.get("a") == 2
+        assert cache.stats.n_bytes == 8
+        assert cache.stats.evictions == 0
+
+    def test_too_large(self):
+        cache = MemoryLruCache("test", 10)
+        cache.put("a", 1, 11)
+        assert len(cache) == 0
+        disabled = MemoryLruCache("test", 0)
+        disabled.put("a", 1, 1)
+        assert disabled.get("a") is None
+
+
+if __name__ == "__main__":
+    pytest.main()
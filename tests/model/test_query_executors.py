@@ -0,0 +1,62 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Tuple
+from urllib import request
+
+import pytest
+
+from mandos.model.utils.query_executors import ConcurrentQueryExecutor
+
+
+class _Querier:
+    def __init__(self, secs: float):
+        self.secs = secs
+        self.lock = threading.Lock()
+        self.times: List[Tuple[float, float]] = []
+
+    def __call__(self, req: request.Request) -> bytes:
+        start = time.monotonic()
+        time.sleep(self.secs)
+        with self.lock:
+            self.times.append((start, time.monotonic()))
+        return req.full_url.encode(encoding="utf8")
+
+
+class TestConcurrentQueryExecutor:
+    def test_one_thread(self):
+        # like QueryExecutor, waits the delay after each response
+        querier = _Querier(0.05)
+        executor = ConcurrentQueryExecutor(0.05, 0.05, querier=querier)
+        assert [executor(f"https://x/{i}") for i in range(4)] == [
+            f"https://x/{i}" for i in range(4)
+        ]
+        for (_, end), (start, _) in zip(querier.times, querier.times[1:]):
+            assert start - end >= 0.05
+        assert executor.last_time_taken.query.total_seconds() >= 0.05
+
+    def test_threads(self):
+        querier = _Querier(0.2)
+        executor = ConcurrentQueryExecutor(0.02, 0.02, querier=querier)
+        with ThreadPoolExecutor(4) as pool:
+            urls = list(pool.map(executor, [f"https://x/{i}" for i in range(8)]))
+        assert urls == [f"https://x/{i}" for i in range(8)]
+        starts = sorted(start for start, _ in querier.times)
+        # the starts are still spaced by the delay
+        # (allowing for the time between reserving a slot and calling the querier)
+        assert all(b - a >= 0.019 for a, b in zip(starts, starts[1:]))
+        # but the requests overlap
+        ends = sorted(end for _, end in querier.times)
+        assert starts[1] < ends[0]
+
+    def test_limit(self):
+        # shares the slots with queries
+        querier = _Querier(0.0)
+        executor = ConcurrentQueryExecutor(0.05, 0.05, querier=querier)
+        executor("https://x/0")
+        assert executor.limit(lambda: 7) == 7
+        assert executor.last_time_taken.wait.total_seconds() >= 0.04
+
+
+if __name__ == "__main__":
+    pytest.main()
@@ -0,0 +1,47 @@
+import os
+
+import pytest
+from pocketutils.core.exceptions import PathExistsError
+
+from mandos.model.search_caches import SearchCache
+
+_compounds = ["A", "B", "C", "D"]
+
+
+class TestSearchCache:
+    def test_resume(self, tmp_path):
+        path = tmp_path / "hits.feather"
+        cache = SearchCache(path, _compounds, restart=False, proceed=False)
+        assert cache.next() == "A"
+        cache.save("A", "B")
+        cache.close()
+        cache.close()
+        with pytest.raises(PathExistsError):
+            SearchCache(path, _compounds, restart=False, proceed=False)
+        resumed = SearchCache(path, _compounds, restart=False, proceed=True)
+        assert resumed.at == 2
+        assert resumed.next() == "C"
+        resumed.kill()
+        assert not cache._meta_path.exists()
+
+    def test_rewrites_only_if_needed(self, tmp_path):
+        path = tmp_path / "hits.feather"
+        cache = SearchCache(path, _compounds, restart=False, proceed=False)
+        cache.save("A")
+        cache.close()
+        inode = os.stat(cache._meta_path).st_ino
+        # nothing to drop, so the journal is appended to in place
+        SearchCache(path, _compounds, restart=False, proceed=True).close()
+        assert os.stat(cache._meta_path).st_ino == inode
+        # a torn line is dropped
+        with cache._meta_path.open("a", encoding="utf8") as f:
+            f.write("B")
+        resumed = SearchCache(path, _compounds, restart=False, proceed=True)
+        resumed.close()
+        assert resumed.at == 1
+        assert cache._meta_path.read_text(encoding="utf8") == "A\n"
+        assert [p.name for p in tmp_path.iterdir() if p.name.endswith(".swap")] == []
+
+
+if __name__ == "__main__":
+    pytest.main()
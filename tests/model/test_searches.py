@@ -0,0 +1,44 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from mandos.model.concrete_hits import MetaHit
+from mandos.search.meta.random_search import RandomSearch
+
+
+class TestSearches:
+    def test_create_hit(self):
+        search = RandomSearch("random", 0, 10)
+        a = search.find("AAAAAAAAAAAAAA-UHFFFAOYSA-N")[0]
+        b = search.find("BBBBBBBBBBBBBB-UHFFFAOYSA-N")[0]
+        assert isinstance(a, MetaHit)
+        assert (a.search_key, a.search_class) == ("random", "RandomSearch")
+        assert (a.data_source, a.predicate) == ("meta:random", "random")
+        assert a.run_date == b.run_date
+        search._hits._local.run_date = "earlier"
+        search.stamp()
+        assert search.find("AAAAAAAAAAAAAA-UHFFFAOYSA-N")[0].run_date != "earlier"
+        assert "_hits" not in search.get_params()
+
+    def test_stamp_per_thread(self):
+        search = RandomSearch("random", 0, 10)
+        search._hits._local.run_date = "earlier"
+        with ThreadPoolExecutor(1) as pool:
+            pool.submit(search.stamp).result()
+            other = pool.submit(search.find, "AAAAAAAAAAAAAA-UHFFFAOYSA-N").result()[0]
+        assert other.run_date != "earlier"
+        assert search.find("AAAAAAAAAAAAAA-UHFFFAOYSA-N")[0].run_date == "earlier"
+
+    def test_format(self):
+        search = RandomSearch("random", 0, 10)
+        search._hits.strings = dict(source="x:{a}:{b}", predicate="{a}-{a}")
+        assert search._format_source(a=1, b="z") == "x:1:z"
+        assert search._format_source(a=2, b="z") == "x:2:z"
+        assert search._format_source(a=1) == "x:1:{b}"
+        assert search._format_predicate(a=1, b="z") == "1-1"
+        assert search._format_predicate(a=[1]) == "[1]-[1]"
+        assert search._format_predicate(a=1.0) == "1.0-1.0"
+
+
+if __name__ == "__main__":
+    pytest.main()
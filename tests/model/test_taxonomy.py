@@ -1,7 +1,13 @@
+import gzip
+from pathlib import Path
+
+import pandas as pd
 import pytest
+from pocketutils.core.exceptions import DataIntegrityError, MultipleMatchesError
 
-from mandos.model.taxonomy import Taxon, Taxonomy, _Taxon
-from mandos.model.taxonomy_caches import TaxonomyFactories
+from mandos.model.settings import SETTINGS
+from mandos.model.taxonomy import Taxon, Taxonomy, TaxonomyDf, _MappedNames, _Taxon
+from mandos.model.taxonomy_caches import CachedTaxonomyCache, TaxonomyFactories
 
 
 class TestFind:
@@ -61,6 +67,138 @@ class TestFind:
         assert b < c, f"{b} vs {c}"
         assert b < c < a, f"{a} vs {b} vs {c}"
 
+    def test_under(self):
+        tax = self._tree()
+        assert tax.is_under(4, 1)
+        assert tax.is_under(4, 2)
+        assert tax.is_under(2, 2)
+        assert not tax.is_under(4, 3)
+        assert not tax.is_under(1, 2)
+        assert not tax.is_under(4, 99)
+        assert [t.id for t in tax[1].descendents] == [2, 4, 5, 3, 6]
+        assert [t.id for t in tax[4].ancestors] == [2, 1]
+        assert {t.id for t in tax[1].children} == {2, 3}
+
+    def test_subtrees(self):
+        tax = self._tree()
+        under = tax.subtree(2)
+        assert [t.id for t in under.taxa] == [2, 4, 5]
+        assert under.roots == [tax[2]]
+        assert under[2].parent is None
+        assert under.to_df()["parent"].tolist() == [1, 2, 2]
+        assert [t.id for t in tax.exclude_subtree(2).taxa] == [1, 3, 6, 7]
+        assert [t.id for t in tax.exclude_subtrees_by_ids_or_names(["b", 7]).taxa] == [1, 2, 4, 5]
+        assert [t.id for t in tax.subtrees_by_ids_or_names(["BEE", 4]).taxa] == [4, 3, 6]
+        rejoined = Taxonomy.from_trees([tax.subtree(2), tax.subtree(3)])
+        assert rejoined[2].parent is None
+        assert [t.id for t in Taxonomy.from_trees([tax.subtree(1), under]).taxa] == [
+            1,
+            2,
+            4,
+            5,
+            3,
+            6,
+        ]
+
+    def test_names(self):
+        tax = self._tree()
+        assert tax.get_by_name("a") == {tax[2], tax[5]}
+        assert tax.get_one_by_name("A") == tax[2]
+        assert tax.req_only_by_name("bee") == tax[3]
+        assert "Other" in tax
+        assert "nope" not in tax
+        with pytest.raises(MultipleMatchesError):
+            tax.req_only_by_name("a")
+
+    def test_blank_name(self):
+        df = TaxonomyDf.convert(
+            pd.DataFrame(
+                [(1, 0, " ", None, None)],
+                columns=["taxon", "parent", "scientific_name", "common_name", "mnemonic"],
+            )
+        )
+        with pytest.raises(DataIntegrityError):
+            Taxonomy.from_df(df)
+
+    def test_mapped(self, tmp_path: Path):
+        tax = self._tree()
+        tax.write_mapped(tmp_path / "1.taxa")
+        mapped = Taxonomy.from_mapped(tmp_path / "1.taxa")
+        assert mapped.taxa == tax.taxa
+        assert mapped.to_df().equals(tax.to_df())
+        assert mapped.get_by_name("a") == {tax[2], tax[5]}
+        assert mapped[5].common_name == "a"
+        assert mapped[3].mnemonic == "BEE"
+        assert "other" in mapped
+        assert "nope" not in mapped
+        assert mapped.is_under(6, 3)
+        assert [t.id for t in mapped.subtree(2).taxa] == [2, 4, 5]
+        # write just part of a tree, which shares its names with the full tree
+        mapped.subtree(3).write_mapped(tmp_path / "3.taxa")
+        under = Taxonomy.from_mapped(tmp_path / "3.taxa")
+        assert [t.scientific_name for t in under.taxa] == ["B", "B1"]
+        assert under.get_by_name("a") == frozenset()
+
+    def test_mapped_versions(self, tmp_path: Path):
+        tax = self._tree()
+        path = tmp_path / "1.taxa"
+        tax.write_mapped(path)
+        first = (path / "current").read_text(encoding="utf8")
+        # a reader that already has the first version can still open it
+        tax.subtree(3).write_mapped(path)
+        assert (path / first / "info.json").exists()
+        assert [t.id for t in Taxonomy.from_mapped(path).taxa] == [3, 6]
+        tax.write_mapped(path)
+        assert not (path / first).exists()
+        assert len([p for p in path.iterdir() if p.is_dir()]) == 2
+        assert Taxonomy.from_mapped(path).taxa == tax.taxa
+
+    def test_cached_mapped(self, tmp_path: Path):
+        path = tmp_path / f"1{SETTINGS.archive_filename_suffix}"
+        self._tree().to_df().write_file(path)
+        cache = CachedTaxonomyCache(cache_dir=tmp_path, local_only=True)
+        first = cache.load_exact(1)
+        assert (tmp_path / "1.taxa" / "current").exists()
+        second = cache.load_exact(1)
+        assert isinstance(second._names, _MappedNames)
+        assert second.taxa == first.taxa
+
+    def test_fix_download(self, tmp_path: Path):
+        raw = tmp_path / "taxonomy-ancestor_1.tsv.gz"
+        lines = [
+            "Taxon\tMnemonic\tScientific name\tCommon name\tSynonym\tOther Names\tRank\tLineage\tParent",
+            "2\t\tA\t\t\t\tgenus\tcellular organisms; Root\t1",
+            "4\t\tA1\t\t\t\tspecies\tcellular organisms; Root; A\t2",
+            "5\t\tA2\ta\t\t\tspecies\tcellular organisms; Root; A\t2",
+            "3\tBEE\tB\t\t\t\tgenus\tcellular organisms; Root\t1",
+            "6\t\tB1\t\t\t\tspecies\tcellular organisms; Root; B\t3",
+        ]
+        with gzip.open(raw, "wt") as f:
+            f.write("\n".join(lines) + "\n")
+        cache = CachedTaxonomyCache(cache_dir=tmp_path, local_only=True)
+        cache.chunk_size = 2
+        final = tmp_path / f"1{SETTINGS.archive_filename_suffix}"
+        tree = cache._fix(raw, 1, final)
+        assert not raw.exists()
+        assert [t.id for t in tree.taxa] == [1, 2, 4, 5, 3, 6]
+        assert tree[1].scientific_name == "Root"
+        assert tree[3].mnemonic == "BEE"
+        assert tree[5].common_name == "a"
+        assert Taxonomy.from_path(final).taxa == tree.taxa
+
+    def _tree(self) -> Taxonomy:
+        rows = [
+            (1, 0, "Root", None, None),
+            (2, 1, "A", None, None),
+            (3, 1, "B", None, "BEE"),
+            (4, 2, "A1", None, None),
+            (5, 2, "A2", "a", None),
+            (6, 3, "B1", None, None),
+            (7, 99, "Other", None, None),
+        ]
+        columns = ["taxon", "parent", "scientific_name", "common_name", "mnemonic"]
+        return Taxonomy.from_df(TaxonomyDf.convert(pd.DataFrame(rows, columns=columns)))
+
     """
     def test_real(self):
         path = MandosResources.path("7742.snappy")
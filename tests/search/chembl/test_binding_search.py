@@ -1,4 +1,33 @@
+from typing import List, Optional
+
 import pytest
+from pocketutils.core.dot_dict import NestedDotDict
+
+from mandos.model.apis.chembl_api import ChemblApi, ChemblEntrypoint, ChemblFilterQuery
+from mandos.search.chembl.binding_search import BindingSearch
+from tests.builders import RecordedTaxa, inchikeys, recorded_chembl
+
+
+def _counting(api: ChemblApi, calls: List[str]) -> ChemblApi:
+    def wrap(name: str, entrypoint: ChemblEntrypoint) -> ChemblEntrypoint:
+        class X(ChemblEntrypoint):
+            def filter(self, **kwargs) -> ChemblFilterQuery:
+                calls.append(name)
+                return entrypoint.filter(**kwargs)
+
+            def get(self, arg: str) -> Optional[NestedDotDict]:
+                calls.append(name)
+                return entrypoint.get(arg)
+
+        return X()
+
+    names = ["molecule", "activity", "assay", "target", "target_relation"]
+    return ChemblApi.mock({name: wrap(name, getattr(api, name)) for name in names})
+
+
+def _search(api: ChemblApi) -> BindingSearch:
+    types = {"single_protein", "protein_complex", "protein_complex_group"}
+    return BindingSearch("binding", api, RecordedTaxa(), "@null", types, 5, {"=", "<"}, 5.0, 7.0)
 
 
 class TestActivitySearch:
@@ -12,6 +41,20 @@ class TestActivitySearch:
         assert triples[0].compound_name.lower() == "alprazolam"
         """
 
+    def test_prefetch(self):
+        keys = inchikeys(3)
+        one_by_one, prefetched = [], []
+        search = _search(_counting(recorded_chembl(keys), one_by_one))
+        expected = [hit for key in keys for hit in search.find(key)]
+        search = _search(_counting(recorded_chembl(keys), prefetched))
+        search.prefetch(keys)
+        found = [hit for key in keys for hit in search.find(key)]
+        assert [h.record_id for h in found] == [h.record_id for h in expected]
+        assert prefetched.count("activity") == 1
+        assert prefetched.count("assay") == 1
+        assert one_by_one.count("activity") == 3
+        assert one_by_one.count("assay") > 3
+
 
 if __name__ == "__main__":
     pytest.main()
@@ -0,0 +1,46 @@
+from typing import Sequence, Union
+
+import pytest
+
+from mandos.model.apis.pubchem_api import PubchemApi
+from mandos.model.apis.pubchem_support.pubchem_data import PubchemData
+from mandos.search.pubchem.bioactivity_search import BioactivitySearch
+from tests.builders import recorded_pubchem
+
+
+class _RecordedApi(PubchemApi):
+    def __init__(self, data: PubchemData):
+        self.data = data
+
+    def fetch_data(self, inchikey: Union[str, int]) -> PubchemData:
+        return self.data
+
+
+def _data(names: Sequence[str]) -> PubchemData:
+    data = recorded_pubchem()
+    rows = data._data["external_tables"]["bioactivity"]
+    # the recorded assays have no target, so they would be skipped
+    target = "Sodium-dependent dopamine transporter (human)"
+    rows = [{**r, "targetname": target, "geneid": 6531, "cmpdname": n} for r, n in zip(rows, names)]
+    return recorded_pubchem(bioactivity=rows)
+
+
+class TestBioactivitySearch:
+    def test_find(self):
+        search = BioactivitySearch("assays", _RecordedApi(_data(["Cocaine", "Cocaine"])), False)
+        hits = search.find("PIQVDUKEQYOJNR-VZXSFKIWSA-N")
+        assert len(hits) == 2
+        assert {h.object_name.strip() for h in hits} == {"Sodium-dependent dopamine transporter"}
+        assert {h.species for h in hits} == {"human"}
+        assert {h.predicate for h in hits} == {"active"}
+        assert sorted(h.relation for h in hits) == ["Kd", "Ki"]
+
+    def test_compound_name_must_match(self):
+        data = _data(["Cocaine", "benzoylecgonine"])
+        search = BioactivitySearch("assays", _RecordedApi(data), True)
+        hits = search.process("PIQVDUKEQYOJNR-VZXSFKIWSA-N", data)
+        assert [h.compound_name_in_assay for h in hits] == ["Cocaine"]
+
+
+if __name__ == "__main__":
+    pytest.main()